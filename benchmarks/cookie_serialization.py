@@ -0,0 +1,74 @@
+"""
+Compare the load/dump time and size of the JSON cookie format
+with the legacy pickle format.
+
+Example::
+
+    python benchmarks/cookie_serialization.py -n 20000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+try:
+    from instagram_private_api.http import ClientCookieJar
+    from instagram_private_api.compat import compat_cookiejar, compat_pickle
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from instagram_private_api.http import ClientCookieJar
+    from instagram_private_api.compat import compat_cookiejar, compat_pickle
+
+
+def make_jar():
+    """A cookie jar similar to that of a logged in session."""
+    expires = int(time.time()) + 90 * 24 * 60 * 60
+    jar = ClientCookieJar()
+    cookies = [
+        ('csrftoken', 'u9RzgMqS6yZbGbDdCrFs6lLkVbPhc1Zq', expires),
+        ('ds_user', 'instagram_user', expires),
+        ('ds_user_id', '1234567890', expires),
+        ('mid', 'W1YQ_AABAAHcE2pCBkRYnLBqEsWm', expires),
+        ('rur', 'FRC', None),
+        ('sessionid', 'IGSC3f0c4b1e2d%3AlTzHDQmA3nVjQaqbUxEFYtm5LCbDo3xR', expires),
+        ('shbid', '7342', expires),
+        ('shbts', '1533056534.6128242', expires),
+        ('urlgen', '"{\\"1.2.3.4\\": 12345}:1fkVbd:pRkNQ4zS7N7eSR5vfW1qLsEL6bI"', None),
+    ]
+    for name, value, cookie_expires in cookies:
+        jar.set_cookie(compat_cookiejar.Cookie(
+            0, name, value, None, False, '.instagram.com', True, True, '/', True,
+            True, cookie_expires, cookie_expires is None, None, None, {'HttpOnly': None}))
+    return jar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cookie serialization benchmark')
+    parser.add_argument('-n', '--number', dest='number', type=int, default=10000)
+    args = parser.parse_args()
+
+    jar = make_jar()
+
+    def dump_changed():
+        # as after a response has set cookies
+        jar._dumped = None
+        return jar.dump()
+
+    formats = [
+        ('pickle', lambda: compat_pickle.dumps(jar._cookies)),
+        ('json', dump_changed),
+        ('json (unchanged jar)', jar.dump),
+    ]
+    print('{0:<22s} {1:>8s} {2:>12s} {3:>12s}'.format('format', 'size', 'dump (us)', 'load (us)'))
+    for name, dump in formats:
+        data = dump()
+        dump_time = min(timeit.repeat(dump, number=args.number, repeat=3)) / args.number
+        load_time = min(timeit.repeat(
+            lambda: ClientCookieJar(data), number=args.number, repeat=3)) / args.number
+        print('{0:<22s} {1:>8d} {2:>12.2f} {3:>12.2f}'.format(
+            name, len(data), dump_time * 1e6, load_time * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare the bulk InstagramID conversions with the scalar methods.
+The NumPy rows are only shown if NumPy is installed.
+
+Example::
+
+    python benchmarks/instagram_id.py -n 100000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+try:
+    from instagram_private_api.utils import InstagramID
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from instagram_private_api.utils import InstagramID
+
+
+def main():
+    parser = argparse.ArgumentParser(description='InstagramID conversion benchmark')
+    parser.add_argument('-n', '--number', dest='number', type=int, default=100000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    ids = [random.randint(10 ** 18, 3 * 10 ** 18) for _ in range(args.number)]
+    codes = InstagramID.shorten_ids(ids)
+    cases = [
+        ('shorten_id', lambda: [InstagramID.shorten_id(i) for i in ids]),
+        ('shorten_ids', lambda: InstagramID.shorten_ids(ids)),
+        ('expand_code', lambda: [InstagramID.expand_code(c) for c in codes]),
+        ('expand_codes', lambda: InstagramID.expand_codes(codes)),
+    ]
+    try:
+        import numpy
+        id_array = numpy.array(ids, dtype=numpy.uint64)
+        code_array = numpy.array(codes)
+        cases.extend([
+            ('shorten_ids (numpy)', lambda: InstagramID.shorten_ids(id_array)),
+            ('expand_codes (numpy)', lambda: InstagramID.expand_codes(code_array)),
+        ])
+    except ImportError:
+        pass
+
+    print('{0:<22s} {1:>12s} {2:>14s}'.format('method', 'total (ms)', 'per id (ns)'))
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print('{0:<22s} {1:>12.1f} {2:>14.1f}'.format(name, elapsed * 1e3, elapsed / args.number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
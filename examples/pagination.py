@@ -50,6 +50,11 @@ if __name__ == '__main__':
     # print list of IDs
     print(json.dumps([u['pk'] for u in updates], indent=2))
 
+    # ---------- Pagination with iter_items ----------
+    # The next page is fetched in the background while the current page is processed
+    updates = list(api.iter_items(api.user_feed, user_id, max_items=30))
+    print(json.dumps([u['pk'] for u in updates], indent=2))
+
     # ---------- Pagination with rank_token and exclusion list ----------
     rank_token = Client.generate_uuid()
     has_more = True
@@ -1,4 +1,5 @@
 # flake8: noqa
+import sys
 
 from .client import Client
 from .compatpatch import ClientCompatPatch
@@ -8,8 +9,20 @@ from .errors import (
     ClientCheckpointRequiredError, ClientChallengeRequiredError,
     ClientSentryBlockError, ClientReqHeadersTooLargeError,
 )
+from .transport import Transport, UrllibTransport, PooledTransport
+from .cassette import Cassette, CassetteTransport, CassetteError
+from .events import EventHooks, RequestEvent
+from .jsonstream import JSONItemStream
+from .codec import JSONCodec, OrjsonCodec
+from .pagination import PaginationCheckpoint, FileCheckpointStore
+from .bulk import BulkResult
+from .concurrency import RateLimiter
+from .cache import TTLCache, ResponseCache, SQLiteResponseCache
 from .endpoints.upload import MediaRatios
 from .endpoints.common import MediaTypes
 
+if sys.version_info >= (3, 5):
+    from .asyncclient import AsyncClient
+
 
 __version__ = '1.6.0'
@@ -0,0 +1,518 @@
+# Copyright (c) 2017 https://github.com/ping
+#
+# This software is released under the MIT License.
+# https://opensource.org/licenses/MIT
+
+# -*- coding: utf-8 -*-
+"""
+asyncio support for the private app api. Requires python 3.5+.
+
+The endpoint methods are not reimplemented. Each coroutine runs the regular
+synchronous endpoint method until it sends its first request, which is built
+as usual (params, signing, headers and all) and awaited on a non-blocking
+connection pool. The method is then run again in an executor, with the response
+replayed to the same request, which is checked. Any further requests, for
+example of methods that fetch several pages, are sent with the client's
+synchronous transport from the executor thread. Error handling and compat
+patching therefore stay exactly as in :class:`Client`, and are done once.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import socket
+import ssl
+import threading
+import time
+from io import BytesIO
+from http.client import parse_headers, responses
+
+from .client import Client
+from .compat import (
+    compat_urllib_error, compat_urllib_parse, compat_urllib_parse_urlparse
+)
+from .errors import ClientError
+from .http import KeepAliveHandlerMixin
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+class PendingRequest(BaseException):
+    """
+    Raised from inside a replayed endpoint method when it needs a response
+    that has not been fetched yet. Derived from BaseException so that it is
+    not swallowed by the endpoint's own ``except`` clauses.
+    """
+    def __init__(self, request):
+        self.request = request
+        super(PendingRequest, self).__init__(request.get_full_url())
+
+
+class ReplayMismatch(BaseException):
+    """
+    Raised from inside a replayed endpoint method when it makes a different
+    request than the one the recorded response was fetched for.
+    """
+
+
+class BufferedResponse(object):
+    """A fully read http response that can be replayed any number of times."""
+
+    def __init__(self, url, code, reason, headers, body):
+        self.url = url
+        self.code = code
+        self.status = code
+        self.reason = reason
+        self.msg = reason
+        self.headers = headers
+        self.body = body
+
+    def open(self):
+        """Returns a fresh file-like response object for this response."""
+        if self.code >= 400:
+            return compat_urllib_error.HTTPError(
+                self.url, self.code, self.reason, self.headers, BytesIO(self.body))
+        return _ResponseReader(self)
+
+    def info(self):
+        return self.headers
+
+
+class _ResponseReader(object):
+
+    def __init__(self, response):
+        self._response = response
+        self._fp = BytesIO(response.body)
+        self.url = response.url
+        self.code = response.code
+        self.status = response.code
+        self.reason = response.reason
+        self.msg = response.reason
+        self.headers = response.headers
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self.code
+
+    def read(self, amt=None):
+        return self._fp.read() if amt is None else self._fp.read(amt)
+
+    def close(self):
+        self._fp.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Wraps the client's transport. Outside of a replayed call (for example a
+    synchronous login during init, or an upload running in an executor), and
+    after the replayed responses of a call, requests go through the wrapped transport.
+    """
+
+    def __init__(self, transport):
+        super(ReplayTransport, self).__init__(transport.cookie_jar)
+        self.transport = transport
+        self.keep_alive = transport.keep_alive
+        self._local = threading.local()
+
+    @property
+    def outcomes(self):
+        return getattr(self._local, 'outcomes', None)
+
+    def replay(self, outcomes, then_send=False):
+        """
+        Replay responses to the requests made in this thread.
+
+        :param outcomes: list of (method, url, response or exception) of the requests made so far
+        :param then_send: send the requests that follow with the wrapped transport,
+            instead of raising :class:`PendingRequest`
+        """
+        self._local.outcomes = outcomes
+        self._local.index = 0
+        self._local.then_send = then_send
+
+    def stop(self):
+        self._local.outcomes = None
+
+    def send(self, req, timeout=None):
+        outcomes = self.outcomes
+        if outcomes is None:
+            return self.transport.send(req, timeout=timeout)
+
+        index = self._local.index
+        self._local.index += 1
+        if index >= len(outcomes):
+            if self._local.then_send:
+                return self.transport.send(req, timeout=timeout)
+            raise PendingRequest(req)
+        method, url, outcome = outcomes[index]
+        if req.get_method() != method or req.get_full_url() != url:
+            raise ReplayMismatch(
+                'Request {0:d} of the replayed call is {1!s} {2!s} instead of {3!s} {4!s}'.format(
+                    index + 1, req.get_method(), req.get_full_url(), method, url))
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = outcome.open()
+        if isinstance(response, compat_urllib_error.HTTPError):
+            raise response
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class _Connection(object):
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.time()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool(object):
+    """Non-blocking keep-alive connection pool, one per host."""
+
+    def __init__(self, scheme, host, port, ssl_context=None, max_connections=100, idle_timeout=60):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        if scheme == 'https' and ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._semaphore = None
+        self._idle = []
+
+    @property
+    def semaphore(self):
+        """Limits the number of connections. Created on first use, in the running event loop."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self._semaphore
+
+    async def acquire(self):
+        """Returns a tuple of (connection, is_reused)"""
+        now = time.time()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.reader.at_eof() or (self.idle_timeout and now - conn.last_used > self.idle_timeout):
+                conn.close()
+                continue
+            return conn, True
+        return await self.connect(), False
+
+    async def connect(self):
+        """Open a new connection"""
+        kwargs = {}
+        if self.scheme == 'https':
+            kwargs = {'ssl': self.ssl_context, 'server_hostname': self.host}
+        reader, writer = await asyncio.open_connection(self.host, self.port, **kwargs)
+        return _Connection(reader, writer)
+
+    def release(self, conn, reusable=True):
+        if reusable:
+            conn.last_used = time.time()
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class AsyncHTTPTransport(object):
+    """Minimal asyncio HTTP/1.1 transport that shares the client's cookie jar."""
+
+    MAX_REDIRECTS = 10
+
+    #: Methods that are sent again on a new connection if a reused connection fails
+    #: after the request was sent. Other requests may have been processed by the server.
+    IDEMPOTENT_METHODS = KeepAliveHandlerMixin.IDEMPOTENT_METHODS
+
+    def __init__(self, cookie_jar, ssl_context=None, max_connections=100, idle_timeout=60):
+        self.cookie_jar = cookie_jar
+        self.ssl_context = ssl_context
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._pools = {}
+
+    def _get_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = AsyncConnectionPool(
+                scheme, host, port, ssl_context=self.ssl_context,
+                max_connections=self.max_connections, idle_timeout=self.idle_timeout)
+            self._pools[key] = pool
+        return pool
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = {}
+
+    async def fetch(self, req, timeout=None):
+        """
+        Send a urllib request object and return a :class:`BufferedResponse`.
+        Redirects are followed and cookies are read from/stored into the cookie jar.
+
+        :param req: a ``compat_urllib_request.Request``
+        :param timeout: timeout in seconds
+        :return:
+        """
+        for _ in range(self.MAX_REDIRECTS):
+            try:
+                response = await asyncio.wait_for(self._fetch(req), timeout)
+            except asyncio.TimeoutError:
+                raise socket.timeout('timed out')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                raise compat_urllib_error.URLError(e)
+            self.cookie_jar.extract_cookies(response, req)
+            location = response.headers.get('Location')
+            if response.code not in (301, 302, 303, 307, 308) or not location:
+                return response
+            # follow redirects the same way urllib does
+            req = req.__class__(
+                compat_urllib_parse.urljoin(req.get_full_url(), location),
+                headers=dict(
+                    (k, v) for k, v in req.headers.items()
+                    if k.lower() not in ('content-length', 'content-type')),
+                origin_req_host=req.origin_req_host, unverifiable=True)
+        raise ClientError('Too many redirects.', code=response.code)
+
+    async def _fetch(self, req):
+        self.cookie_jar.add_cookie_header(req)
+        parsed_url = compat_urllib_parse_urlparse(req.get_full_url())
+        scheme = parsed_url.scheme
+        port = parsed_url.port or (443 if scheme == 'https' else 80)
+        host = parsed_url.hostname
+        data = req.data
+        method = req.get_method()
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items() if k not in headers))
+        headers = dict((name.title(), val) for name, val in headers.items())
+        headers.setdefault('Host', parsed_url.netloc)
+        headers.setdefault('Connection', 'keep-alive')
+        if data is not None:
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+            headers['Content-Length'] = str(len(data))
+
+        selector = req.selector or '/'
+        head = ['{0!s} {1!s} HTTP/1.1'.format(method, selector)]
+        head.extend('{0!s}: {1!s}'.format(k, v) for k, v in headers.items())
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+        if data:
+            payload += data
+
+        pool = self._get_pool(scheme, host, port)
+        async with pool.semaphore:
+            conn, is_reused = await pool.acquire()
+            while True:
+                is_sent = False
+                try:
+                    conn.writer.write(payload)
+                    await conn.writer.drain()
+                    is_sent = True
+                    response, will_close = await self._read_response(conn.reader, method, req.get_full_url())
+                    break
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    conn.close()
+                    if not (is_reused and (not is_sent or method in self.IDEMPOTENT_METHODS)):
+                        raise compat_urllib_error.URLError(e)
+                    # stale keep-alive connection, retry once on a fresh one
+                    conn, is_reused = await pool.connect(), False
+                except BaseException:
+                    conn.close()
+                    raise
+            pool.release(conn, reusable=not will_close)
+        return response
+
+    @staticmethod
+    async def _read_response(reader, method, url):
+        while True:
+            status_line = (await reader.readline()).decode('latin-1').strip()
+            if not status_line:
+                raise asyncio.IncompleteReadError(b'', None)
+            version, _, rest = status_line.partition(' ')
+            code, _, reason = rest.partition(' ')
+            code = int(code)
+            header_lines = []
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                header_lines.append(line)
+            if code != 100:
+                break
+        headers = parse_headers(BytesIO(b''.join(header_lines) + b'\r\n'))
+        reason = reason or responses.get(code, '')
+
+        connection = headers.get('Connection', '').lower()
+        will_close = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+        if method == 'HEAD' or code in (204, 304) or 100 <= code < 200:
+            body = b''
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if not size:
+                    # skip trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif headers.get('Content-Length') is not None:
+            body = await reader.readexactly(int(headers.get('Content-Length')))
+        else:
+            body = await reader.read()
+            will_close = True
+        return BufferedResponse(url, code, reason, headers, body), will_close
+
+
+def _coroutine_method(name):
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    return wrapper
+
+
+def _executor_method(name):
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(getattr(self.client, name), *args, **kwargs))
+    return wrapper
+
+
+class AsyncClient(object):
+    """
+    asyncio client for the private app api. Exposes the same endpoint methods as
+    :class:`Client`, as coroutines. Other attributes and properties (``settings``,
+    ``authenticated_user_id``, etc) are read from the underlying :class:`Client`.
+
+    .. code-block:: python
+
+        api = AsyncClient(user_name, password, settings=cached_settings)
+        results = await asyncio.gather(*[api.user_info(u) for u in user_ids])
+        await api.close()
+
+    If no saved ``cookie``/``settings`` are provided, the initial login is done
+    synchronously when the client is created.
+    """
+
+    # Methods that make several dependent requests using time-based ids.
+    # They are run in an executor with the synchronous client instead.
+    EXECUTOR_METHODS = (
+        'post_photo', 'post_video', 'post_photo_story',
+        'post_video_story', 'post_album',
+    )
+
+    def __init__(self, username, password, **kwargs):
+        """
+
+        :param username: Login username
+        :param password: Login password
+        :param kwargs: See :meth:`Client.__init__`, and below.
+            Proxies, ``media_info_batch_window`` and ``coalesce_requests`` are not supported.
+
+        :Keyword Arguments:
+            - **max_connections**: Maximum number of concurrent connections per host. Default: 100
+            - **pool_idle_timeout**: Seconds before an idle connection is discarded. Default: 60
+        """
+        if kwargs.get('proxy') or kwargs.get('proxy_handler'):
+            raise ValueError('Proxies are not supported by AsyncClient.')
+        # both wait for other threads' requests, which would block the event loop
+        if kwargs.get('media_info_batch_window') or kwargs.get('coalesce_requests'):
+            raise ValueError('media_info_batch_window and coalesce_requests are not supported by AsyncClient.')
+        max_connections = kwargs.pop('max_connections', 100)
+        pool_idle_timeout = kwargs.get('pool_idle_timeout', 60)
+        ssl_context = kwargs.get('custom_ssl_context')
+        if not kwargs.get('transport'):
+            kwargs.setdefault('keep_alive', True)
+
+        self.client = Client(username, password, **kwargs)
+        self.client.transport = ReplayTransport(self.client.transport)
+        self.transport = AsyncHTTPTransport(
+            self.client.cookie_jar, ssl_context=ssl_context,
+            max_connections=max_connections, idle_timeout=pool_idle_timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def _call(self, name, *args, **kwargs):
+        method = getattr(self.client, name)
+        transport = self.client.transport
+        transport.replay([])
+        try:
+            # no request is made, example for invalid arguments
+            return method(*args, **kwargs)
+        except PendingRequest as pending:
+            req = pending.request
+        finally:
+            transport.stop()
+        try:
+            outcome = await self.transport.fetch(req, timeout=self.client.timeout)
+        except Exception as e:     # replayed so that the endpoint handles it as usual
+            outcome = e
+
+        def run():
+            transport.replay([(req.get_method(), req.get_full_url(), outcome)], then_send=True)
+            try:
+                return method(*args, **kwargs)
+            except ReplayMismatch as e:
+                raise ClientError(
+                    '{0!s} cannot be run asynchronously, it does not make the same request '
+                    'when re-run. {1!s}'.format(name, e))
+            finally:
+                transport.stop()
+        return await asyncio.get_event_loop().run_in_executor(None, run)
+
+    async def close(self):
+        """Close all pooled connections."""
+        self.transport.close()
+        self.client.transport.close()
+
+
+def _endpoint_method_names():
+    names = set()
+    for cls in Client.__mro__:
+        if not cls.__name__.endswith('EndpointsMixin'):
+            continue
+        for name, value in vars(cls).items():
+            if name.startswith('_') or not callable(value):
+                continue
+            if isinstance(value, (staticmethod, classmethod)):
+                continue
+            if inspect.isgeneratorfunction(value):
+                # iterators such as iter_media_comments are left to the synchronous client
+                continue
+            names.add(name)
+    return names
+
+
+for _name in _endpoint_method_names():
+    if _name in AsyncClient.EXECUTOR_METHODS:
+        setattr(AsyncClient, _name, _executor_method(_name))
+    else:
+        setattr(AsyncClient, _name, _coroutine_method(_name))
@@ -0,0 +1,184 @@
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from .concurrency import RateLimiter
+
+#: The outcome of one item of a bulk call: the input ``item``,
+#: and either the endpoint ``result`` or the ``error`` it raised
+BulkResult = namedtuple('BulkResult', ['item', 'result', 'error'])
+
+
+class BulkMixin(object):
+    """Helpers that run many lookups concurrently."""
+
+    #: Endpoints that :meth:`bulk_user_info` can use
+    BULK_USER_INFO_METHODS = ('user_info', 'username_info', 'user_detail_info')
+
+    #: Number of user ids per ``friendships/show_many/`` call in :meth:`bulk_friendships_show`
+    FRIENDSHIPS_SHOW_MANY_CHUNK_SIZE = 100
+
+    #: Number of user ids per ``feed/reels_media/`` call in :meth:`harvest_reels`
+    REELS_MEDIA_BATCH_SIZE = 20
+
+    def _bulk_call(self, func, items, concurrency=8, rate_limit=None):
+        """
+        Call ``func`` for each item on a thread pool.
+
+        :param func: a function that takes an item
+        :param items: iterable of items
+        :param concurrency: number of threads
+        :param rate_limit: calls per second, or a :class:`RateLimiter` shared between calls
+        :return: a generator of :class:`BulkResult` in order of completion
+        """
+        if rate_limit and not isinstance(rate_limit, RateLimiter):
+            rate_limit = RateLimiter(rate_limit)
+
+        def call(item):
+            if rate_limit:
+                rate_limit.wait()
+            try:
+                return BulkResult(item, func(item), None)
+            except Exception as e:     # pylint: disable=broad-except
+                return BulkResult(item, None, e)
+
+        pool = ThreadPool(max(1, int(concurrency)))
+        try:
+            for outcome in pool.imap_unordered(call, items):
+                yield outcome
+        finally:
+            pool.terminate()
+
+    def bulk_user_info(self, ids, concurrency=8, rate_limit=None, method='user_info'):
+        """
+        Fetch the info for many users concurrently. Results are returned as they
+        complete. An error for one user is reported in its result and does not stop the others.
+
+        .. code-block:: python
+
+            for res in api.bulk_user_info(user_ids, concurrency=8, rate_limit=5):
+                if res.error:
+                    print('{0!s}: {1!s}'.format(res.item, res.error))
+                else:
+                    print(res.result['user']['username'])
+
+        :param ids: list of user ids, or user names for ``method='username_info'``
+        :param concurrency: Number of lookups in progress at a time
+        :param rate_limit: Maximum lookups per second, or a :class:`RateLimiter`
+            to share one limit across calls for the same account
+        :param method: ``user_info``, ``username_info`` or ``user_detail_info``
+        :return: a generator of :class:`BulkResult`
+        """
+        if method not in self.BULK_USER_INFO_METHODS:
+            raise ValueError('Invalid method: {0!s}'.format(method))
+        return self._bulk_call(
+            getattr(self, method), ids, concurrency=concurrency, rate_limit=rate_limit)
+
+    def bulk_friendships_show(self, user_ids, chunk_size=None, concurrency=4, rate_limit=None, refresh=False):
+        """
+        Get the friendship status with many users. The ids are deduplicated and split into
+        chunks that are sent concurrently with :meth:`friendships_show_many`.
+
+        Statuses are cached for ``friendship_status_ttl`` seconds (see :meth:`Client.__init__`),
+        so repeated checks of the same users are not sent again. A cached status does not reflect
+        changes made within that time, use ``refresh=True`` to bypass the cache.
+
+        :param user_ids: list of user ids
+        :param chunk_size: Number of user ids per request. Default: :attr:`FRIENDSHIPS_SHOW_MANY_CHUNK_SIZE`
+        :param concurrency: Number of requests in progress at a time
+        :param rate_limit: Maximum requests per second, or a :class:`RateLimiter`
+        :param refresh: Ignore cached statuses
+        :return: the merged results, in the same format as :meth:`friendships_show_many`.
+            If a chunk fails, its error is raised once the other chunks have completed.
+        """
+        cache = self.friendship_status_cache
+        statuses = {}
+        missing = []
+        seen = set()
+        for user_id in user_ids:
+            user_id = str(user_id)
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            status = cache.get(user_id) if cache is not None and not refresh else None
+            if status is None:
+                missing.append(user_id)
+            else:
+                statuses[user_id] = status
+
+        chunk_size = chunk_size or self.FRIENDSHIPS_SHOW_MANY_CHUNK_SIZE
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        error = None
+        for outcome in self._bulk_call(
+                self.friendships_show_many, chunks, concurrency=concurrency, rate_limit=rate_limit):
+            if outcome.error:
+                error = error or outcome.error
+                continue
+            for user_id, status in outcome.result.get('friendship_statuses', {}).items():
+                statuses[user_id] = status
+                if cache is not None:
+                    cache.set(user_id, status)
+        if error:
+            raise error
+        return {'status': 'ok', 'friendship_statuses': statuses}
+
+    def harvest_reels(self, users, seen=None, batch_size=None, concurrency=4, rate_limit=None):
+        """
+        Get the story reels of many users. The user ids are split into batches
+        that are fetched concurrently with :meth:`reels_media`, and reels are returned
+        as their batch completes.
+
+        Reels whose ``latest_reel_media`` is the same as in ``seen`` are skipped, and
+        ``seen`` is updated with the reels returned. Keep ``seen`` between runs to only get
+        the reels that have changed. The entries of :meth:`reels_tray` include
+        ``latest_reel_media``, so unchanged reels in the tray are not requested at all.
+
+        .. code-block:: python
+
+            seen = {}
+            tray = api.reels_tray().get('tray', [])
+            for reel in api.harvest_reels(tray, seen=seen):
+                print(reel['id'], len(reel.get('items', [])))
+
+        :param users: list of user ids, or of reel tray entries
+        :param seen: dict of ``latest_reel_media`` by user id from an earlier run
+        :param batch_size: Number of user ids per request. Default: :attr:`REELS_MEDIA_BATCH_SIZE`
+        :param concurrency: Number of requests in progress at a time
+        :param rate_limit: Maximum requests per second, or a :class:`RateLimiter`
+        :return: a generator of reels. If a batch fails, its error is raised once the reels
+            of the other batches have been returned.
+        """
+        if seen is None:
+            seen = {}
+        user_ids = []
+        queued = set()
+        for user in users:
+            if isinstance(user, dict):
+                user_id = str(user.get('id'))
+                latest_reel_media = user.get('latest_reel_media')
+                if latest_reel_media and seen.get(user_id) == latest_reel_media:
+                    continue
+            else:
+                user_id = str(user)
+            if user_id in queued:
+                continue
+            queued.add(user_id)
+            user_ids.append(user_id)
+
+        batch_size = batch_size or self.REELS_MEDIA_BATCH_SIZE
+        batches = [user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size)]
+        error = None
+        for outcome in self._bulk_call(
+                self.reels_media, batches, concurrency=concurrency, rate_limit=rate_limit):
+            if outcome.error:
+                error = error or outcome.error
+                continue
+            for user_id, reel in outcome.result.get('reels', {}).items():
+                user_id = str(user_id)
+                latest_reel_media = reel.get('latest_reel_media')
+                if latest_reel_media:
+                    if seen.get(user_id) == latest_reel_media:
+                        continue
+                    seen[user_id] = latest_reel_media
+                yield reel
+        if error:
+            raise error
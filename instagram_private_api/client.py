@@ -9,13 +9,11 @@ import logging
 import hmac
 import hashlib
 import uuid
-import json
 import re
 import time
 import random
 from datetime import datetime
-import gzip
-from io import BytesIO
+import codecs
 import warnings
 from socket import timeout, error as SocketError
 from ssl import SSLError
@@ -36,7 +34,16 @@ except NameError:  # Python 2:
         pass
 
 from .constants import Constants
-from .http import ClientCookieJar
+from .http import ClientCookieJar, iter_response_body
+from .jsonstream import JSONItemStream
+from .codec import get_codec
+from .pagination import PaginationMixin
+from .bulk import BulkMixin
+from .concurrency import BatchLoader, SingleFlight
+from .cache import TTLCache, ResponseCache
+from .transport import UrllibTransport, PooledTransport
+from .cassette import Cassette, CassetteTransport
+from .events import EventHooks, NULL_TRACE, endpoint_template, monotonic
 from .endpoints import (
     AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
     FriendshipsEndpointsMixin, LiveEndpointsMixin, MediaEndpointsMixin,
@@ -60,7 +67,7 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
              MiscEndpointsMixin, LocationsEndpointsMixin, TagsEndpointsMixin,
              UsersEndpointsMixin, UploadEndpointsMixin, UsertagsEndpointsMixin,
              CollectionsEndpointsMixin, HighlightsEndpointsMixin,
-             IGTVEndpointsMixin, object):
+             IGTVEndpointsMixin, PaginationMixin, BulkMixin, object):
     """Main API client class for the private app api."""
 
     API_URL = 'https://i.instagram.com/api/{version!s}/'
@@ -71,6 +78,11 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
     SIG_KEY_VERSION = Constants.SIG_KEY_VERSION
     APPLICATION_ID = Constants.APPLICATION_ID
 
+    #: Client kwargs used to build the transport, that cannot be used with a transport instance
+    TRANSPORT_OPTIONS = (
+        'proxy', 'proxy_handler', 'custom_ssl_context', 'keep_alive',
+        'pool_maxsize', 'pool_idle_timeout', 'pool_host_options')
+
     def __init__(self, username, password, **kwargs):
         """
 
@@ -88,6 +100,31 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
             - **on_login**: Callback after successful login
             - **proxy**: Specify a proxy ex: 'http://127.0.0.1:8888' (ALPHA)
             - **proxy_handler**: Specify your own proxy handler
+            - **keep_alive**: Reuse persistent connections instead of opening a new one per request.
+              Default: False
+            - **pool_maxsize**: Maximum number of idle connections kept per host. Default: 10
+            - **pool_idle_timeout**: Seconds before an idle connection is discarded. Default: 60
+            - **pool_host_options**: dict of per-host pool overrides, example
+              ``{'i.instagram.com': {'maxsize': 20, 'idle_timeout': 30}}``
+            - **transport**: A :class:`Transport` subclass, or an instance, to send requests with.
+              Default: :class:`UrllibTransport`, or :class:`PooledTransport` if ``keep_alive`` is set.
+              An instance is used as is, so the proxy, ssl context, ``keep_alive`` and pool options
+              cannot be used with it.
+            - **cassette**: Record the http traffic to, or replay it from, a file.
+              A path, or a :class:`Cassette` instance. Default: None
+            - **json_codec**: JSON backend used to sign requests and parse responses, ``json`` or ``orjson``,
+              or a :class:`JSONCodec` instance. Falls back to ``json`` if orjson is not installed. Default: ``json``
+            - **media_info_batch_window**: Seconds to wait to batch concurrent :meth:`media_info` calls
+              into :meth:`medias_info` calls. Default: 0 (no batching)
+            - **coalesce_requests**: Share one request between concurrent calls of the same unsigned
+              GET endpoint and query, example :meth:`user_info` from several threads. Default: False
+            - **response_cache**: Cache the responses of read-only endpoints such as :meth:`user_info`.
+              True, or a :class:`ResponseCache` instance, example :class:`SQLiteResponseCache`
+              to keep responses on disk. Default: None
+            - **friendship_status_ttl**: Seconds that :meth:`bulk_friendships_show` caches statuses for.
+              Default: 60. Use 0 to disable the cache
+            - **event_hooks**: A list of callables that are called with a :class:`RequestEvent`
+              for each phase of each request, with its timings. See :class:`EventHooks`
         :return:
         """
         self.username = username
@@ -96,8 +133,23 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
         self.drop_incompat_keys = kwargs.pop('drop_incompat_keys', False)
         self.api_url = kwargs.pop('api_url', None) or self.API_URL
         self.timeout = kwargs.pop('timeout', 15)
+        self.json_codec = get_codec(kwargs.pop('json_codec', None))
         self.on_login = kwargs.pop('on_login', None)
+        self.event_hooks = EventHooks(kwargs.pop('event_hooks', None))
         self.logger = logger
+        # per-session values that are expensive to build, see _session_value()
+        self._session_values = {}
+        media_info_batch_window = kwargs.pop('media_info_batch_window', 0)
+        self.media_info_loader = None
+        if media_info_batch_window:
+            self.media_info_loader = BatchLoader(
+                self._medias_info_by_id, window=media_info_batch_window,
+                max_batch_size=self.MEDIA_INFO_BATCH_SIZE)
+        response_cache = kwargs.pop('response_cache', None)
+        self.response_cache = ResponseCache() if response_cache is True else response_cache
+        self.in_flight_requests = SingleFlight() if kwargs.pop('coalesce_requests', False) else None
+        friendship_status_ttl = kwargs.pop('friendship_status_ttl', 60)
+        self.friendship_status_cache = TTLCache(friendship_status_ttl) if friendship_status_ttl else None
 
         user_settings = kwargs.pop('settings', None) or {}
         self.uuid = (
@@ -163,7 +215,16 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
         cookie_jar = ClientCookieJar(cookie_string=cookie_string)
         if cookie_string and cookie_jar.auth_expires and int(time.time()) >= cookie_jar.auth_expires:
             raise ClientCookieExpiredError('Cookie expired at {0!s}'.format(cookie_jar.auth_expires))
-        cookie_handler = compat_urllib_request.HTTPCookieProcessor(cookie_jar)
+
+        transport = kwargs.pop('transport', None)
+        if transport is not None and not isinstance(transport, type):
+            conflicting = [
+                name for name in self.TRANSPORT_OPTIONS
+                if kwargs.get(name) is not None and kwargs.get(name) is not False]
+            if conflicting:
+                raise ValueError(
+                    '{0!s} cannot be used with a transport instance, '
+                    'configure the transport instead'.format(', '.join(conflicting)))
 
         proxy_handler = kwargs.pop('proxy_handler', None)
         if not proxy_handler:
@@ -176,25 +237,28 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
                     proxy_handler = compat_urllib_request.ProxyHandler({'https': proxy_address})
                 else:
                     raise ValueError('Invalid proxy argument: {0!s}'.format(proxy))
-        handlers = []
-        if proxy_handler:
-            handlers.append(proxy_handler)
 
         # Allow user to override custom ssl context where possible
         custom_ssl_context = kwargs.pop('custom_ssl_context', None)
-        try:
-            https_handler = compat_urllib_request.HTTPSHandler(context=custom_ssl_context)
-        except TypeError:
-            # py version < 2.7.9
-            https_handler = compat_urllib_request.HTTPSHandler()
-
-        handlers.extend([
-            compat_urllib_request.HTTPHandler(),
-            https_handler,
-            cookie_handler])
-        opener = compat_urllib_request.build_opener(*handlers)
-        opener.cookie_jar = cookie_jar
-        self.opener = opener
+        keep_alive = kwargs.pop('keep_alive', False)
+        transport = transport or (PooledTransport if keep_alive else UrllibTransport)
+        if isinstance(transport, type):
+            transport_kwargs = {}
+            if issubclass(transport, UrllibTransport):
+                transport_kwargs.update({'proxy_handler': proxy_handler, 'ssl_context': custom_ssl_context})
+            if issubclass(transport, PooledTransport):
+                transport_kwargs.update({
+                    'maxsize': kwargs.pop('pool_maxsize', 10),
+                    'idle_timeout': kwargs.pop('pool_idle_timeout', 60),
+                    'host_options': kwargs.pop('pool_host_options', None),
+                })
+            transport = transport(cookie_jar, **transport_kwargs)
+        cassette = kwargs.pop('cassette', None)
+        if cassette:
+            if not isinstance(cassette, Cassette):
+                cassette = Cassette(cassette)
+            transport = CassetteTransport(transport, cassette)
+        self.transport = transport
 
         # ad_id must be initialised after cookie_jar/opener because
         # it relies on self.authenticated_user_name
@@ -213,7 +277,8 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
     @property
     def settings(self):
         """Helper property that extracts the settings that you should cache
-        in addition to username and password."""
+        in addition to username and password. The settings only contain
+        json serializable values."""
         return {
             'uuid': self.uuid,
             'device_id': self.device_id,
@@ -223,20 +288,41 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
             'created_ts': int(time.time())
         }
 
+    def _session_value(self, name, inputs, build):
+        """
+        Get a cached value that only needs to be rebuilt when its inputs change.
+
+        :param name: cache key
+        :param inputs: a tuple of the values that the value is built from
+        :param build: callable that builds the value
+        :return:
+        """
+        cached = self._session_values.get(name)
+        if cached is None or cached[0] != inputs:
+            cached = (inputs, build())
+            self._session_values[name] = cached
+        return cached[1]
+
     @property
     def user_agent(self):
         """Returns the useragent string that the client is currently using."""
-        return Constants.USER_AGENT_FORMAT.format(**{
-            'app_version': self.app_version,
-            'android_version': self.android_version,
-            'android_release': self.android_release,
-            'brand': self.phone_manufacturer,
-            'device': self.phone_device,
-            'model': self.phone_model,
-            'dpi': self.phone_dpi,
-            'resolution': self.phone_resolution,
-            'chipset': self.phone_chipset,
-            'version_code': self.version_code})
+        inputs = (
+            self.app_version, self.android_version, self.android_release,
+            self.phone_manufacturer, self.phone_device, self.phone_model,
+            self.phone_dpi, self.phone_resolution, self.phone_chipset, self.version_code)
+        return self._session_value(
+            'user_agent', inputs,
+            lambda: Constants.USER_AGENT_FORMAT.format(**{
+                'app_version': self.app_version,
+                'android_version': self.android_version,
+                'android_release': self.android_release,
+                'brand': self.phone_manufacturer,
+                'device': self.phone_device,
+                'model': self.phone_model,
+                'dpi': self.phone_dpi,
+                'resolution': self.phone_resolution,
+                'chipset': self.phone_chipset,
+                'version_code': self.version_code}))
 
     @user_agent.setter
     def user_agent(self, value):
@@ -316,28 +402,9 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
         }
 
     def get_cookie_value(self, key, domain=''):
-        now = int(time.time())
-        eternity = now + 100 * 365 * 24 * 60 * 60   # future date for non-expiring cookies
         if not domain:
-            domain = compat_urllib_parse_urlparse(self.API_URL).netloc
-
-        for cookie in sorted(
-                self.cookie_jar, key=lambda c: c.expires or eternity, reverse=True):
-            # don't return expired cookie
-            if cookie.expires and cookie.expires < now:
-                continue
-            # cookie domain may be i.instagram.com or .instagram.com
-            cookie_domain = cookie.domain
-            # simple domain matching
-            if cookie_domain.startswith('.'):
-                cookie_domain = cookie_domain[1:]
-            if not domain.endswith(cookie_domain):
-                continue
-
-            if cookie.name.lower() == key.lower():
-                return cookie.value
-
-        return None
+            domain = compat_urllib_parse_urlparse(self.api_url).hostname
+        return self.cookie_jar.get_cookie_value(key, domain)
 
     @property
     def csrftoken(self):
@@ -362,12 +429,18 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
     @property
     def phone_id(self):
         """Current phone ID. For use in certain functions."""
-        return self.generate_uuid(return_hex=False, seed=self.device_id)
+        return self._session_value(
+            'phone_id', (self.device_id, ),
+            lambda: self.generate_uuid(return_hex=False, seed=self.device_id))
 
     @property
     def timezone_offset(self):
         """Timezone offset in seconds. For use in certain functions."""
-        return int(round((datetime.now() - datetime.utcnow()).total_seconds()))
+        # the offset only changes with daylight saving time
+        is_dst = time.localtime().tm_isdst > 0
+        return self._session_value(
+            'timezone_offset', (is_dst, ),
+            lambda: int(round((datetime.now() - datetime.utcnow()).total_seconds())))
 
     @property
     def rank_token(self):
@@ -386,25 +459,59 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
     @property
     def cookie_jar(self):
         """The client's cookiejar instance."""
-        return self.opener.cookie_jar
+        return self.transport.cookie_jar
+
+    @property
+    def opener(self):
+        """
+        The urllib opener used by the client's transport, if any.
+        Setting it replaces the transport with a :class:`UrllibTransport` that uses the opener.
+        """
+        return getattr(self.transport, 'opener', None)
+
+    @opener.setter
+    def opener(self, opener):
+        cookie_jar = getattr(opener, 'cookie_jar', None) or self.cookie_jar
+        transport = UrllibTransport(cookie_jar, opener=opener)
+        if isinstance(self.transport, CassetteTransport):
+            # keep recording to, or replaying from, the cassette
+            self.transport.transport.close()
+            self.transport.transport = transport
+            self.transport.cookie_jar = cookie_jar
+            self.transport.keep_alive = transport.keep_alive
+        else:
+            self.transport.close()
+            self.transport = transport
+
+    @property
+    def keep_alive(self):
+        """Whether the client's transport reuses connections"""
+        return self.transport.keep_alive
 
     @property
     def default_headers(self):
-        return {
-            'User-Agent': self.user_agent,
-            'Connection': 'close',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US',
-            'Accept-Encoding': 'gzip, deflate',
-            'X-IG-Capabilities': self.ig_capabilities,
-            'X-IG-Connection-Type': 'WIFI',
-            'X-IG-Connection-Speed': '{0:d}kbps'.format(random.randint(1000, 5000)),
-            'X-IG-App-ID': self.application_id,
-            'X-IG-Bandwidth-Speed-KBPS': '-1.000',
-            'X-IG-Bandwidth-TotalBytes-B': '0',
-            'X-IG-Bandwidth-TotalTime-MS': '0',
-            'X-FB-HTTP-Engine': Constants.FB_HTTP_ENGINE,
-        }
+        """A new dict of the headers sent with every request."""
+        user_agent = self.user_agent
+        keep_alive = self.keep_alive
+        headers = dict(self._session_value(
+            'default_headers', (user_agent, keep_alive, self.ig_capabilities, self.application_id),
+            lambda: {
+                'User-Agent': user_agent,
+                'Connection': 'keep-alive' if keep_alive else 'close',
+                'Accept': '*/*',
+                'Accept-Language': 'en-US',
+                'Accept-Encoding': 'gzip, deflate',
+                'X-IG-Capabilities': self.ig_capabilities,
+                'X-IG-Connection-Type': 'WIFI',
+                'X-IG-App-ID': self.application_id,
+                'X-IG-Bandwidth-Speed-KBPS': '-1.000',
+                'X-IG-Bandwidth-TotalBytes-B': '0',
+                'X-IG-Bandwidth-TotalTime-MS': '0',
+                'X-FB-HTTP-Engine': Constants.FB_HTTP_ENGINE,
+            }))
+        # varies per request
+        headers['X-IG-Connection-Speed'] = '{0:d}kbps'.format(random.randint(1000, 5000))
+        return headers
 
     @property
     def radio_type(self):
@@ -467,21 +574,54 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
         return self.generate_uuid(False, modified_seed)
 
     @staticmethod
-    def _read_response(response):
+    def _read_response(response, stats=None):
         """
         Extract the response body from a http response.
 
         :param response:
+        :param stats: optional dict to record the read times and byte counts in
         :return:
         """
-        if response.info().get('Content-Encoding') == 'gzip':
-            buf = BytesIO(response.read())
-            res = gzip.GzipFile(fileobj=buf).read().decode('utf8')
-        else:
-            res = response.read().decode('utf8')
-        return res
+        decoder = codecs.getincrementaldecoder('utf8')()
+        res = [decoder.decode(chunk) for chunk in iter_response_body(response, stats=stats)]
+        res.append(decoder.decode(b'', final=True))
+        return ''.join(res)
+
+    def _iter_response_body(self, response, stats=None):
+        """Read the response body in chunks, raising network errors as ClientConnectionError."""
+        try:
+            for chunk in iter_response_body(response, stats=stats):
+                yield chunk
+        except (SSLError, timeout, SocketError,
+                compat_http_client.HTTPException,
+                ConnectionError) as connection_error:
+            raise ClientConnectionError('{} {}'.format(
+                connection_error.__class__.__name__, str(connection_error)))
+        finally:
+            response.close()
 
-    def _call_api(self, endpoint, params=None, query=None, return_response=False, unsigned=False, version='v1'):
+    @staticmethod
+    def _check_response(json_response, code):
+        """
+        Raise the appropriate error for a parsed api response that is not ok.
+
+        :param json_response: parsed json response
+        :param code: http status code
+        :return:
+        """
+        if json_response.get('message', '') == 'login_required':
+            raise ClientLoginRequiredError(
+                json_response.get('message'), code=code,
+                error_response=json_response)
+
+        # not from oembed or an ok response
+        if not json_response.get('provider_url') and json_response.get('status', '') != 'ok':
+            raise ClientError(
+                json_response.get('message', 'Unknown error'), code=code,
+                error_response=json_response)
+
+    def _call_api(self, endpoint, params=None, query=None, return_response=False, unsigned=False, version='v1',
+                  stream_path=None):
         """
         Calls the private api.
 
@@ -491,8 +631,14 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
         :param return_response: return the response instead of the parsed json object
         :param unsigned: use post params as-is without signing
         :param version: for the versioned api base url. Default 'v1'.
+        :param stream_path: dotted path of a list in the response, example 'users'.
+            If specified, a :class:`JSONItemStream` that yields the list items as the response
+            is read is returned instead of the parsed json object. The rest of the response,
+            including pagination fields such as ``next_max_id``, is available from the
+            stream's ``result`` once it is exhausted.
         :return:
         """
+        start = monotonic()
         url = '{0}{1}'.format(self.api_url.format(version=version), endpoint)
         if query:
             url += ('?' if '?' not in endpoint else '&') + compat_urllib_parse.urlencode(query)
@@ -505,7 +651,7 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
                 data = ''.encode('ascii')
             else:
                 if not unsigned:
-                    json_params = json.dumps(params, separators=(',', ':'))
+                    json_params = self.json_codec.dumps(params)
                     hash_sig = self._generate_signature(json_params)
                     post_params = {
                         'ig_sig_key_version': self.key_version,
@@ -517,10 +663,78 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
                 data = compat_urllib_parse.urlencode(post_params).encode('ascii')
 
         req = compat_urllib_request.Request(url, data, headers=headers)
+        trace = self.event_hooks.trace(
+            req, endpoint_template(endpoint),
+            account_id=self.authenticated_user_id if self.event_hooks else None, start=start)
+        trace.add_phase('prepare', start, monotonic())
         try:
-            self.logger.debug('REQUEST: {0!s} {1!s}'.format(url, req.get_method()))
+            return self._call_api_traced(req, endpoint, data, trace, return_response, stream_path)
+        except Exception as e:
+            trace.finish(error=e)
+            raise
+
+    def _call_api_traced(self, req, endpoint, data, trace, return_response, stream_path):
+        """The rest of :meth:`_call_api`, once the request is built."""
+        url = req.get_full_url()
+        cache_key = None
+        cache_ttl = None
+        cached = None
+        if self.response_cache is not None and not (return_response or stream_path):
+            cache_ttl = self.response_cache.ttl_for(endpoint)
+            if cache_ttl:
+                # responses can differ by account
+                cache_key = '{0!s}\n{1!s}'.format(self.authenticated_user_id or '', url)
+                if data is not None:
+                    cache_key += '\n' + data.decode('ascii')
+                cached = self.response_cache.get(cache_key)
+        if cached:
+            # parsed again so that the cached response is never patched
+            code, response_content = cached
+            trace.source = 'cache'
+        elif data is None and not (return_response or stream_path) and self.in_flight_requests:
+            # concurrent identical GETs share one request, each caller parses its own copy
+            trace.source = 'shared'
+            code, response_content = self.in_flight_requests.do(url, self._fetch_response_content, req, trace)
+        else:
+            response = self._send_request(req, data, trace)
+            if return_response:
+                trace.finish()
+                return response
+
+            if stream_path:
+                self.logger.debug('RESPONSE: {0:d} streaming {1!s}'.format(response.code, stream_path))
+                code = response.code
+
+                def on_complete(json_response):
+                    self._check_response(json_response, code)
+                    trace.finish()
+
+                return JSONItemStream(
+                    self._iter_response_body(response, trace.stats), stream_path, on_complete=on_complete)
+
+            code, response_content = self._response_content(response, trace)
+
+        with trace.phase('json'):
+            json_response = self.json_codec.loads(response_content)
+        self._check_response(json_response, code)
+        if cache_ttl:
+            self.response_cache.set(cache_key, (code, response_content), ttl=cache_ttl)
+        trace.finish(status=code)
+        return json_response
+
+    def _send_request(self, req, data=None, trace=NULL_TRACE):
+        """
+        Send a request.
+
+        :param req: the request
+        :param data: the request body, for logging
+        :param trace: the :class:`RequestTrace` of the request
+        :return: the response
+        """
+        try:
+            self.logger.debug('REQUEST: {0!s} {1!s}'.format(req.get_full_url(), req.get_method()))
             self.logger.debug('DATA: {0!s}'.format(data))
-            response = self.opener.open(req, timeout=self.timeout)
+            return trace.send(self.transport, req, timeout=self.timeout)
         except compat_urllib_error.HTTPError as e:
             error_response = self._read_response(e)
             self.logger.debug('RESPONSE: {0:d} {1!s}'.format(e.code, error_response))
@@ -533,22 +747,16 @@ class Client(AccountsEndpointsMixin, DiscoverEndpointsMixin, FeedEndpointsMixin,
             raise ClientConnectionError('{} {}'.format(
                 connection_error.__class__.__name__, str(connection_error)))
 
-        if return_response:
-            return response
+    def _response_content(self, response, trace=NULL_TRACE):
+        """
+        Read a response.
 
-        response_content = self._read_response(response)
+        :return: tuple of the status code and the decoded body
+        """
+        response_content = self._read_response(response, trace.stats)
         self.logger.debug('RESPONSE: {0:d} {1!s}'.format(response.code, response_content))
-        json_response = json.loads(response_content)
+        return response.code, response_content
 
-        if json_response.get('message', '') == 'login_required':
-            raise ClientLoginRequiredError(
-                json_response.get('message'), code=response.code,
-                error_response=json.dumps(json_response))
-
-        # not from oembed or an ok response
-        if not json_response.get('provider_url') and json_response.get('status', '') != 'ok':
-            raise ClientError(
-                json_response.get('message', 'Unknown error'), code=response.code,
-                error_response=json.dumps(json_response))
-
-        return json_response
+    def _fetch_response_content(self, req, trace=NULL_TRACE):
+        """Send a request and read the response."""
+        return self._response_content(self._send_request(req, trace=trace), trace)
@@ -0,0 +1,207 @@
+import sys
+import threading
+import time
+
+
+class BackgroundCall(object):
+    """Runs a function in a daemon thread and holds on to its outcome."""
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._result = None
+        self._exc_info = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._func(*self._args, **self._kwargs)
+        except Exception:   # pylint: disable=broad-except
+            self._exc_info = sys.exc_info()
+
+    def done(self):
+        """Whether the call has completed."""
+        return not self._thread.is_alive()
+
+    def result(self, timeout=None):
+        """
+        Wait for the call to complete and return its result,
+        or raise the exception raised by the call.
+
+        :param timeout: seconds to wait for
+        :return:
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise RuntimeError('Call did not complete in time')
+        if self._exc_info:
+            raise self._exc_info[1]
+        return self._result
+
+
+class RateLimiter(object):
+    """
+    Spaces out calls to at most ``rate`` per second, across threads.
+    Share one instance between the tasks that use the same account.
+    """
+
+    def __init__(self, rate):
+        """
+
+        :param rate: calls per second
+        """
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0')
+        self.interval = 1.0 / rate
+        self._next_time = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.time()
+            delay = self._next_time - now
+            self._next_time = max(self._next_time, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _PendingResult(object):
+    """The result of a key in a :class:`BatchLoader` batch."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._error = None
+
+    def set(self, value=None, error=None):
+        self._value = value
+        self._error = error
+        self._event.set()
+
+    def get(self):
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class BatchLoader(object):
+    """
+    Coalesces single key lookups made from concurrent threads within ``window``
+    seconds into calls of ``batch_func`` with up to ``max_batch_size`` unique keys,
+    and hands each caller the result for its key.
+    """
+
+    def __init__(self, batch_func, window=0.01, max_batch_size=50):
+        """
+
+        :param batch_func: a function that takes a list of keys and returns a dict
+            of results by key. An exception as a key's result is raised to its callers.
+        :param window: seconds to wait for more keys before a batch is sent
+        :param max_batch_size: maximum number of keys per batch
+        """
+        self.batch_func = batch_func
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._keys = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        """
+        Get the result for a key. Blocks until the batch with the key has completed.
+
+        :param key:
+        :return:
+        """
+        batch = None
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingResult()
+                self._keys.append(key)
+                if len(self._keys) >= self.max_batch_size:
+                    batch = self._take_batch()
+                elif not self._timer:
+                    self._timer = threading.Timer(self.window, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return pending.get()
+
+    def _take_batch(self):
+        """Take the pending keys. Must be called with the lock held."""
+        batch = [(key, self._pending[key]) for key in self._keys]
+        self._pending = {}
+        self._keys = []
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        try:
+            results = self.batch_func([key for key, _ in batch])
+        except Exception as e:     # pylint: disable=broad-except
+            for _, pending in batch:
+                pending.set(error=e)
+            return
+        for key, pending in batch:
+            if key not in results:
+                pending.set(error=KeyError(key))
+            elif isinstance(results[key], Exception):
+                pending.set(error=results[key])
+            else:
+                pending.set(results[key])
+
+
+class SingleFlight(object):
+    """
+    Runs one call at a time per key. Callers that ask for a key while its call
+    is in progress wait for, and share, its result instead of calling again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call ``func`` unless a call for ``key`` is already in progress,
+        in which case wait for it and return its result or raise its error.
+
+        :param key:
+        :param func:
+        :return:
+        """
+        with self._lock:
+            pending = self._calls.get(key)
+            is_leader = pending is None
+            if is_leader:
+                pending = self._calls[key] = _PendingResult()
+        if not is_leader:
+            return pending.get()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            pending.set(error=e)
+            raise
+        else:
+            pending.set(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
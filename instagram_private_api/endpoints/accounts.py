@@ -9,6 +9,7 @@ from ..errors import (
 )
 from ..http import MultipartFormDataEncoder
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 from socket import timeout, error as SocketError
 from ssl import SSLError
 try:
@@ -78,7 +79,8 @@ class AccountsEndpointsMixin(object):
         params = self.authenticated_params
         res = self._call_api('accounts/current_user/', params=params, query={'edit': 'true'})
         if self.auto_patch:
-            ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def edit_profile(self, first_name, biography, external_url, email, phone_number, gender):
@@ -110,7 +112,8 @@ class AccountsEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api('accounts/edit_profile/', params=params)
         if self.auto_patch:
-            ClientCompatPatch.user(res.get('user'))
+            with compat_patch_phase():
+                ClientCompatPatch.user(res.get('user'))
         return res
 
     def remove_profile_picture(self):
@@ -118,7 +121,8 @@ class AccountsEndpointsMixin(object):
         res = self._call_api(
             'accounts/remove_profile_picture/', params=self.authenticated_params)
         if self.auto_patch:
-            ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def change_profile_picture(self, photo_data):
@@ -149,7 +153,7 @@ class AccountsEndpointsMixin(object):
         req = compat_urllib_request.Request(endpoint_url, body, headers=headers)
         try:
             self.logger.debug('POST {0!s}'.format(endpoint_url))
-            response = self.opener.open(req, timeout=self.timeout)
+            response = self.transport.send(req, timeout=self.timeout)
         except compat_urllib_error.HTTPError as e:
             error_response = self._read_response(e)
             self.logger.debug('RESPONSE: {0:d} {1!s}'.format(e.code, error_response))
@@ -165,7 +169,8 @@ class AccountsEndpointsMixin(object):
         json_response = json.loads(post_response)
 
         if self.auto_patch:
-            ClientCompatPatch.user(json_response['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(json_response['user'], drop_incompat_keys=self.drop_incompat_keys)
 
         return json_response
 
@@ -173,14 +178,16 @@ class AccountsEndpointsMixin(object):
         """Make account private"""
         res = self._call_api('accounts/set_private/', params=self.authenticated_params)
         if self.auto_patch:
-            ClientCompatPatch.list_user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.list_user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def set_account_public(self):
         """Make account public"""""
         res = self._call_api('accounts/set_public/', params=self.authenticated_params)
         if self.auto_patch:
-            ClientCompatPatch.list_user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.list_user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def logout(self):
@@ -1,5 +1,6 @@
 import json
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class CollectionsEndpointsMixin(object):
@@ -18,8 +19,9 @@ class CollectionsEndpointsMixin(object):
         endpoint = 'feed/collection/{collection_id!s}/'.format(**{'collection_id': collection_id})
         res = self._call_api(endpoint, query=kwargs)
         if self.auto_patch and res.get('items'):
-            [ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', []) if m.get('media')]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', []) if m.get('media')]
         return res
 
     def create_collection(self, name, added_media_ids=None):
@@ -2,6 +2,7 @@ import warnings
 
 from .common import ClientDeprecationWarning
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class DiscoverEndpointsMixin(object):
@@ -19,8 +20,9 @@ class DiscoverEndpointsMixin(object):
         query.update(kwargs)
         res = self._call_api('discover/explore/', query=query)
         if self.auto_patch:
-            [ClientCompatPatch.media(item['media'], drop_incompat_keys=self.drop_incompat_keys)
-             if item.get('media') else item for item in res['items']]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(item['media'], drop_incompat_keys=self.drop_incompat_keys)
+                 if item.get('media') else item for item in res['items']]
         return res
 
     def discover_channels_home(self):       # pragma: no cover
@@ -31,10 +33,11 @@ class DiscoverEndpointsMixin(object):
 
         res = self._call_api('discover/channels_home/')
         if self.auto_patch:
-            for item in res.get('items', []):
-                for row_item in item.get('row_items', []):
-                    if row_item.get('media'):
-                        ClientCompatPatch.media(row_item['media'])
+            with compat_patch_phase():
+                for item in res.get('items', []):
+                    for row_item in item.get('row_items', []):
+                        if row_item.get('media'):
+                            ClientCompatPatch.media(row_item['media'])
         return res
 
     def discover_chaining(self, user_id):
@@ -46,7 +49,8 @@ class DiscoverEndpointsMixin(object):
         """
         res = self._call_api('discover/chaining/', query={'target_id': user_id})
         if self.auto_patch:
-            [ClientCompatPatch.list_user(user) for user in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(user) for user in res.get('users', [])]
         return res
 
     def discover_top_live(self, **kwargs):
@@ -2,6 +2,7 @@ import warnings
 
 from .common import ClientDeprecationWarning
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 from ..compat import compat_urllib_parse
 from ..utils import raise_if_invalid_rank_token
 
@@ -20,8 +21,9 @@ class FeedEndpointsMixin(object):
         """
         res = self._call_api('feed/liked/', query=kwargs)
         if self.auto_patch and res.get('items'):
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def feed_timeline(self, **kwargs):
@@ -44,9 +46,10 @@ class FeedEndpointsMixin(object):
         params.update(kwargs)
         res = self._call_api('feed/timeline/', params=params, unsigned=True)
         if self.auto_patch:
-            [ClientCompatPatch.media(m['media_or_ad'], drop_incompat_keys=self.drop_incompat_keys)
-             if m.get('media_or_ad') else m
-             for m in res.get('feed_items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m['media_or_ad'], drop_incompat_keys=self.drop_incompat_keys)
+                 if m.get('media_or_ad') else m
+                 for m in res.get('feed_items', [])]
         return res
 
     def feed_popular(self, **kwargs):   # pragma: no cover
@@ -63,8 +66,9 @@ class FeedEndpointsMixin(object):
         query.update(kwargs)
         res = self._call_api('feed/popular/', query=query)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def user_feed(self, user_id, **kwargs):
@@ -81,8 +85,9 @@ class FeedEndpointsMixin(object):
         res = self._call_api(endpoint, query=kwargs)
 
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def self_feed(self, **kwargs):
@@ -102,19 +107,21 @@ class FeedEndpointsMixin(object):
         endpoint = 'feed/user/{user_name!s}/username/'.format(**{'user_name': user_name})
         res = self._call_api(endpoint, query=kwargs)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def reels_tray(self, **kwargs):
         """Get story reels tray"""
         res = self._call_api('feed/reels_tray/', query=kwargs)
         if self.auto_patch:
-            for u in res.get('tray', []):
-                if not u.get('items'):
-                    continue
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in u.get('items', [])]
+            with compat_patch_phase():
+                for u in res.get('tray', []):
+                    if not u.get('items'):
+                        continue
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in u.get('items', [])]
         return res
 
     def user_reel_media(self, user_id, **kwargs):
@@ -128,8 +135,9 @@ class FeedEndpointsMixin(object):
         endpoint = 'feed/user/{user_id!s}/reel_media/'.format(**{'user_id': user_id})
         res = self._call_api(endpoint, query=kwargs)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def reels_media(self, user_ids, **kwargs):
@@ -146,12 +154,13 @@ class FeedEndpointsMixin(object):
 
         res = self._call_api('feed/reels_media/', params=params)
         if self.auto_patch:
-            for reel_media in res.get('reels_media', []):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in reel_media.get('items', [])]
-            for _, reel in list(res.get('reels', {}).items()):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in reel.get('items', [])]
+            with compat_patch_phase():
+                for reel_media in res.get('reels_media', []):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in reel_media.get('items', [])]
+                for _, reel in list(res.get('reels', {}).items()):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in reel.get('items', [])]
         return res
 
     def feed_tag(self, tag, rank_token, **kwargs):
@@ -175,15 +184,16 @@ class FeedEndpointsMixin(object):
             **{'tag': compat_urllib_parse.quote(tag.encode('utf8'))})
         res = self._call_api(endpoint, query=query_params)
         if self.auto_patch:
-            if res.get('items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('items', [])]
-            if res.get('ranked_items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('ranked_items', [])]
-            if res.get('story', {}).get('items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('story', {}).get('items', [])]
+            with compat_patch_phase():
+                if res.get('items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('items', [])]
+                if res.get('ranked_items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('ranked_items', [])]
+                if res.get('story', {}).get('items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('story', {}).get('items', [])]
         return res
 
     def user_story_feed(self, user_id):
@@ -196,8 +206,9 @@ class FeedEndpointsMixin(object):
         endpoint = 'feed/user/{user_id!s}/story/'.format(**{'user_id': user_id})
         res = self._call_api(endpoint)
         if self.auto_patch and res.get('reel'):
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('reel', {}).get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('reel', {}).get('items', [])]
         return res
 
     def feed_location(self, location_id, rank_token, **kwargs):
@@ -224,15 +235,16 @@ class FeedEndpointsMixin(object):
         query_params.update(kwargs)
         res = self._call_api(endpoint, query=query_params)
         if self.auto_patch:
-            if res.get('items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('items', [])]
-            if res.get('ranked_items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('ranked_items', [])]
-            if res.get('story', {}).get('items'):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in res.get('story', {}).get('items', [])]
+            with compat_patch_phase():
+                if res.get('items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('items', [])]
+                if res.get('ranked_items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('ranked_items', [])]
+                if res.get('story', {}).get('items'):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in res.get('story', {}).get('items', [])]
         return res
 
     def saved_feed(self, **kwargs):
@@ -245,8 +257,9 @@ class FeedEndpointsMixin(object):
         """
         res = self._call_api('feed/saved/', query=kwargs)
         if self.auto_patch:
-            [ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', []) if m.get('media')]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', []) if m.get('media')]
         return res
 
     def feed_only_me(self, **kwargs):
@@ -257,6 +270,7 @@ class FeedEndpointsMixin(object):
         """
         res = self._call_api('feed/only_me_feed/', query=kwargs)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
@@ -2,6 +2,7 @@ import warnings
 
 from .common import ClientExperimentalWarning
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 from ..utils import raise_if_invalid_rank_token
 
 
@@ -14,8 +15,9 @@ class FriendshipsEndpointsMixin(object):
             'friendships/autocomplete_user_list/',
             query={'followinfo': 'True', 'version': '2'})
         if self.auto_patch:
-            [ClientCompatPatch.list_user(user, drop_incompat_keys=self.drop_incompat_keys)
-             for user in res['users']]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(user, drop_incompat_keys=self.drop_incompat_keys)
+                 for user in res['users']]
         return res
 
     def user_following(self, user_id, rank_token, **kwargs):
@@ -39,8 +41,9 @@ class FriendshipsEndpointsMixin(object):
         query_params.update(kwargs)
         res = self._call_api(endpoint, query=query_params)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def user_followers(self, user_id, rank_token, **kwargs):
@@ -64,16 +67,18 @@ class FriendshipsEndpointsMixin(object):
         query_params.update(kwargs)
         res = self._call_api(endpoint, query=query_params)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def friendships_pending(self):
         """Get pending follow requests"""
         res = self._call_api('friendships/pending/')
         if self.auto_patch and res.get('users'):
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def friendships_show(self, user_id):
@@ -337,8 +342,9 @@ class FriendshipsEndpointsMixin(object):
         warnings.warn('This endpoint is experimental. Do not use.', ClientExperimentalWarning)
         res = self._call_api('friendships/blocked_reels/', params=self.authenticated_params)
         if self.auto_patch and res.get('users'):
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def enable_post_notifications(self, user_id):
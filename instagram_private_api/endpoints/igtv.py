@@ -1,6 +1,7 @@
 import re
 
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 USER_CHANNEL_ID_RE = r'^user_[1-9]\d+$'
 
@@ -27,8 +28,9 @@ class IGTVEndpointsMixin(object):
         res = self._call_api(endpoint, params=params)
 
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
 
         return res
 
@@ -36,11 +38,12 @@ class IGTVEndpointsMixin(object):
         """TV guide to popular, following, suggested channels, etc"""
         res = self._call_api('igtv/tv_guide/')
         if self.auto_patch:
-            for c in res.get('channels', []):
+            with compat_patch_phase():
+                for c in res.get('channels', []):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in c.get('items', [])]
                 [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in c.get('items', [])]
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('my_channel', {}).get('items', [])]
+                 for m in res.get('my_channel', {}).get('items', [])]
         return res
 
     def search_igtv(self, text):
@@ -55,9 +58,10 @@ class IGTVEndpointsMixin(object):
 
         res = self._call_api('igtv/search/', query={'query': text})
         if self.auto_patch:
-            for r in res.get('results', []):
-                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-                 for m in r.get('channel', {}).get('items', [])]
-                if r.get('user'):
-                    ClientCompatPatch.user(r['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                for r in res.get('results', []):
+                    [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                     for m in r.get('channel', {}).get('items', [])]
+                    if r.get('user'):
+                        ClientCompatPatch.user(r['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
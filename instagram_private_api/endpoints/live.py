@@ -1,5 +1,6 @@
 from ..utils import gen_user_breadcrumb
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class LiveEndpointsMixin(object):
@@ -54,9 +55,10 @@ class LiveEndpointsMixin(object):
         endpoint = 'live/{broadcast_id!s}/get_comment/'.format(**{'broadcast_id': broadcast_id})
         res = self._call_api(endpoint, query={'last_comment_ts': last_comment_ts})
         if self.auto_patch and res.get('comments'):
-            [ClientCompatPatch.comment(c) for c in res.get('comments', [])]
-            if res.get('pinned_comment'):
-                ClientCompatPatch.comment(res['pinned_comment'])
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c) for c in res.get('comments', [])]
+                if res.get('pinned_comment'):
+                    ClientCompatPatch.comment(res['pinned_comment'])
         return res
 
     def broadcast_heartbeat_and_viewercount(self, broadcast_id):
@@ -94,7 +96,8 @@ class LiveEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api(endpoint, params=params)
         if self.auto_patch and res.get('comment'):
-            ClientCompatPatch.comment(res['comment'])
+            with compat_patch_phase():
+                ClientCompatPatch.comment(res['comment'])
         return res
 
     def broadcast_info(self, broadcast_id):
@@ -170,8 +173,9 @@ class LiveEndpointsMixin(object):
             **{'broadcast_id': broadcast_id})
         res = self._call_api(endpoint, query=query)
         if self.auto_patch and res.get('comments'):
-            [ClientCompatPatch.comment(c['comment']) for c in res.get('comments', [])
-             if c.get('comment')]
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c['comment']) for c in res.get('comments', [])
+                 if c.get('comment')]
         return res
 
     def replay_broadcast_likes(
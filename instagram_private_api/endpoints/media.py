@@ -7,23 +7,34 @@ from random import randint
 from .common import ClientExperimentalWarning, MediaTypes
 from ..utils import gen_user_breadcrumb
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
+from ..errors import ClientError
 
 
 class MediaEndpointsMixin(object):
     """For endpoints in ``/media/``."""
 
+    #: Maximum number of media ids per ``media/infos/`` call when batching :meth:`media_info`
+    MEDIA_INFO_BATCH_SIZE = 50
+
     def media_info(self, media_id):
         """
         Get media info
 
+        If the client was created with ``media_info_batch_window``, concurrent calls
+        are batched into :meth:`medias_info` calls.
+
         :param media_id:
         :return:
         """
+        if self.media_info_loader:
+            return self.media_info_loader.load(str(media_id))
         endpoint = 'media/{media_id!s}/info/'.format(**{'media_id': media_id})
         res = self._call_api(endpoint)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def medias_info(self, media_ids):
@@ -46,10 +57,32 @@ class MediaEndpointsMixin(object):
         }
         res = self._call_api('media/infos/', query=params)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
+    def _medias_info_by_id(self, media_ids):
+        """
+        Batch function for the :meth:`media_info` loader. Splits a :meth:`medias_info`
+        response into a :meth:`media_info` response per media id.
+
+        :param media_ids: list of media ids
+        :return: dict of responses by media id
+        """
+        res = self.medias_info(media_ids)
+        items_by_pk = dict((str(m.get('pk')), m) for m in res.get('items', []))
+        results = {}
+        for media_id in media_ids:
+            item = items_by_pk.get(media_id.split('_')[0])
+            if item is None:
+                results[media_id] = ClientError('Media not found', code=404)
+                continue
+            media_res = dict(res)
+            media_res.update({'items': [item], 'num_results': 1})
+            results[media_id] = media_res
+        return results
+
     def media_permalink(self, media_id):
         """
         Get media permalink
@@ -79,32 +112,40 @@ class MediaEndpointsMixin(object):
         res = self._call_api(endpoint, query=query)
 
         if self.auto_patch:
-            [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
-             for c in res.get('comments', [])]
-            [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
-             for c in res.get('preview_comments', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
+                 for c in res.get('comments', [])]
+                [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
+                 for c in res.get('preview_comments', [])]
         return res
 
-    def media_n_comments(self, media_id, n=150, reverse=False, **kwargs):
+    def _media_comment_pages(self, media_id, n=None, **kwargs):
         """
-        Helper method to retrieve n number of comments for a media id
+        Generator of the comments of each page of a media's comments,
+        switching between ``max_id`` and ``min_id`` paging as needed.
 
         :param media_id: Media id
-        :param n: Minimum number of comments to fetch
-        :param reverse: Reverse list of comments (ordered by created_time)
+        :param n: Stop fetching pages after at least n comments have been fetched
         :param kwargs:
         :return:
         """
-
         endpoint = 'media/{media_id!s}/comments/'.format(**{'media_id': media_id})
 
-        comments = []
+        comment_count = 0
         results = self._call_api(endpoint, query=kwargs)
-        comments.extend(results.get('comments', []))
-
-        while (((results.get('has_more_comments') and results.get('next_max_id'))
-                or (results.get('has_more_headload_comments') and results.get('next_min_id')))
-                and len(comments) < n):
+        while True:
+            comments = results.get('comments', [])
+            if self.auto_patch:
+                with compat_patch_phase():
+                    [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
+                     for c in comments]
+            comment_count += len(comments)
+            yield comments
+
+            if not (((results.get('has_more_comments') and results.get('next_max_id'))
+                     or (results.get('has_more_headload_comments') and results.get('next_min_id')))
+                    and (n is None or comment_count < n)):
+                return
 
             if results.get('has_more_comments'):
                 kwargs.update({'max_id': results.get('next_max_id')})
@@ -112,17 +153,61 @@ class MediaEndpointsMixin(object):
                 kwargs.update({'min_id': results.get('next_min_id')})
 
             results = self._call_api(endpoint, query=kwargs)
-            comments.extend(results.get('comments', []))
             if not (results.get('next_max_id') or results.get('next_min_id') or results.get('comments')):
                 # bail out if no max_id/min_id or comments returned
-                break
+                return
 
-        if self.auto_patch:
-            [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
-             for c in comments]
+    def media_n_comments(self, media_id, n=150, reverse=False, **kwargs):
+        """
+        Helper method to retrieve n number of comments for a media id
+
+        :param media_id: Media id
+        :param n: Minimum number of comments to fetch
+        :param reverse: Reverse list of comments (ordered by created_time)
+        :param kwargs:
+        :return:
+        """
+        comments = []
+        for page_comments in self._media_comment_pages(media_id, n=n, **kwargs):
+            comments.extend(page_comments)
 
         return sorted(comments, key=lambda k: k['created_at_utc'], reverse=reverse)
 
+    def iter_media_comments(self, media_id, n=None, reverse=False, ordered=True, **kwargs):
+        """
+        Generator variant of :meth:`media_n_comments`.
+
+        The api does not return comments in created_time order, so an exact order needs
+        every comment to be fetched first: with ``ordered=True`` comments are yielded once
+        all pages have been fetched, sorted like :meth:`media_n_comments`.
+        Use ``ordered=False`` to yield comments as pages arrive, in the order they
+        are returned by the api.
+
+        .. code-block:: python
+
+            for comment in api.iter_media_comments(media_id, n=10000, ordered=False):
+                print(comment['text'])
+
+        :param media_id: Media id
+        :param n: Stop fetching pages after at least n comments have been fetched. Default: all comments
+        :param reverse: Yield the newest comments first (ordered by created_time). Ignored if not ``ordered``
+        :param ordered: Sort comments by created_time
+        :param kwargs:
+        :return: a generator of comments
+        """
+        if not ordered:
+            for page_comments in self._media_comment_pages(media_id, n=n, **kwargs):
+                for comment in page_comments:
+                    yield comment
+            return
+
+        comments = []
+        for page_comments in self._media_comment_pages(media_id, n=n, **kwargs):
+            comments.extend(page_comments)
+        comments.sort(key=lambda k: k['created_at_utc'], reverse=reverse)
+        for comment in comments:
+            yield comment
+
     def comment_replies(self, media_id, comment_id, **kwargs):
         """
         Get comment replies. Fixed at 20 replies returned per page.
@@ -140,9 +225,10 @@ class MediaEndpointsMixin(object):
         res = self._call_api(endpoint, query=kwargs)
 
         if self.auto_patch:
-            [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
-             for c in res.get('child_comments', [])]
-            ClientCompatPatch.comment(res.get('parent_comment'))
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
+                 for c in res.get('child_comments', [])]
+                ClientCompatPatch.comment(res.get('parent_comment'))
         return res
 
     def comment_inline_replies(self, media_id, comment_id, max_id, **kwargs):
@@ -163,9 +249,10 @@ class MediaEndpointsMixin(object):
             query.update(kwargs)
         res = self._call_api(endpoint, query=query)
         if self.auto_patch:
-            [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
-             for c in res.get('child_comments', [])]
-            ClientCompatPatch.comment(res.get('parent_comment'))
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c, drop_incompat_keys=self.drop_incompat_keys)
+                 for c in res.get('child_comments', [])]
+                ClientCompatPatch.comment(res.get('parent_comment'))
         return res
 
     def edit_media(self, media_id, caption, usertags=None):
@@ -193,7 +280,8 @@ class MediaEndpointsMixin(object):
             params['usertags'] = json.dumps(utags, separators=(',', ':'))
         res = self._call_api(endpoint, params=params)
         if self.auto_patch:
-            ClientCompatPatch.media(res.get('media'))
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'))
         return res
 
     def delete_media(self, media_id):
@@ -265,7 +353,8 @@ class MediaEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api(endpoint, params=params)
         if self.auto_patch:
-            ClientCompatPatch.comment(res['comment'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.comment(res['comment'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def delete_comment(self, media_id, comment_id):
@@ -319,8 +408,9 @@ class MediaEndpointsMixin(object):
         endpoint = 'media/{media_id!s}/likers/'.format(**{'media_id': media_id})
         res = self._call_api(endpoint, query=kwargs)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def media_likers_chrono(self, media_id):
@@ -334,8 +424,9 @@ class MediaEndpointsMixin(object):
         warnings.warn('This endpoint is experimental. Do not use.', ClientExperimentalWarning)
         res = self._call_api('media/{media_id!s}/likers_chrono/'.format(**{'media_id': media_id}))
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def post_like(self, media_id, module_name='feed_timeline'):
@@ -446,8 +537,9 @@ class MediaEndpointsMixin(object):
         endpoint = 'media/{comment_id!s}/comment_likers/'.format(**{'comment_id': comment_id})
         res = self._call_api(endpoint)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def comment_unlike(self, comment_id):
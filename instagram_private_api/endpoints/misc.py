@@ -3,6 +3,7 @@ import warnings
 from .common import ClientDeprecationWarning
 from ..constants import Constants
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class MiscEndpointsMixin(object):
@@ -139,7 +140,8 @@ class MiscEndpointsMixin(object):
             'fbsearch/topsearch/',
             query={'context': 'blended', 'ranked_token': self.rank_token, 'query': query})
         if self.auto_patch and res.get('users', []):
-            [ClientCompatPatch.list_user(u['user']) for u in res['users']]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u['user']) for u in res['users']]
         return res
 
     def stickers(self, sticker_type='static_stickers', location=None):
@@ -3,6 +3,7 @@ import json
 from ..compat import compat_urllib_parse
 from ..utils import raise_if_invalid_rank_token
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class TagsEndpointsMixin(object):
@@ -138,12 +139,13 @@ class TagsEndpointsMixin(object):
         results = self._call_api(endpoint, params=params, unsigned=True)
         extracted_medias = []
         if self.auto_patch:
-            for s in results.get('sections', []):
-                for m in s.get('layout_content', {}).get('medias', []):
-                    if m.get('media'):
-                        ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
-                        if extract_media_only:
-                            extracted_medias.append(m['media'])
+            with compat_patch_phase():
+                for s in results.get('sections', []):
+                    for m in s.get('layout_content', {}).get('medias', []):
+                        if m.get('media'):
+                            ClientCompatPatch.media(m['media'], drop_incompat_keys=self.drop_incompat_keys)
+                            if extract_media_only:
+                                extracted_medias.append(m['media'])
         if extract_media_only:
             return extracted_medias
         return results
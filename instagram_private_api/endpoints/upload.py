@@ -10,11 +10,13 @@ from ..compat import (
 )
 from ..errors import ErrorHandler, ClientError, ClientConnectionError
 from ..http import MultipartFormDataEncoder
+from ..events import endpoint_template
 from ..utils import (
     max_chunk_count_generator, max_chunk_size_generator,
     get_file_size
 )
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 from .common import ClientDeprecationWarning
 from .common import MediaTypes
 from socket import timeout, error as SocketError
@@ -206,7 +208,8 @@ class UploadEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api(endpoint, params=params)
         if self.auto_patch and res.get('media'):
-            ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def configure_video(self, upload_id, size, duration, thumbnail_data, caption='',
@@ -322,7 +325,8 @@ class UploadEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api(endpoint, params=params)
         if self.auto_patch and res.get('media'):
-            ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def configure_video_to_reel(self, upload_id, size, duration, thumbnail_data):
@@ -374,7 +378,8 @@ class UploadEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api('media/configure_to_story/', params=params, query={'video': '1'})
         if self.auto_patch and res.get('media'):
-            ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def post_photo(self, photo_data, size, caption='', upload_id=None, to_reel=False, **kwargs):
@@ -443,7 +448,7 @@ class UploadEndpointsMixin(object):
         req = compat_urllib_request.Request(endpoint_url, body, headers=headers)
         try:
             self.logger.debug('POST {0!s}'.format(endpoint_url))
-            response = self.opener.open(req, timeout=self.timeout)
+            response = self.transport.send(req, timeout=self.timeout)
         except compat_urllib_error.HTTPError as e:
             error_response = self._read_response(e)
             self.logger.debug('RESPONSE: {0:d} {1!s}'.format(e.code, error_response))
@@ -557,7 +562,7 @@ class UploadEndpointsMixin(object):
 
         max_retry_count = kwargs.pop('max_retry_count', 10)
         configure_delay = 0
-        for _ in range(max_retry_count + 1):
+        for attempt in range(max_retry_count + 1):
 
             try:
                 # Prevent excessively small chunks
@@ -595,10 +600,14 @@ class UploadEndpointsMixin(object):
 
                     req = compat_urllib_request.Request(
                         str(upload_url), data=data, headers=headers)
+                    trace = self.event_hooks.trace(
+                        req, endpoint_template(upload_url), retry_count=attempt,
+                        account_id=self.authenticated_user_id if self.event_hooks else None)
 
                     try:
-                        res = self.opener.open(req, timeout=self.timeout)
-                        post_response = self._read_response(res)
+                        res = trace.send(self.transport, req, timeout=self.timeout)
+                        post_response = self._read_response(res, trace.stats)
+                        trace.finish()
                         self.logger.debug('RESPONSE: {0:d} {1!s}'.format(res.code, post_response))
                         if res.info().get('Content-Type', '').startswith('application/json'):
                             # last chunk
@@ -622,6 +631,7 @@ class UploadEndpointsMixin(object):
                                         code=500)
 
                     except compat_urllib_error.HTTPError as e:
+                        trace.finish(error=e)
                         error_response = self._read_response(e)
                         self.logger.debug('RESPONSE: {0:d} {1!s}'.format(e.code, error_response))
                         ErrorHandler.process(e, error_response)
@@ -629,6 +639,7 @@ class UploadEndpointsMixin(object):
                     except (SSLError, timeout, SocketError,
                             compat_urllib_error.URLError,   # URLError is base of HTTPError
                             compat_http_client.HTTPException) as connection_error:
+                        trace.finish(error=connection_error)
                         raise ClientConnectionError('{} {}'.format(
                             connection_error.__class__.__name__, str(connection_error)))
 
@@ -652,13 +663,14 @@ class UploadEndpointsMixin(object):
 
         for i in range(1, configure_retry_max + 1):
             try:
-                if not to_reel:
-                    result = self.configure_video(
-                        upload_id, size, duration, thumbnail_data, caption=caption, location=location,
-                        disable_comments=disable_comments, is_sidecar=is_sidecar)
-                else:
-                    result = self.configure_video_to_reel(
-                        upload_id, size, duration, thumbnail_data)
+                with self.event_hooks.retrying(i - 1):
+                    if not to_reel:
+                        result = self.configure_video(
+                            upload_id, size, duration, thumbnail_data, caption=caption, location=location,
+                            disable_comments=disable_comments, is_sidecar=is_sidecar)
+                    else:
+                        result = self.configure_video_to_reel(
+                            upload_id, size, duration, thumbnail_data)
                 return result
             except ClientConnectionError as cce:
                 if i < configure_retry_max:
@@ -790,5 +802,6 @@ class UploadEndpointsMixin(object):
         params.update(self.authenticated_params)
         res = self._call_api(endpoint, params=params)
         if self.auto_patch and res.get('media'):
-            ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'), drop_incompat_keys=self.drop_incompat_keys)
         return res
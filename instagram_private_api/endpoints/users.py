@@ -2,6 +2,7 @@ import warnings
 
 from .common import ClientExperimentalWarning, ClientDeprecationWarning
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class UsersEndpointsMixin(object):
@@ -16,7 +17,8 @@ class UsersEndpointsMixin(object):
         """
         res = self._call_api('users/{user_id!s}/info/'.format(**{'user_id': user_id}))
         if self.auto_patch:
-            ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def username_info(self, user_name):
@@ -27,7 +29,8 @@ class UsersEndpointsMixin(object):
         """
         res = self._call_api('users/{user_name!s}/usernameinfo/'.format(**{'user_name': user_name}))
         if self.auto_patch:
-            ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(res['user'], drop_incompat_keys=self.drop_incompat_keys)
         return res
 
     def user_detail_info(self, user_id, **kwargs):
@@ -46,13 +49,14 @@ class UsersEndpointsMixin(object):
         endpoint = 'users/{user_id!s}/full_detail_info/'.format(**{'user_id': user_id})
         res = self._call_api(endpoint, query=kwargs)
         if self.auto_patch:
-            ClientCompatPatch.user(res['user_detail']['user'], drop_incompat_keys=self.drop_incompat_keys)
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('feed', {}).get('items', [])]
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('reel_feed', {}).get('items', [])]
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('user_story', {}).get('reel', {}).get('items', [])]
+            with compat_patch_phase():
+                ClientCompatPatch.user(res['user_detail']['user'], drop_incompat_keys=self.drop_incompat_keys)
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('feed', {}).get('items', [])]
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('reel_feed', {}).get('items', [])]
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('user_story', {}).get('reel', {}).get('items', [])]
         return res
 
     def user_map(self, user_id):    # pragma: no cover
@@ -84,8 +88,9 @@ class UsersEndpointsMixin(object):
         query_params.update(kwargs)
         res = self._call_api('users/search/', query=query_params)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('users', [])]
         return res
 
     def check_username(self, username):
@@ -122,8 +127,9 @@ class UsersEndpointsMixin(object):
         """
         res = self._call_api('users/reel_settings/')
         if self.auto_patch and res.get('blocked_reels', {}).get('users'):
-            [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
-             for u in res.get('blocked_reels', {}).get('users', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u, drop_incompat_keys=self.drop_incompat_keys)
+                 for u in res.get('blocked_reels', {}).get('users', [])]
         return res
 
     def set_reel_settings(
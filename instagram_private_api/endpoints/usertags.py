@@ -1,4 +1,5 @@
 from ..compatpatch import ClientCompatPatch
+from ..events import compat_patch_phase
 
 
 class UsertagsEndpointsMixin(object):
@@ -17,8 +18,9 @@ class UsertagsEndpointsMixin(object):
         query.update(kwargs)
         res = self._call_api(endpoint, query=query)
         if self.auto_patch:
-            [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
-             for m in res.get('items', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(m, drop_incompat_keys=self.drop_incompat_keys)
+                 for m in res.get('items', [])]
         return res
 
     def usertag_self_remove(self, media_id):
@@ -31,5 +33,6 @@ class UsertagsEndpointsMixin(object):
         endpoint = 'usertags/{media_id!s}/remove/'.format(**{'media_id': media_id})
         res = self._call_api(endpoint, params=self.authenticated_params)
         if self.auto_patch:
-            ClientCompatPatch.media(res.get('media'))
+            with compat_patch_phase():
+                ClientCompatPatch.media(res.get('media'))
         return res
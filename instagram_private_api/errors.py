@@ -24,6 +24,17 @@ class ClientError(Exception):
         self.error_response = error_response
         super(ClientError, self).__init__(msg)
 
+    @property
+    def error_response(self):
+        # A parsed response is only serialized when it is needed
+        if isinstance(self._error_response, dict):
+            self._error_response = json.dumps(self._error_response)
+        return self._error_response
+
+    @error_response.setter
+    def error_response(self, value):
+        self._error_response = value
+
     @property
     def msg(self):
         return self.args[0]
@@ -121,14 +132,14 @@ class ErrorHandler(object):
             if http_error.code == ClientErrorCodes.TOO_MANY_REQUESTS:
                 raise ClientThrottledError(
                     error_obj.get('message'), code=http_error.code,
-                    error_response=json.dumps(error_obj))
+                    error_response=error_obj)
 
             for error_info in ErrorHandler.KNOWN_ERRORS_MAP:
                 for p in error_info['patterns']:
                     if re.search(p, error_message_type):
                         raise error_info['error'](
                             error_message_type, code=http_error.code,
-                            error_response=json.dumps(error_obj)
+                            error_response=error_obj
                         )
             if error_message_type:
                 error_msg = '{0!s}: {1!s}'.format(http_error.reason, error_message_type)
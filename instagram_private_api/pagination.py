@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from .concurrency import BackgroundCall
+
+
+def _max_id_kwargs(results):
+    """Paging kwargs for endpoints that take the ``next_max_id`` of the previous page as ``max_id``."""
+    next_max_id = results.get('next_max_id')
+    if not next_max_id:
+        return None
+    return {'max_id': next_max_id}
+
+
+def _section_kwargs(results):
+    """Paging kwargs for the tag and location section endpoints."""
+    if not results.get('more_available') or not results.get('next_max_id'):
+        return None
+    return {
+        'max_id': results.get('next_max_id'),
+        'page': results.get('next_page'),
+        'next_media_ids': results.get('next_media_ids'),
+    }
+
+
+def _child_comments_kwargs(results):
+    """Paging kwargs for comment replies, which page with ``next_max_child_cursor``."""
+    if not results.get('has_more_tail_child_comments') or not results.get('next_max_child_cursor'):
+        return None
+    return {'max_id': results.get('next_max_child_cursor')}
+
+
+class FileCheckpointStore(object):
+    """Stores pagination checkpoints as JSON files in a directory."""
+
+    def __init__(self, directory):
+        """
+
+        :param directory: path of the directory to store the checkpoints in
+        """
+        self.directory = directory
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+    def _path(self, key):
+        return os.path.join(
+            self.directory, '{0!s}.json'.format(hashlib.md5(key.encode('utf-8')).hexdigest()))
+
+    def load(self, key):
+        """
+        Load a checkpoint's state.
+
+        :param key: checkpoint key
+        :return: dict, or None if there is no saved state
+        """
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (IOError, OSError):
+            return None
+
+    def save(self, key, state):
+        """
+        Save a checkpoint's state. The file is replaced atomically so that
+        a crash while saving does not leave a corrupt checkpoint behind.
+
+        :param key: checkpoint key
+        :param state: dict
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+            getattr(os, 'replace', os.rename)(temp_path, self._path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def delete(self, key):
+        """
+        Delete a checkpoint's state.
+
+        :param key: checkpoint key
+        """
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class PaginationCheckpoint(object):
+    """
+    The position of a crawl over a paginated endpoint, persisted to a store
+    so that the crawl can be resumed where it stopped, without fetching the
+    same pages again or returning duplicate items.
+
+    .. code-block:: python
+
+        store = FileCheckpointStore('checkpoints')
+        checkpoint = PaginationCheckpoint('followers:2958144170', store)
+        # when resuming, the saved endpoint arguments, including the rank_token, are used
+        for user in api.iter_items(
+                api.user_followers, '2958144170', Client.generate_uuid(), checkpoint=checkpoint):
+            print(user['username'])
+
+    The checkpoint is saved whenever a page is fetched and when the iteration stops,
+    including on errors. If the process is killed abruptly, the items of the page
+    that was being processed are returned again on resume, unless
+    :meth:`save` is called after each item.
+
+    The endpoint arguments, the cursor of the next page (``max_id``, and for
+    sections ``page`` and ``next_media_ids``) and the undelivered items of the current
+    page are stored, so they must be JSON serializable.
+    """
+
+    def __init__(self, key, store):
+        """
+
+        :param key: a unique name for the crawl
+        :param store: a store with ``load``, ``save`` and ``delete`` methods,
+            example :class:`FileCheckpointStore`
+        """
+        self.key = key
+        self.store = store
+        self._set_state(store.load(key) or {})
+
+    def _set_state(self, state):
+        #: Positional and keyword arguments of the endpoint
+        self.args = state.get('args')
+        self.kwargs = state.get('kwargs')
+        #: Endpoint kwargs for the next page, or None if there are no more pages
+        self.page_kwargs = state.get('page_kwargs')
+        #: Items of the current page that have not been returned yet
+        self.pending_items = state.get('pending_items') or []
+        self.page_count = state.get('page_count', 0)
+        self.item_count = state.get('item_count', 0)
+        self.done = state.get('done', False)
+
+    @property
+    def started(self):
+        """Whether the crawl has started."""
+        return self.args is not None
+
+    def save(self):
+        """Persist the checkpoint to the store."""
+        self.store.save(self.key, {
+            'args': self.args,
+            'kwargs': self.kwargs,
+            'page_kwargs': self.page_kwargs,
+            'pending_items': self.pending_items,
+            'page_count': self.page_count,
+            'item_count': self.item_count,
+            'done': self.done,
+        })
+
+    def reset(self):
+        """Delete the checkpoint from the store so that the crawl starts over."""
+        self.store.delete(self.key)
+        self._set_state({})
+
+
+class PaginationMixin(object):
+    """Iterators over paginated endpoints."""
+
+    #: The key of the list of items in the results of an endpoint, by endpoint name.
+    #: Endpoints that are not listed use the first of :attr:`DEFAULT_ITEM_KEYS` in the results.
+    ITEM_KEYS = {
+        'feed_timeline': 'feed_items',
+        'user_following': 'users',
+        'user_followers': 'users',
+        'blocked_user_list': 'users',
+        'story_viewers': 'users',
+        'media_comments': 'comments',
+        'comment_replies': 'child_comments',
+        'tag_section': 'sections',
+        'location_section': 'sections',
+    }
+    DEFAULT_ITEM_KEYS = ('items', 'users', 'comments', 'feed_items', 'sections')
+
+    #: Functions that return the kwargs for the next page from the results of an endpoint,
+    #: or None for the last page, by endpoint name. Other endpoints page with ``next_max_id``.
+    NEXT_PAGE_KWARGS = {
+        'tag_section': _section_kwargs,
+        'location_section': _section_kwargs,
+        'comment_replies': _child_comments_kwargs,
+    }
+
+    def _page_items(self, endpoint_name, results, item_key=None):
+        if callable(item_key):
+            return item_key(results)
+        key = item_key or self.ITEM_KEYS.get(endpoint_name)
+        if key:
+            return results.get(key) or []
+        for key in self.DEFAULT_ITEM_KEYS:
+            if key in results:
+                return results.get(key) or []
+        return []
+
+    def _paging_options(self, endpoint, kwargs):
+        """Pop the paging options from an endpoint's kwargs."""
+        endpoint_name = getattr(endpoint, '__name__', '')
+        return {
+            'endpoint_name': endpoint_name,
+            'max_pages': kwargs.pop('max_pages', None),
+            'max_items': kwargs.pop('max_items', None),
+            'deadline': kwargs.pop('deadline', None),
+            'prefetch': kwargs.pop('prefetch', True),
+            'item_key': kwargs.pop('item_key', None),
+            'next_page_kwargs': (
+                kwargs.pop('next_page_kwargs', None)
+                or self.NEXT_PAGE_KWARGS.get(endpoint_name, _max_id_kwargs)),
+            'checkpoint': kwargs.pop('checkpoint', None),
+        }
+
+    @staticmethod
+    def _resume(checkpoint, args, kwargs):
+        """
+        Get the endpoint arguments, and the kwargs for the next page to fetch
+        (None if there are no more pages), from a checkpoint.
+        """
+        if not checkpoint:
+            return args, kwargs, {}
+        if checkpoint.started:
+            return tuple(checkpoint.args), dict(checkpoint.kwargs), checkpoint.page_kwargs
+        checkpoint.args, checkpoint.kwargs = list(args), dict(kwargs)
+        return args, kwargs, {}
+
+    def _iter_results(self, endpoint, args, kwargs, page_kwargs, options):
+        """
+        Fetch pages starting from ``page_kwargs``.
+
+        :return: a generator of (results, kwargs for the next page or None if it is the last page)
+        """
+        def fetch(page_kwargs):
+            params = dict(kwargs)
+            params.update(page_kwargs)
+            return endpoint(*args, **params)
+
+        max_pages = options['max_pages']
+        max_items = options['max_items']
+        deadline = options['deadline']
+        page_count = 0
+        item_count = 0
+        results = fetch(page_kwargs)
+        while True:
+            page_count += 1
+            item_count += len(self._page_items(options['endpoint_name'], results, options['item_key']))
+            last_page_kwargs, page_kwargs = page_kwargs, options['next_page_kwargs'](results)
+            if page_kwargs == last_page_kwargs:
+                # the cursor did not advance
+                page_kwargs = None
+            fetch_next = (
+                page_kwargs
+                and (max_pages is None or page_count < max_pages)
+                and (max_items is None or item_count < max_items)
+                and (deadline is None or time.time() < deadline))
+            pending = BackgroundCall(fetch, page_kwargs) if fetch_next and options['prefetch'] else None
+
+            yield results, page_kwargs
+
+            if not fetch_next:
+                return
+            if pending:
+                results = pending.result()
+            elif deadline is not None and time.time() >= deadline:
+                return
+            else:
+                results = fetch(page_kwargs)
+
+    def iter_pages(self, endpoint, *args, **kwargs):
+        """
+        Iterate over the result pages of a paginated endpoint. The next page is
+        fetched in the background while the current page is being processed.
+
+        .. code-block:: python
+
+            for results in api.iter_pages(api.user_feed, '2958144170', max_pages=5):
+                for item in results.get('items', []):
+                    print(item['pk'])
+
+        :param endpoint: a client endpoint method, example ``api.user_feed``
+        :param args: positional arguments for the endpoint
+        :param kwargs: keyword arguments for the endpoint, and the paging options below
+
+        :Keyword Arguments:
+            - **max_pages**: Maximum number of pages to fetch
+            - **max_items**: Stop fetching once this many items have been fetched
+            - **deadline**: A ``time.time()`` timestamp after which no more pages are requested
+            - **prefetch**: Fetch the next page in the background. Default: True
+            - **item_key**: Key of the list of items in the results, or a function that
+              returns the items from the results. Used to count items for ``max_items``.
+              Default: See :attr:`ITEM_KEYS`
+            - **next_page_kwargs**: A function that returns the endpoint kwargs for the
+              next page from the results, or None if there are no more pages.
+              Default: See :attr:`NEXT_PAGE_KWARGS`
+            - **checkpoint**: A :class:`PaginationCheckpoint` to resume from and save the
+              position to. The position advances past a page when the next page is requested,
+              so a page that was being processed when the iteration stopped is returned again
+              on resume. When resuming, the endpoint arguments saved in the checkpoint,
+              such as the ``rank_token``, are used.
+        :return: a generator of results
+        """
+        options = self._paging_options(endpoint, kwargs)
+        checkpoint = options['checkpoint']
+        if checkpoint and checkpoint.done:
+            return
+        args, kwargs, page_kwargs = self._resume(checkpoint, args, kwargs)
+        if page_kwargs is None:
+            return
+        for results, page_kwargs in self._iter_results(endpoint, args, kwargs, page_kwargs, options):
+            yield results
+            # the page has been processed once the consumer asks for the next one
+            if checkpoint:
+                checkpoint.page_kwargs = page_kwargs
+                checkpoint.page_count += 1
+                checkpoint.item_count += len(
+                    self._page_items(options['endpoint_name'], results, options['item_key']))
+                checkpoint.done = page_kwargs is None
+                checkpoint.save()
+
+    def iter_items(self, endpoint, *args, **kwargs):
+        """
+        Iterate over the items of a paginated endpoint across pages.
+        The next page is fetched in the background while the current page is being processed.
+
+        .. code-block:: python
+
+            rank_token = Client.generate_uuid()
+            for user in api.iter_items(api.user_followers, user_id, rank_token, max_items=500):
+                print(user['username'])
+
+        :param endpoint: a client endpoint method, example ``api.user_feed``
+        :param args: positional arguments for the endpoint
+        :param kwargs: keyword arguments for the endpoint, and the paging options
+            of :meth:`iter_pages`. At most ``max_items`` items are returned.
+            With a ``checkpoint``, the position advances as each item is yielded. It is saved
+            whenever a page is fetched and when the iteration stops, including on errors.
+        :return: a generator of items
+        """
+        options = self._paging_options(endpoint, kwargs)
+        checkpoint = options['checkpoint']
+        if checkpoint and checkpoint.done:
+            return
+        max_items = options['max_items']
+        args, kwargs, page_kwargs = self._resume(checkpoint, args, kwargs)
+        pages = None
+        if page_kwargs is not None:
+            pages = self._iter_results(endpoint, args, kwargs, page_kwargs, options)
+        items = checkpoint.pending_items if checkpoint else []
+        item_count = 0
+        try:
+            while True:
+                while items:
+                    if max_items is not None and item_count >= max_items:
+                        return
+                    item = items.pop(0)
+                    item_count += 1
+                    if checkpoint:
+                        checkpoint.item_count += 1
+                    yield item
+                if max_items is not None and item_count >= max_items:
+                    return
+                results, page_kwargs = next(pages, (None, None)) if pages else (None, None)
+                if results is None:
+                    if checkpoint:
+                        checkpoint.done = checkpoint.page_kwargs is None
+                    return
+                items = list(self._page_items(options['endpoint_name'], results, options['item_key']))
+                if checkpoint:
+                    checkpoint.page_kwargs = page_kwargs
+                    checkpoint.pending_items = items
+                    checkpoint.page_count += 1
+                    checkpoint.save()
+        finally:
+            if checkpoint:
+                checkpoint.save()
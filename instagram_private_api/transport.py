@@ -0,0 +1,113 @@
+from .compat import compat_urllib_request
+from .http import (
+    KeepAliveHTTPHandler, KeepAliveHTTPSHandler, TimedHTTPHandler, TimedHTTPSHandler
+)
+
+
+class Transport(object):
+    """
+    Base class for the http transport used by the client.
+
+    A transport takes a ``compat_urllib_request.Request`` and returns a
+    file-like response object with:
+
+        - ``code``: the http status code
+        - ``info()``: the response headers, supporting ``.get(name)``
+        - ``read(amt=None)``: the raw (possibly compressed) response body
+
+    Non-2xx responses should be raised as ``compat_urllib_error.HTTPError``
+    (which has the same interface) so that the client's error handling applies.
+    Cookies should be read from and stored into ``cookie_jar``.
+
+    When the client has event hooks, requests have a ``timings`` dict that the
+    transport can record the ``dns``, ``connect`` and ``tls`` times of a new
+    connection in, as (start, end) monotonic timestamps, and ``reused``,
+    whether a kept alive connection was used.
+    """
+
+    #: Whether connections are kept alive between requests
+    keep_alive = False
+
+    def __init__(self, cookie_jar):
+        self.cookie_jar = cookie_jar
+
+    def send(self, req, timeout=None):
+        """
+        Send a request.
+
+        :param req: a ``compat_urllib_request.Request``
+        :param timeout: timeout in seconds
+        :return: a file-like response object
+        """
+        raise NotImplementedError()     # pragma: no cover
+
+    def close(self):
+        """Release any resources held by the transport."""
+        pass
+
+
+class UrllibTransport(Transport):
+    """Default transport, a plain urllib opener. A new connection is made for every request."""
+
+    def __init__(self, cookie_jar, proxy_handler=None, ssl_context=None, opener=None):
+        """
+
+        :param cookie_jar: :class:`ClientCookieJar` instance
+        :param proxy_handler: optional urllib proxy handler
+        :param ssl_context: optional custom ssl context
+        :param opener: optional urllib opener to use instead of building one.
+            Its cookie processor should use ``cookie_jar``.
+        """
+        super(UrllibTransport, self).__init__(cookie_jar)
+        if opener is None:
+            handlers = []
+            if proxy_handler:
+                handlers.append(proxy_handler)
+            handlers.extend(self.http_handlers(ssl_context))
+            handlers.append(compat_urllib_request.HTTPCookieProcessor(cookie_jar))
+            opener = compat_urllib_request.build_opener(*handlers)
+            opener.cookie_jar = cookie_jar
+        self.opener = opener
+
+    def http_handlers(self, ssl_context=None):
+        try:
+            https_handler = TimedHTTPSHandler(context=ssl_context)
+        except TypeError:
+            # py version < 2.7.9
+            https_handler = TimedHTTPSHandler()
+        return [TimedHTTPHandler(), https_handler]
+
+    def send(self, req, timeout=None):
+        return self.opener.open(req, timeout=timeout)
+
+
+class PooledTransport(UrllibTransport):
+    """urllib transport that keeps persistent connections in a pool per host."""
+
+    keep_alive = True
+
+    def __init__(self, cookie_jar, proxy_handler=None, ssl_context=None,
+                 maxsize=10, idle_timeout=60, host_options=None):
+        """
+
+        :param cookie_jar: :class:`ClientCookieJar` instance
+        :param proxy_handler: optional urllib proxy handler
+        :param ssl_context: optional custom ssl context
+        :param maxsize: Maximum number of idle connections kept per host
+        :param idle_timeout: Seconds before an idle connection is discarded
+        :param host_options: dict of per-host pool overrides
+        """
+        self.pool_options = {'maxsize': maxsize, 'idle_timeout': idle_timeout, 'host_options': host_options}
+        super(PooledTransport, self).__init__(
+            cookie_jar, proxy_handler=proxy_handler, ssl_context=ssl_context)
+
+    def http_handlers(self, ssl_context=None):
+        self.handlers = [
+            KeepAliveHTTPHandler(**self.pool_options),
+            KeepAliveHTTPSHandler(context=ssl_context, **self.pool_options)
+        ]
+        return self.handlers
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close_all()
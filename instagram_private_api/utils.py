@@ -1,9 +1,12 @@
 import time
 import hmac
 import base64
+import binascii
 import hashlib
 from random import randint
+import numbers
 import os
+import sys
 from datetime import datetime
 import re
 
@@ -188,12 +191,35 @@ def ig_chunk_generator(file_data, max_chunk_size=(500 * 1024)):
             yield chunk, file_data[chunk.start: chunk.end]
 
 
+# bulk InstagramID conversions work on 72 bit values: 9 bytes, 12 base64 characters
+_BULK_ID_BYTES = 9
+_BULK_CODE_LENGTH = 12
+_SHORTCODES_RE = re.compile(r'^[A-Za-z0-9_\-]*$')
+
+if hasattr(int, 'from_bytes'):
+    def _int_from_bytes(data):
+        return int.from_bytes(data, 'big')
+
+    def _int_to_bytes(num):
+        return num.to_bytes(_BULK_ID_BYTES, 'big')
+else:   # py2
+    def _int_from_bytes(data):
+        return int(binascii.hexlify(data), 16)
+
+    def _int_to_bytes(num):
+        if num < 0 or num >> (8 * _BULK_ID_BYTES):
+            raise OverflowError('int too big to convert')
+        return binascii.unhexlify('{0:018x}'.format(num))
+
+
 class InstagramID(object):
     """
     Utility class to convert between IG's internal numeric ID and the shortcode used in weblinks.
     Does NOT apply to private accounts.
     """
     ENCODING_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    # reverse lookup of ENCODING_CHARS
+    DECODING_TABLE = dict((char, i) for i, char in enumerate(ENCODING_CHARS))
 
     @staticmethod
     def _encode(num, alphabet=ENCODING_CHARS):
@@ -203,25 +229,122 @@ class InstagramID(object):
         arr = []
         base = len(alphabet)
         while num:
-            rem = num % base
-            num //= base
+            num, rem = divmod(num, base)
             arr.append(alphabet[rem])
         arr.reverse()
         return ''.join(arr)
 
-    @staticmethod
-    def _decode(shortcode, alphabet=ENCODING_CHARS):
+    @classmethod
+    def _decode(cls, shortcode, alphabet=ENCODING_CHARS):
         """Covert a shortcode to a numeric value."""
+        if alphabet == cls.ENCODING_CHARS:
+            table = cls.DECODING_TABLE
+        else:
+            table = dict((char, i) for i, char in enumerate(alphabet))
         base = len(alphabet)
-        strlen = len(shortcode)
         num = 0
-        idx = 0
-        for char in shortcode:
-            power = (strlen - (idx + 1))
-            num += alphabet.index(char) * (base ** power)
-            idx += 1
+        try:
+            for char in shortcode:
+                num = num * base + table[char]
+        except KeyError as e:
+            raise ValueError('Invalid shortcode character: {0!r}'.format(e.args[0]))
         return num
 
+    @staticmethod
+    def _numpy_array(values):
+        """Return ``values`` if it is a NumPy array, otherwise None."""
+        numpy = sys.modules.get('numpy')
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            return values
+        return None
+
+    @classmethod
+    def expand_codes(cls, short_codes):
+        """
+        Returns the numeric IDs for many shortcodes.
+
+        :param short_codes: list of shortcodes, or a NumPy array of str
+        :return: list of numeric IDs, or a NumPy uint64 array for a NumPy array
+        """
+        if cls._numpy_array(short_codes) is not None:
+            return cls._expand_codes_numpy(short_codes)
+        short_codes = list(short_codes)
+        if any(len(short_code) > _BULK_CODE_LENGTH for short_code in short_codes):
+            return [cls._decode(short_code) for short_code in short_codes]
+        # ENCODING_CHARS is the urlsafe base64 alphabet, so all the codes, padded
+        # to a multiple of 4 characters, can be decoded in one go
+        text = ''.join([short_code.rjust(_BULK_CODE_LENGTH, 'A') for short_code in short_codes])
+        if not _SHORTCODES_RE.match(text):
+            raise ValueError('Invalid shortcode character')
+        data = base64.urlsafe_b64decode(text.encode('ascii'))
+        return [_int_from_bytes(data[i:i + _BULK_ID_BYTES])
+                for i in range(0, len(data), _BULK_ID_BYTES)]
+
+    @classmethod
+    def shorten_ids(cls, internal_ids):
+        """
+        Returns the shortcodes for many numeric media PKs.
+
+        :param internal_ids: list of numeric IDs, or media ids in the format AAA_BB,
+            or a NumPy array of integers
+        :return: list of shortcodes, or a NumPy array of str for a NumPy array
+        """
+        if cls._numpy_array(internal_ids) is not None:
+            return cls._shorten_ids_numpy(internal_ids)
+        if not isinstance(internal_ids, (list, tuple)):
+            internal_ids = list(internal_ids)
+        try:
+            data = b''.join([_int_to_bytes(num) for num in internal_ids])
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            # media ids in the AAA_BB format, or ids that do not fit in 72 bits
+            ids = [int(num) if isinstance(num, numbers.Integral) else int(str(num).split('_')[0])
+                   for num in internal_ids]
+            if any(num < 0 or num >> (8 * _BULK_ID_BYTES) for num in ids):
+                return [cls._encode(num) for num in ids]
+            data = b''.join([_int_to_bytes(num) for num in ids])
+        # ENCODING_CHARS is the urlsafe base64 alphabet
+        text = base64.urlsafe_b64encode(data).decode('ascii')
+        return [text[i:i + _BULK_CODE_LENGTH].lstrip('A') or 'A'
+                for i in range(0, len(text), _BULK_CODE_LENGTH)]
+
+    @classmethod
+    def _expand_codes_numpy(cls, short_codes):
+        import numpy   # pylint: disable=import-error
+        short_codes = numpy.asarray(short_codes, dtype='S')
+        width = short_codes.dtype.itemsize
+        table = numpy.full(256, 255, dtype=numpy.uint8)
+        for char, i in cls.DECODING_TABLE.items():
+            table[ord(char)] = i
+        # the unused trailing bytes of shorter codes are 0
+        chars = short_codes.view(numpy.uint8).reshape(len(short_codes), width)
+        lengths = numpy.char.str_len(short_codes)
+        values = table[chars]
+        if numpy.any(values[numpy.arange(width) < lengths[:, None]] == 255):
+            raise ValueError('Invalid shortcode character')
+        # 11 characters hold up to 66 bits, fall back to python ints for codes that do not fit in 64
+        if width > 11 or (width == 11 and numpy.any((lengths == 11) & (values[:, 0] >= 16))):
+            return numpy.array(
+                cls.expand_codes([c.decode('ascii') for c in short_codes]), dtype=object)
+        ids = numpy.zeros(len(short_codes), dtype=numpy.uint64)
+        for col in range(width):
+            in_code = col < lengths
+            ids[in_code] = (ids[in_code] << numpy.uint64(6)) + values[in_code, col]
+        return ids
+
+    @classmethod
+    def _shorten_ids_numpy(cls, internal_ids):
+        import numpy   # pylint: disable=import-error
+        ids = numpy.asarray(internal_ids, dtype=numpy.uint64)
+        alphabet = numpy.frombuffer(cls.ENCODING_CHARS.encode('ascii'), dtype=numpy.uint8)
+        width = 11
+        chars = numpy.empty((len(ids), width), dtype=numpy.uint8)
+        for col in range(width):
+            shift = numpy.uint64(6 * (width - 1 - col))
+            chars[:, col] = alphabet[((ids >> shift) & numpy.uint64(63)).astype(numpy.intp)]
+        short_codes = numpy.char.lstrip(chars.view('S{0:d}'.format(width)).ravel(), b'A')
+        short_codes[short_codes == b''] = b'A'
+        return short_codes.astype('U')
+
     @classmethod
     def weblink_from_media_id(cls, media_id):
         """
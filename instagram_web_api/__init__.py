@@ -8,6 +8,12 @@ from .errors import (
     ClientThrottledError,ClientBadRequestError,
 )
 from .common import ClientDeprecationWarning
+from .transport import Transport, UrllibTransport, PooledTransport
+from .cassette import Cassette, CassetteTransport, CassetteError
+from .events import EventHooks, RequestEvent
+from .jsonstream import JSONItemStream
+from .codec import JSONCodec, OrjsonCodec
+from .cache import ResponseCache, SQLiteResponseCache
 
 
 __version__ = '1.6.0'
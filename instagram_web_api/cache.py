@@ -0,0 +1,297 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    A thread-safe cache whose entries expire ``ttl`` seconds after they are set.
+    When it holds more than ``maxsize`` entries, the least recently used are evicted.
+    """
+
+    def __init__(self, ttl, maxsize=10000):
+        """
+
+        :param ttl: seconds that an entry is kept for
+        :param maxsize: maximum number of entries
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Get the value of a key that has not expired.
+
+        :param key:
+        :param default: returned if the key is not cached
+        :return:
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.time():
+                return default
+            # mark as most recently used
+            self._data[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache a value.
+
+        :param key:
+        :param value:
+        :param ttl: seconds to keep the entry for. Default: :attr:`ttl`
+        """
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a key."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache(TTLCache):
+    """
+    Cache of the response bodies of read-only endpoints, with a TTL per url pattern.
+
+    The raw body is cached and parsed again on every hit, so each caller gets
+    its own objects and ``auto_patch`` is applied to them once as usual.
+
+    .. code-block:: python
+
+        cache = ResponseCache()
+        api = Client(response_cache=cache)
+        api.user_info2('instagram')
+        print(cache.hits, cache.misses)
+    """
+
+    #: Seconds to cache responses for, by regex of the url path relative to the
+    #: client's ``api_url``. Other urls are not cached.
+    DEFAULT_TTLS = {
+        # user_info2
+        r'(?!query/|graphql/|accounts/|web/)[^/]+/$': 5 * 60,
+        # media_info2
+        r'p/[^/]+/$': 5 * 60,
+    }
+
+    def __init__(self, ttls=None, maxsize=1000):
+        """
+
+        :param ttls: dict of seconds to cache responses for, by regex of the url path
+            relative to the client's ``api_url``. Default: :attr:`DEFAULT_TTLS`
+        :param maxsize: maximum number of responses
+        """
+        super(ResponseCache, self).__init__(0, maxsize=maxsize)
+        self.ttls = [
+            (re.compile(pattern), ttl)
+            for pattern, ttl in (self.DEFAULT_TTLS if ttls is None else ttls).items()]
+        #: Number of lookups that were, and were not, cached
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, endpoint):
+        """
+        Get the TTL for a url.
+
+        :param endpoint: url path relative to the client's ``api_url``, example ``instagram/``
+        :return: seconds, or None if the url is not cached
+        """
+        endpoint = endpoint.split('?', 1)[0]
+        for pattern, ttl in self.ttls:
+            if pattern.match(endpoint):
+                return ttl
+        return None
+
+    def _load(self, key):
+        return super(ResponseCache, self).get(key)
+
+    def get(self, key, default=None):
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if value is None else value
+
+    def clear(self):
+        super(ResponseCache, self).clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    A :class:`ResponseCache` stored in an sqlite database, so that responses are kept
+    across restarts and shared by the processes that use the same file.
+
+    Bodies are stored zlib compressed. Once the stored bodies exceed ``max_bytes``,
+    the least recently used responses are evicted. Size limits are enforced every
+    :attr:`EVICT_INTERVAL` writes, so the database may briefly grow past them.
+    Lookups only read the database: the access times used for eviction are kept
+    in memory and written with the next write of the same instance.
+
+    .. code-block:: python
+
+        api = Client(response_cache=SQLiteResponseCache('responses.db'))
+    """
+
+    #: Number of writes between checks of the size limits
+    EVICT_INTERVAL = 50
+
+    def __init__(self, path, ttls=None, maxsize=100000, max_bytes=256 * 1024 * 1024,
+                 compress_level=6, timeout=30):
+        """
+
+        :param path: path of the database file
+        :param ttls: dict of seconds to cache responses for, by regex of the url path
+            relative to the client's ``api_url``. Default: :attr:`DEFAULT_TTLS`
+        :param maxsize: maximum number of responses
+        :param max_bytes: maximum total size of the compressed bodies
+        :param compress_level: zlib compression level
+        :param timeout: seconds to wait for another process's write to complete
+        """
+        super(SQLiteResponseCache, self).__init__(ttls=ttls, maxsize=maxsize)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        # access times of the responses read since the last write, by key
+        self._accessed = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, expires REAL, accessed REAL, '
+                'size INTEGER, code INTEGER, body BLOB)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def _connection(self):
+        """
+        A connection per thread, since sqlite connections cannot be shared between threads,
+        nor with a forked child process.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # a connection inherited from the parent process is not closed, that would
+            # affect the parent's use of the database
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            # readers do not block the writer, and vice versa
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write_accessed(self, conn):
+        """Write the pending access times, in the transaction of a write."""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        if accessed:
+            conn.executemany(
+                'UPDATE responses SET accessed = ? WHERE key = ? AND accessed < ?',
+                [(now, key, now) for key, now in accessed.items()])
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def _load(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT code, body FROM responses WHERE key = ? AND expires > ?', (key, now)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._accessed[key] = now
+        code, body = row
+        return code, zlib.decompress(bytes(body)).decode('utf-8')
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache a response.
+
+        :param key:
+        :param value: tuple of the status code and the response body
+        :param ttl: seconds to keep the response for
+        """
+        code, body = value
+        body = zlib.compress(body.encode('utf-8'), self.compress_level)
+        now = time.time()
+        with self._connection() as conn:
+            self._write_accessed(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, expires, accessed, size, code, body) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, now + (self.ttl if ttl is None else ttl), now, len(body), code, sqlite3.Binary(body)))
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_INTERVAL == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Remove the expired responses, and the least recently used ones that exceed the size limits."""
+        with self._connection() as conn:
+            self._write_accessed(conn)
+            conn.execute('DELETE FROM responses WHERE expires <= ?', (time.time(), ))
+            count, total = conn.execute('SELECT COUNT(*), SUM(size) FROM responses').fetchone()
+            total = total or 0
+            if count <= self.maxsize and total <= self.max_bytes:
+                return
+            evicted = 0
+            keys = []
+            for key, size in conn.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                if count - len(keys) <= self.maxsize and total - evicted <= self.max_bytes:
+                    break
+                keys.append((key, ))
+                evicted += size
+            conn.executemany('DELETE FROM responses WHERE key = ?', keys)
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM responses WHERE key = ?', (key, ))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM responses')
+        with self._lock:
+            self._accessed = {}
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Close this thread's connection to the database, writing the pending access times."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        if self._local.pid == os.getpid():
+            with conn:
+                self._write_accessed(conn)
+            conn.close()
+        self._local.conn = None
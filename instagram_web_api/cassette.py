@@ -0,0 +1,300 @@
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .compat import (
+    compat_urllib_request, compat_urllib_error,
+    compat_urllib_parse, compat_urllib_parse_urlparse,
+    compat_http_client
+)
+from .transport import Transport
+
+
+#: Version of the cassette file format. Version 2 files have a header line
+#: followed by one interaction per line, so that recording only appends to the file.
+CASSETTE_FORMAT_VERSION = 2
+
+
+class CassetteError(Exception):
+    """Raised when a request has no recorded response in a cassette being replayed."""
+    pass
+
+
+def _header_pairs(headers):
+    """Get the headers of a response as a list of [name, value] pairs, keeping repeated headers."""
+    raw_lines = getattr(headers, 'headers', None)
+    if isinstance(raw_lines, list):
+        # py2 mimetools.Message
+        pairs = []
+        for line in raw_lines:
+            name, _, value = line.partition(':')
+            pairs.append([name.strip(), value.strip()])
+        return pairs
+    return [[name, value] for name, value in headers.items()]
+
+
+def _parse_headers(pairs):
+    """Build a response headers object, as urllib does, from a list of [name, value] pairs."""
+    raw = ''.join(['{0!s}: {1!s}\r\n'.format(name, value) for name, value in pairs]) + '\r\n'
+    parse_headers = getattr(compat_http_client, 'parse_headers', None)
+    if parse_headers:
+        return parse_headers(io.BytesIO(raw.encode('iso-8859-1')))
+    # py2
+    return compat_http_client.HTTPMessage(io.BytesIO(raw))
+
+
+def _request_body(req):
+    data = getattr(req, 'data', None)
+    if data is None:
+        return None
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return data
+
+
+class Cassette(object):
+    """
+    A file of recorded http interactions, the request and the response with
+    its status, headers and raw (compressed) body, that can be replayed
+    without a network connection.
+
+    .. code-block:: python
+
+        # the first run records, later runs replay
+        api = Client(user_name, password, cassette=Cassette('user_feed.json'))
+        api.user_feed('2958144170')
+
+    Requests are matched to recorded responses by :attr:`match_on`. When the
+    same request was recorded several times, the responses are replayed in
+    the order they were recorded and the last one is repeated after that.
+    Request bodies are not matched by default since signed requests contain
+    timestamps and generated ids that differ each run.
+
+    Each interaction is appended to the file as it is recorded.
+
+    Cassettes contain the cookies set by the server, including the session
+    cookie if a login was recorded, so treat them like a saved cookie.
+    """
+
+    #: ``once``: replay if the cassette file exists, else record;
+    #: ``record``: always send requests and overwrite the cassette;
+    #: ``replay``: never send requests
+    MODES = ('once', 'record', 'replay')
+
+    #: Request attributes that can be matched on
+    MATCHERS = ('method', 'url', 'path', 'query', 'body')
+
+    def __init__(self, path, mode='once', latency=None,
+                 match_on=('method', 'url'), filter_headers=('Cookie', 'Authorization')):
+        """
+
+        :param path: path of the cassette file
+        :param mode: one of :attr:`MODES`
+        :param latency: seconds to wait before returning a replayed response,
+            or ``'recorded'`` to wait as long as the recorded request took. Default: no wait
+        :param match_on: request attributes, from :attr:`MATCHERS`, that must be
+            equal for a recorded response to be replayed. Add ``body`` only for
+            requests whose bodies are the same each run.
+        :param filter_headers: request headers that are not saved in the cassette
+        """
+        if mode not in self.MODES:
+            raise ValueError('Unknown cassette mode: {0!s}'.format(mode))
+        unknown_matchers = set(match_on) - set(self.MATCHERS)
+        if unknown_matchers:
+            raise ValueError('Unknown matchers: {0!s}'.format(', '.join(sorted(unknown_matchers))))
+        if mode == 'once':
+            mode = 'replay' if os.path.exists(path) else 'record'
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.match_on = tuple(match_on)
+        self.filter_headers = set([name.lower() for name in filter_headers])
+        self.interactions = []
+        self._index = {}
+        self._play_counts = {}
+        # whether the file has been written to by this instance, after which recording appends to it
+        self._saved = False
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        """Load the interactions from the cassette file."""
+        with open(self.path, 'r') as f:
+            header = json.loads(f.readline() or 'null')
+            version = header.get('version') if isinstance(header, dict) else None
+            if version != CASSETTE_FORMAT_VERSION:
+                raise ValueError('Unsupported cassette format version: {0!s}'.format(version))
+            self.interactions = [json.loads(line) for line in f if line.strip()]
+        self._index = {}
+        self._play_counts = {}
+        for interaction in self.interactions:
+            self._index.setdefault(self._interaction_key(interaction), []).append(interaction)
+
+    def save(self):
+        """Write the interactions to the cassette file. The file is replaced atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self._dump_line({'version': CASSETTE_FORMAT_VERSION}))
+                for interaction in self.interactions:
+                    f.write(self._dump_line(interaction))
+            getattr(os, 'replace', os.rename)(temp_path, self.path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self._saved = True
+
+    @staticmethod
+    def _dump_line(obj):
+        return json.dumps(obj, sort_keys=True, separators=(',', ':')) + '\n'
+
+    def _key(self, method, url, body):
+        parsed_url = compat_urllib_parse_urlparse(url)
+        values = {
+            'method': method.upper(),
+            'url': url,
+            'path': '{0!s}://{1!s}{2!s}'.format(parsed_url.scheme, parsed_url.netloc, parsed_url.path),
+            'query': tuple(sorted(compat_urllib_parse.parse_qsl(parsed_url.query, keep_blank_values=True))),
+            'body': body,
+        }
+        return tuple([values[matcher] for matcher in self.match_on])
+
+    def _interaction_key(self, interaction):
+        request = interaction['request']
+        if request.get('body_base64') is not None:
+            body = base64.b64decode(request['body_base64'])
+        elif request.get('body') is not None:
+            body = request['body'].encode('utf-8')
+        else:
+            body = None
+        return self._key(request['method'], request['url'], body)
+
+    def play(self, req):
+        """
+        Get the recorded interaction for a request.
+
+        :param req: a ``compat_urllib_request.Request``
+        :return: dict
+        """
+        key = self._key(req.get_method(), req.get_full_url(), _request_body(req))
+        with self._lock:
+            interactions = self._index.get(key)
+            if not interactions:
+                raise CassetteError('No recorded response in {0!s} for {1!s} {2!s}'.format(
+                    self.path, req.get_method(), req.get_full_url()))
+            count = self._play_counts.get(key, 0)
+            self._play_counts[key] = count + 1
+        return interactions[min(count, len(interactions) - 1)]
+
+    def record(self, req, response, body, duration):
+        """
+        Add an interaction to the cassette and append it to the file. The first
+        interaction recorded replaces the file.
+
+        :param req: a ``compat_urllib_request.Request``
+        :param response: the response, or ``HTTPError``
+        :param body: the raw response body
+        :param duration: seconds the request took
+        :return: the interaction dict
+        """
+        request = {
+            'method': req.get_method(),
+            'url': req.get_full_url(),
+            'headers': [[name, value] for name, value in req.header_items()
+                        if name.lower() not in self.filter_headers],
+        }
+        request_body = _request_body(req)
+        if request_body is not None:
+            try:
+                request['body'] = request_body.decode('utf-8')
+            except UnicodeDecodeError:
+                request['body_base64'] = base64.b64encode(request_body).decode('ascii')
+        interaction = {
+            'request': request,
+            'response': {
+                'status': response.code,
+                'reason': getattr(response, 'msg', None) or '',
+                'url': response.geturl(),
+                'headers': _header_pairs(response.info()),
+                'body': base64.b64encode(body).decode('ascii'),
+            },
+            'duration': round(duration, 6),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            self._index.setdefault(self._interaction_key(interaction), []).append(interaction)
+            if not self._saved:
+                self.save()
+            else:
+                with open(self.path, 'a') as f:
+                    f.write(self._dump_line(interaction))
+        return interaction
+
+
+class CassetteTransport(Transport):
+    """
+    Transport that records the requests sent with another transport to
+    a :class:`Cassette`, or replays them from it without a network connection.
+    """
+
+    def __init__(self, transport, cassette):
+        """
+
+        :param transport: the :class:`Transport` that sends the requests when recording
+        :param cassette: :class:`Cassette` instance
+        """
+        super(CassetteTransport, self).__init__(transport.cookie_jar)
+        self.transport = transport
+        self.cassette = cassette
+        self.keep_alive = transport.keep_alive
+
+    @property
+    def opener(self):
+        return getattr(self.transport, 'opener', None)
+
+    def send(self, req, timeout=None):
+        if self.cassette.mode == 'replay':
+            interaction = self.cassette.play(req)
+            latency = self.cassette.latency
+            if latency == 'recorded':
+                latency = interaction.get('duration')
+            if latency:
+                time.sleep(latency)
+            response = self._response(interaction)
+            # store the replayed cookies as the opener's cookie processor would
+            self.cookie_jar.extract_cookies(response, req)
+        else:
+            start_time = time.time()
+            try:
+                response = self.transport.send(req, timeout=timeout)
+            except compat_urllib_error.HTTPError as e:
+                response = e
+            try:
+                body = response.read()
+            finally:
+                response.close()
+            interaction = self.cassette.record(req, response, body, time.time() - start_time)
+            response = self._response(interaction)
+
+        if not 200 <= response.code < 300:
+            raise compat_urllib_error.HTTPError(
+                response.geturl(), response.code, response.msg, response.info(), response)
+        return response
+
+    @staticmethod
+    def _response(interaction):
+        recorded = interaction['response']
+        response = compat_urllib_request.addinfourl(
+            io.BytesIO(base64.b64decode(recorded['body'])), _parse_headers(recorded['headers']),
+            recorded['url'], recorded['status'])
+        response.msg = recorded['reason']
+        return response
+
+    def close(self):
+        self.transport.close()
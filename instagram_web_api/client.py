@@ -7,10 +7,8 @@
 
 import logging
 import hashlib
-import json
 import re
-import gzip
-from io import BytesIO
+import codecs
 import time
 import warnings
 from functools import wraps
@@ -35,7 +33,14 @@ try:  # Python 3:
 except NameError:  # Python 2:
     class ConnectionError(Exception):
         pass
-from .http import ClientCookieJar, MultipartFormDataEncoder
+from .http import ClientCookieJar, MultipartFormDataEncoder, iter_response_body
+from .jsonstream import JSONItemStream
+from .codec import get_codec
+from .cache import ResponseCache
+from .transport import UrllibTransport, PooledTransport
+from .cassette import Cassette, CassetteTransport
+from .events import EventHooks, compat_patch_phase, endpoint_template, monotonic
+from .pagination import PaginationMixin
 from .common import ClientDeprecationWarning
 
 logger = logging.getLogger(__name__)
@@ -51,14 +56,20 @@ def login_required(fn):
     return wrapper
 
 
-class Client(object):
+class Client(PaginationMixin, object):
     """Main API client class for the web api."""
 
+    BASE_URL = 'https://www.instagram.com/'
     API_URL = 'https://www.instagram.com/query/'
     GRAPHQL_API_URL = 'https://www.instagram.com/graphql/query/'
     USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/11.1.2 Safari/605.1.15'      # noqa
     MOBILE_USER_AGENT = 'Mozilla/5.0 (iPhone; CPU iPhone OS 11_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/11.0 Mobile/15E148 Safari/604.1'  # noqa
 
+    #: Client kwargs used to build the transport, that cannot be used with a transport instance
+    TRANSPORT_OPTIONS = (
+        'proxy', 'proxy_handler', 'custom_ssl_context', 'keep_alive',
+        'pool_maxsize', 'pool_idle_timeout', 'pool_host_options')
+
     def __init__(self, user_agent=None, **kwargs):
         """
 
@@ -69,6 +80,8 @@ class Client(object):
             - **auto_patch**: Patch the api objects to match the public API. Default: False
             - **drop_incompat_key**: Remove api object keys that is not in the public API. Default: False
             - **timeout**: Timeout interval in seconds. Default: 10
+            - **api_url**: Override the default base url ``https://www.instagram.com/``,
+              example to use a local test server
             - **username**: Login username
             - **password**: Login password
             - **authenticate**: Do login on init
@@ -77,15 +90,39 @@ class Client(object):
             - **on_login**: Callback after successful login
             - **proxy**: Specify a proxy ex: 'http://127.0.0.1:8888' (ALPHA)
             - **proxy_handler**: Specify your own proxy handler
+            - **keep_alive**: Reuse persistent connections instead of opening a new one per request.
+              Default: False
+            - **pool_maxsize**: Maximum number of idle connections kept per host. Default: 10
+            - **pool_idle_timeout**: Seconds before an idle connection is discarded. Default: 60
+            - **pool_host_options**: dict of per-host pool overrides, example
+              ``{'www.instagram.com': {'maxsize': 20, 'idle_timeout': 30}}``
+            - **transport**: A :class:`Transport` subclass, or an instance, to send requests with.
+              Default: :class:`UrllibTransport`, or :class:`PooledTransport` if ``keep_alive`` is set.
+              An instance is used as is, so the proxy, ssl context, ``keep_alive`` and pool options
+              cannot be used with it.
+            - **cassette**: Record the http traffic to, or replay it from, a file.
+              A path, or a :class:`Cassette` instance. Default: None
+            - **json_codec**: JSON backend used to parse responses, ``json`` or ``orjson``,
+              or a :class:`JSONCodec` instance. Falls back to ``json`` if orjson is not installed. Default: ``json``
+            - **response_cache**: Cache the responses of read-only pages such as :meth:`user_info2`.
+              True, or a :class:`ResponseCache` instance, example :class:`SQLiteResponseCache`
+              to keep responses on disk. Default: None
+            - **event_hooks**: A list of callables that are called with a :class:`RequestEvent`
+              for each phase of each request, with its timings. See :class:`EventHooks`
         :return:
         """
         self.auto_patch = kwargs.pop('auto_patch', False)
         self.drop_incompat_keys = kwargs.pop('drop_incompat_keys', False)
         self.timeout = kwargs.pop('timeout', 10)
+        self.api_url = kwargs.pop('api_url', None) or self.BASE_URL
+        self.json_codec = get_codec(kwargs.pop('json_codec', None))
+        response_cache = kwargs.pop('response_cache', None)
+        self.response_cache = ResponseCache() if response_cache is True else response_cache
         self.username = kwargs.pop('username', None)
         self.password = kwargs.pop('password', None)
         self.authenticate = kwargs.pop('authenticate', False)
         self.on_login = kwargs.pop('on_login', None)
+        self.event_hooks = EventHooks(kwargs.pop('event_hooks', None))
         user_settings = kwargs.pop('settings', None) or {}
         self.user_agent = user_agent or user_settings.get('user_agent') or self.USER_AGENT
         self.mobile_user_agent = (kwargs.pop('mobile_user_agent', None)
@@ -100,7 +137,16 @@ class Client(object):
         cookie_jar = ClientCookieJar(cookie_string=cookie_string)
         if cookie_string and cookie_jar.auth_expires and int(time.time()) >= cookie_jar.auth_expires:
             raise ClientCookieExpiredError('Cookie expired at {0!s}'.format(cookie_jar.auth_expires))
-        cookie_handler = compat_urllib_request.HTTPCookieProcessor(cookie_jar)
+
+        transport = kwargs.pop('transport', None)
+        if transport is not None and not isinstance(transport, type):
+            conflicting = [
+                name for name in self.TRANSPORT_OPTIONS
+                if kwargs.get(name) is not None and kwargs.get(name) is not False]
+            if conflicting:
+                raise ValueError(
+                    '{0!s} cannot be used with a transport instance, '
+                    'configure the transport instead'.format(', '.join(conflicting)))
 
         proxy_handler = kwargs.pop('proxy_handler', None)
         if not proxy_handler:
@@ -113,24 +159,27 @@ class Client(object):
                     proxy_handler = compat_urllib_request.ProxyHandler({'https': proxy_address})
                 else:
                     raise ValueError('Invalid proxy argument: {0!s}'.format(proxy))
-        handlers = []
-        if proxy_handler:
-            handlers.append(proxy_handler)
 
         custom_ssl_context = kwargs.pop('custom_ssl_context', None)
-        try:
-            https_handler = compat_urllib_request.HTTPSHandler(context=custom_ssl_context)
-        except TypeError:
-            # py version < 2.7.9
-            https_handler = compat_urllib_request.HTTPSHandler()
-
-        handlers.extend([
-            compat_urllib_request.HTTPHandler(),
-            https_handler,
-            cookie_handler])
-        opener = compat_urllib_request.build_opener(*handlers)
-        opener.cookie_jar = cookie_jar
-        self.opener = opener
+        keep_alive = kwargs.pop('keep_alive', False)
+        transport = transport or (PooledTransport if keep_alive else UrllibTransport)
+        if isinstance(transport, type):
+            transport_kwargs = {}
+            if issubclass(transport, UrllibTransport):
+                transport_kwargs.update({'proxy_handler': proxy_handler, 'ssl_context': custom_ssl_context})
+            if issubclass(transport, PooledTransport):
+                transport_kwargs.update({
+                    'maxsize': kwargs.pop('pool_maxsize', 10),
+                    'idle_timeout': kwargs.pop('pool_idle_timeout', 60),
+                    'host_options': kwargs.pop('pool_host_options', None),
+                })
+            transport = transport(cookie_jar, **transport_kwargs)
+        cassette = kwargs.pop('cassette', None)
+        if cassette:
+            if not isinstance(cassette, Cassette):
+                cassette = Cassette(cassette)
+            transport = CassetteTransport(transport, cassette)
+        self.transport = transport
 
         self.logger = logger
         if not self.csrftoken:
@@ -140,13 +189,37 @@ class Client(object):
 
     @property
     def cookie_jar(self):
-        return self.opener.cookie_jar
+        return self.transport.cookie_jar
+
+    @property
+    def opener(self):
+        """
+        The urllib opener used by the client's transport, if any.
+        Setting it replaces the transport with a :class:`UrllibTransport` that uses the opener.
+        """
+        return getattr(self.transport, 'opener', None)
+
+    @opener.setter
+    def opener(self, opener):
+        cookie_jar = getattr(opener, 'cookie_jar', None) or self.cookie_jar
+        transport = UrllibTransport(cookie_jar, opener=opener)
+        if isinstance(self.transport, CassetteTransport):
+            # keep recording to, or replaying from, the cassette
+            self.transport.transport.close()
+            self.transport.transport = transport
+            self.transport.cookie_jar = cookie_jar
+            self.transport.keep_alive = transport.keep_alive
+        else:
+            self.transport.close()
+            self.transport = transport
+
+    @property
+    def keep_alive(self):
+        """Whether the client's transport reuses connections"""
+        return self.transport.keep_alive
 
     def get_cookie_value(self, key):
-        for cookie in self.cookie_jar:
-            if cookie.name.lower() == key.lower():
-                return cookie.value
-        return None
+        return self.cookie_jar.get_cookie_value(key)
 
     @property
     def csrftoken(self):
@@ -173,28 +246,28 @@ class Client(object):
     @property
     def settings(self):
         """Helper property that extracts the settings that you should cache
-        in addition to username and password."""
+        in addition to username and password. The settings only contain
+        json serializable values."""
         return {
-            'cookie': self.opener.cookie_jar.dump(),
+            'cookie': self.cookie_jar.dump(),
             'created_ts': int(time.time()),
             'rhx_gis': self.rhx_gis,
             'user_agent': self.user_agent,
         }
 
     @staticmethod
-    def _read_response(response):
+    def _read_response(response, stats=None):
         """
         Extract the response body from a http response.
 
         :param response:
+        :param stats: optional dict to record the read times and byte counts in
         :return:
         """
-        if response.info().get('Content-Encoding') == 'gzip':
-            buf = BytesIO(response.read())
-            res = gzip.GzipFile(fileobj=buf).read().decode('utf8')
-        else:
-            res = response.read().decode('utf8')
-        return res
+        decoder = codecs.getincrementaldecoder('utf8')()
+        res = [decoder.decode(chunk) for chunk in iter_response_body(response, stats=stats)]
+        res.append(decoder.decode(b'', final=True))
+        return ''.join(res)
 
     def generate_request_signature(self, query, endpoint=None):
         if self.rhx_gis and query.get('query_hash') and query.get('variables'):
@@ -211,8 +284,27 @@ class Client(object):
         ).encode('utf-8'))
         return m.hexdigest()
 
+    def _iter_response_body(self, response, stats=None):
+        """Read the response body in chunks, raising network errors as ClientConnectionError."""
+        try:
+            for chunk in iter_response_body(response, stats=stats):
+                yield chunk
+        except (SSLError, timeout, SocketError,
+                compat_http_client.HTTPException,
+                ConnectionError) as connection_error:
+            raise ClientConnectionError('{} {}'.format(
+                connection_error.__class__.__name__, str(connection_error)))
+        finally:
+            response.close()
+
+    def _endpoint_url(self, url):
+        """Point a url of the web API at :attr:`api_url`"""
+        if self.api_url != self.BASE_URL and url.startswith(self.BASE_URL):
+            return self.api_url + url[len(self.BASE_URL):]
+        return url
+
     def _make_request(self, url, params=None, headers=None, query=None,
-                      return_response=False, get_method=None):
+                      return_response=False, get_method=None, stream_path=None):
         """
         Calls the web API.
 
@@ -222,15 +314,24 @@ class Client(object):
         :param query: get url params
         :param return_response: bool flag to only return the http response object
         :param get_method: custom http method type
+        :param stream_path: dotted path of a list in the response, example 'data.user.edge_followed_by.edges'.
+            If specified, a :class:`JSONItemStream` that yields the list items as the response
+            is read is returned instead of the parsed json object. The rest of the response,
+            including ``page_info``, is available from the stream's ``result`` once it is exhausted.
         :return:
         """
+        start = monotonic()
+        url = self._endpoint_url(url)
+        endpoint = endpoint_template(url, self.api_url)
+        if query and query.get('query_hash'):
+            endpoint += '?query_hash={0!s}'.format(query['query_hash'])
         if not headers:
             headers = {
                 'User-Agent': self.user_agent,
                 'Accept': '*/*',
                 'Accept-Language': 'en-US',
                 'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'close',
+                'Connection': 'keep-alive' if self.keep_alive else 'close',
             }
             if params or params == '':
                 headers.update({
@@ -248,16 +349,43 @@ class Client(object):
             if sig:
                 headers['X-Instagram-GIS'] = sig
 
-        req = compat_urllib_request.Request(url, headers=headers)
-        if get_method:
-            req.get_method = get_method
-
         data = None
         if params or params == '':
             if params == '':    # force post if empty string
                 data = ''.encode('ascii')
             else:
                 data = compat_urllib_parse.urlencode(params).encode('ascii')
+
+        req = compat_urllib_request.Request(url, data, headers=headers)
+        if get_method:
+            req.get_method = get_method
+
+        trace = self.event_hooks.trace(
+            req, endpoint, account_id=self.authenticated_user_id if self.event_hooks else None, start=start)
+        trace.add_phase('prepare', start, monotonic())
+        try:
+            return self._make_traced_request(req, headers, data, trace, return_response, get_method, stream_path)
+        except Exception as e:
+            trace.finish(error=e)
+            raise
+
+    def _make_traced_request(self, req, headers, data, trace, return_response, get_method, stream_path):
+        """The rest of :meth:`_make_request`, once the request is built."""
+        url = req.get_full_url()
+        cache_ttl = None
+        if (self.response_cache is not None and data is None and not get_method
+                and not (return_response or stream_path) and url.startswith(self.api_url)):
+            cache_ttl = self.response_cache.ttl_for(url[len(self.api_url):])
+            # responses can differ by account
+            cache_key = '{0!s}\n{1!s}'.format(self.authenticated_user_id or '', url)
+            cached = self.response_cache.get(cache_key) if cache_ttl else None
+            if cached:
+                # parsed again so that the cached response is never patched
+                with trace.phase('json'):
+                    json_response = self.json_codec.loads(cached[1])
+                trace.finish(status=cached[0], source='cache')
+                return json_response
+
         try:
             self.logger.debug('REQUEST: {0!s} {1!s}'.format(url, req.get_method()))
             self.logger.debug('REQ HEADERS: {0!s}'.format(
@@ -267,7 +395,7 @@ class Client(object):
                 ['{}: {}'.format(c.name, c.value) for c in self.cookie_jar]
             ))
             self.logger.debug('REQ DATA: {0!s}'.format(data))
-            res = self.opener.open(req, data=data, timeout=self.timeout)
+            res = trace.send(self.transport, req, timeout=self.timeout)
 
             self.logger.debug('RESPONSE: {0:d} {1!s}'.format(
                 res.code, res.geturl()
@@ -277,11 +405,22 @@ class Client(object):
             ))
 
             if return_response:
+                trace.finish()
                 return res
 
-            response_content = self._read_response(res)
+            if stream_path:
+                return JSONItemStream(
+                    self._iter_response_body(res, trace.stats), stream_path,
+                    on_complete=lambda json_response: trace.finish())
+
+            response_content = self._read_response(res, trace.stats)
             self.logger.debug('RES BODY: {0!s}'.format(response_content))
-            return json.loads(response_content)
+            with trace.phase('json'):
+                json_response = self.json_codec.loads(response_content)
+            if cache_ttl:
+                self.response_cache.set(cache_key, (res.code, response_content), ttl=cache_ttl)
+            trace.finish()
+            return json_response
 
         except compat_urllib_error.HTTPError as e:
             msg = 'HTTPError "{0!s}" while opening {1!s}'.format(e.reason, url)
@@ -416,7 +555,8 @@ class Client(object):
             raise ClientError('Not Found', 404)
 
         if self.auto_patch:
-            user = ClientCompatPatch.user(user, drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                user = ClientCompatPatch.user(user, drop_incompat_keys=self.drop_incompat_keys)
         return user
 
     def user_info2(self, user_name, **kwargs):
@@ -439,7 +579,8 @@ class Client(object):
             info = self._make_request(endpoint, query={'__a': '1'})
 
         if self.auto_patch:
-            ClientCompatPatch.user(info['graphql']['user'], drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                ClientCompatPatch.user(info['graphql']['user'], drop_incompat_keys=self.drop_incompat_keys)
         return info['graphql']['user']
 
     def user_feed(self, user_id, **kwargs):
@@ -473,7 +614,7 @@ class Client(object):
             variables['after'] = end_cursor
         query = {
             'query_hash': 'e7e2f4da4b02303f74f0841279e52d76',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -484,9 +625,10 @@ class Client(object):
             raise ClientError('Not Found', 404)
 
         if self.auto_patch:
-            [ClientCompatPatch.media(media['node'], drop_incompat_keys=self.drop_incompat_keys)
-             for media in info.get('data', {}).get('user', {}).get(
-                 'edge_owner_to_timeline_media', {}).get('edges', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(media['node'], drop_incompat_keys=self.drop_incompat_keys)
+                 for media in info.get('data', {}).get('user', {}).get(
+                     'edge_owner_to_timeline_media', {}).get('edges', [])]
 
         if kwargs.pop('extract', True):
             return info.get('data', {}).get('user', {}).get(
@@ -519,7 +661,8 @@ class Client(object):
             raise ClientError('Not Found', 404)
 
         if self.auto_patch:
-            media = ClientCompatPatch.media(media, drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                media = ClientCompatPatch.media(media, drop_incompat_keys=self.drop_incompat_keys)
         return media
 
     def media_info2(self, short_code):
@@ -535,7 +678,7 @@ class Client(object):
             'Accept': '*/*',
             'Accept-Language': 'en-US',
             'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'close',
+            'Connection': 'keep-alive' if self.keep_alive else 'close',
             'Referer': 'https://www.instagram.com',
             'x-requested-with': 'XMLHttpRequest',
         }
@@ -545,7 +688,8 @@ class Client(object):
             headers=headers)
         media = info.get('graphql', {}).get('shortcode_media', {})
         if self.auto_patch:
-            media = ClientCompatPatch.media(media, drop_incompat_keys=self.drop_incompat_keys)
+            with compat_patch_phase():
+                media = ClientCompatPatch.media(media, drop_incompat_keys=self.drop_incompat_keys)
         return media
 
     def media_comments(self, short_code, **kwargs):
@@ -572,7 +716,7 @@ class Client(object):
             variables['after'] = end_cursor
         query = {
             'query_hash': 'f0986789a5c5d17c2400faebf16efd0d',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
@@ -583,9 +727,10 @@ class Client(object):
             raise ClientError('Not Found', 404)
 
         if self.auto_patch:
-            [ClientCompatPatch.comment(c['node'], drop_incompat_keys=self.drop_incompat_keys)
-             for c in info.get('data', {}).get('shortcode_media', {}).get(
-                 'edge_media_to_comment', {}).get('edges', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.comment(c['node'], drop_incompat_keys=self.drop_incompat_keys)
+                 for c in info.get('data', {}).get('shortcode_media', {}).get(
+                     'edge_media_to_comment', {}).get('edges', [])]
 
         if kwargs.pop('extract', True):
             return [c['node'] for c in info.get('data', {}).get('shortcode_media', {}).get(
@@ -621,7 +766,7 @@ class Client(object):
             variables['after'] = end_cursor
         query = {
             'query_hash': 'e0f59e4a1c8d78d0161873bc2ee7ec44',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
@@ -662,14 +807,15 @@ class Client(object):
 
         query = {
             'query_hash': 'c56ee0ae1f89cdbd1c89e2bc6b8f3d18',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u['node'], drop_incompat_keys=self.drop_incompat_keys)
-             for u in info.get('data', {}).get('user', {}).get(
-                 'edge_follow', {}).get('edges', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u['node'], drop_incompat_keys=self.drop_incompat_keys)
+                 for u in info.get('data', {}).get('user', {}).get(
+                     'edge_follow', {}).get('edges', [])]
 
         if kwargs.pop('extract', True):
             return [u['node'] for u in info.get('data', {}).get('user', {}).get(
@@ -702,14 +848,15 @@ class Client(object):
 
         query = {
             'query_hash': '7dd9a7e2160524fd85f50317462cff9f',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
         if self.auto_patch:
-            [ClientCompatPatch.list_user(u['node'], drop_incompat_keys=self.drop_incompat_keys)
-             for u in info.get('data', {}).get('user', {}).get(
-                 'edge_followed_by', {}).get('edges', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.list_user(u['node'], drop_incompat_keys=self.drop_incompat_keys)
+                 for u in info.get('data', {}).get('user', {}).get(
+                     'edge_followed_by', {}).get('edges', [])]
 
         if kwargs.pop('extract', True):
             return [u['node'] for u in info.get('data', {}).get('user', {}).get(
@@ -861,8 +1008,9 @@ class Client(object):
         endpoint = 'https://www.instagram.com/web/search/topsearch/'
         res = self._make_request(endpoint, query={'query': query_text})
         if self.auto_patch:
-            for u in res.get('users', []):
-                ClientCompatPatch.list_user(u['user'])
+            with compat_patch_phase():
+                for u in res.get('users', []):
+                    ClientCompatPatch.list_user(u['user'])
         return res
 
     @login_required
@@ -894,7 +1042,7 @@ class Client(object):
             'Accept': '*/*',
             'Accept-Language': 'en-US',
             'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'close',
+            'Connection': 'keep-alive' if self.keep_alive else 'close',
             'x-csrftoken': self.csrftoken,
             'x-requested-with': 'XMLHttpRequest',
             'x-instagram-ajax': self.rollout_hash,
@@ -903,16 +1051,16 @@ class Client(object):
             'Content-Type': content_type,
             'Content-Length': len(body)
         }
-        endpoint = 'https://www.instagram.com/create/upload/photo/'
+        endpoint = self._endpoint_url('https://www.instagram.com/create/upload/photo/')
         req = compat_urllib_request.Request(endpoint, body, headers=headers)
         self.logger.debug('REQUEST: {0!s}'.format(endpoint))
 
         try:
-            res = self.opener.open(req, timeout=self.timeout)
+            res = self.transport.send(req, timeout=self.timeout)
             response_content = self._read_response(res)
 
             self.logger.debug('RESPONSE: {0!s}'.format(response_content))
-            upload_res = json.loads(response_content)
+            upload_res = self.json_codec.loads(response_content)
             if upload_res.get('status', '') != 'ok':
                 raise ClientError('Upload status: {}'.format(upload_res.get('status', '')))
             upload_id = upload_res['upload_id']
@@ -960,7 +1108,7 @@ class Client(object):
             variables['after'] = end_cursor
         query = {
             'query_hash': 'f92f56d47dc7a55b606908374b43a314',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         return self._make_request(self.GRAPHQL_API_URL, query=query)
@@ -990,7 +1138,7 @@ class Client(object):
 
         query = {
             'query_hash': '1b84447a4d8b6d6d0426fefb34514485',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
 
         return self._make_request(self.GRAPHQL_API_URL, query=query)
@@ -1022,7 +1170,7 @@ class Client(object):
             variables['fetch_media_item_cursor'] = end_cursor
         query = {
             'query_hash': '3f01472fb28fb8aca9ad9dbc9d4578ff',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         return self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1033,7 +1181,7 @@ class Client(object):
         """
         query = {
             'query_hash': '60b755363b5c230111347a7a4e242001',
-            'variables': json.dumps({'only_stories': False}, separators=(',', ':'))
+            'variables': self.json_codec.dumps({'only_stories': False})
         }
         return self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1049,7 +1197,7 @@ class Client(object):
         }
         query = {
             'query_hash': 'eb1918431e946dd39bf8cf8fb870e426',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         return self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1081,7 +1229,7 @@ class Client(object):
         }
         query = {
             'query_hash': '7c16654f22c819fb63d1183034a5162f',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         return self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1099,7 +1247,7 @@ class Client(object):
         }
         query = {
             'query_hash': '45246d3fe16ccc6577e0bd297a5db1ab',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         return self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1123,7 +1271,7 @@ class Client(object):
             variables['after'] = end_cursor
         query = {
             'query_hash': 'ff260833edf142911047af6024eb634a',
-            'variables': json.dumps(variables, separators=(',', ':'))
+            'variables': self.json_codec.dumps(variables)
         }
         info = self._make_request(self.GRAPHQL_API_URL, query=query)
 
@@ -1133,9 +1281,10 @@ class Client(object):
             raise ClientError('Not Found', 404)
 
         if self.auto_patch:
-            [ClientCompatPatch.media(media['node'], drop_incompat_keys=self.drop_incompat_keys)
-             for media in info.get('data', {}).get('user', {}).get(
-                 'edge_user_to_photos_of_you', {}).get('edges', [])]
+            with compat_patch_phase():
+                [ClientCompatPatch.media(media['node'], drop_incompat_keys=self.drop_incompat_keys)
+                 for media in info.get('data', {}).get('user', {}).get(
+                     'edge_user_to_photos_of_you', {}).get('edges', [])]
 
         return info
 
@@ -0,0 +1,117 @@
+import json
+import math
+import re
+
+# orjson output that may differ from the stdlib's:
+# non-printable or non-ascii characters, escapes, and floats with exponents
+_NON_CANONICAL_RE = re.compile(br'[^\x20-\x7e]|\\u|\de')
+
+
+# types that orjson serializes like the stdlib, including subclasses
+_NATIVE_TYPES = (str, int, float, type(None))
+
+
+def _needs_stdlib(obj):
+    """
+    Whether ``obj`` contains values that orjson serializes differently from the stdlib:
+    NaN and infinite floats, which orjson writes as ``null``, and types that the stdlib
+    rejects but orjson serializes, such as UUID, datetime and dataclasses.
+    """
+    if isinstance(obj, float):
+        return math.isnan(obj) or math.isinf(obj)
+    if isinstance(obj, dict):
+        return any(_needs_stdlib(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_needs_stdlib(value) for value in obj)
+    return not isinstance(obj, _NATIVE_TYPES)
+
+
+class JSONCodec(object):
+    """
+    Default JSON codec, using the stdlib json module.
+
+    Subclass and override :meth:`dumps` and :meth:`loads` to plug in
+    another JSON backend. :meth:`dumps` must return exactly what
+    ``json.dumps(obj, separators=(',', ':'))`` does because the request
+    signature is computed over it.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        """
+        Serialize ``obj`` to a compact ascii JSON str.
+
+        :param obj:
+        :return:
+        """
+        return json.dumps(obj, separators=(',', ':'))
+
+    def loads(self, s):
+        """
+        Deserialize a JSON document.
+
+        :param s: str
+        :return:
+        """
+        return json.loads(s)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    JSON codec using `orjson <https://github.com/ijl/orjson>`_.
+
+    Whenever orjson would produce different output from the stdlib, for
+    example for non-ascii text or NaN, or would serialize a type that the stdlib
+    rejects, such as a UUID, :meth:`dumps` falls back to the stdlib.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson   # pylint: disable=import-error
+        self.orjson = orjson
+
+    def dumps(self, obj):
+        if _needs_stdlib(obj):
+            # the stdlib writes NaN and Infinity, and raises TypeError for non-JSON types
+            return super(OrjsonCodec, self).dumps(obj)
+        try:
+            res = self.orjson.dumps(obj)    # pylint: disable=no-member
+        except TypeError:
+            # Unsupported types, such as non-str keys or big ints
+            return super(OrjsonCodec, self).dumps(obj)
+        if _NON_CANONICAL_RE.search(res):
+            return super(OrjsonCodec, self).dumps(obj)
+        return res.decode('ascii')
+
+    def loads(self, s):
+        try:
+            return self.orjson.loads(s)     # pylint: disable=no-member
+        except self.orjson.JSONDecodeError as e:     # pylint: disable=no-member
+            # Raise a ValueError like the stdlib does
+            raise ValueError(str(e))
+
+
+CODECS = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """
+    Get a JSON codec.
+
+    :param codec: a :class:`JSONCodec` instance, or the name of a codec: ``json`` or ``orjson``.
+        If the backend for the named codec is not installed, the stdlib codec is returned.
+    :return: :class:`JSONCodec` instance
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec and codec not in CODECS:
+        raise ValueError('Unknown json codec: {0!s}'.format(codec))
+    try:
+        return CODECS.get(codec or JSONCodec.name)()
+    except ImportError:
+        return JSONCodec()
@@ -0,0 +1,41 @@
+import sys
+import threading
+
+
+class BackgroundCall(object):
+    """Runs a function in a daemon thread and holds on to its outcome."""
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._result = None
+        self._exc_info = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._func(*self._args, **self._kwargs)
+        except Exception:   # pylint: disable=broad-except
+            self._exc_info = sys.exc_info()
+
+    def done(self):
+        """Whether the call has completed."""
+        return not self._thread.is_alive()
+
+    def result(self, timeout=None):
+        """
+        Wait for the call to complete and return its result,
+        or raise the exception raised by the call.
+
+        :param timeout: seconds to wait for
+        :return:
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise RuntimeError('Call did not complete in time')
+        if self._exc_info:
+            raise self._exc_info[1]
+        return self._result
@@ -0,0 +1,385 @@
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+from itertools import count
+
+from .compat import compat_urllib_error, compat_urllib_parse_urlparse
+
+logger = logging.getLogger(__name__)
+
+#: Monotonic clock used for the event timestamps, in seconds
+monotonic = getattr(time, 'perf_counter', time.time)
+
+# path segments that are ids, example '1234567' or '1234567_89'
+_ID_SEGMENT_RE = re.compile(r'^[0-9]+(_[0-9]+)?$')
+
+# the trace of the last request made in the thread, until its compat patching is timed,
+# see compat_patch_phase(), and the retry count, see retrying()
+_current = threading.local()
+
+
+class RequestEvent(namedtuple('RequestEvent', [
+        'name', 'request_id', 'start', 'end', 'duration', 'method', 'url', 'endpoint',
+        'status', 'bytes_sent', 'bytes_received', 'bytes_decoded', 'retry_count',
+        'account_id', 'connection_reused', 'source', 'error'])):
+    """
+    A phase of a request, passed to the hooks of :class:`EventHooks`.
+
+    - **name**: the phase, one of :attr:`EventHooks.PHASES`
+    - **request_id**: number of the request, shared by the events of a request
+    - **start**, **end**: :func:`monotonic` timestamps of the phase
+    - **duration**: seconds spent in the phase. Less than ``end - start`` for phases that
+      are interleaved with others, such as ``download`` and ``decompress``
+    - **method**, **url**: of the request
+    - **endpoint**: the url path with ids replaced by ``{id}``, example
+      ``feed/user/{id}/`` for the private API, to group events by
+    - **status**: the http status code, None if no response was received
+    - **bytes_sent**: size of the request body
+    - **bytes_received**: size of the response body as received, None if not read
+    - **bytes_decoded**: size of the decompressed response body, None if not read
+    - **retry_count**: number of earlier attempts, example when an upload is retried
+    - **account_id**: the authenticated user id
+    - **connection_reused**: whether a kept alive connection was reused, None if unknown
+    - **source**: ``network``, ``cache`` for a cached response, or ``shared`` for
+      a response shared with a concurrent identical request
+    - **error**: the exception raised by the request, if any
+    """
+
+    __slots__ = ()
+
+
+RequestEvent.__new__.__defaults__ = (None, ) * len(RequestEvent._fields)
+
+
+def endpoint_template(url, base_url=''):
+    """
+    Get the path of a url with the ids replaced by ``{id}``.
+
+    :param url: the request url
+    :param base_url: the part of the url to strip, example the api url
+    :return:
+    """
+    if base_url and url.startswith(base_url):
+        path = url[len(base_url):]
+    else:
+        path = compat_urllib_parse_urlparse(url).path
+    path = path.partition('?')[0]
+    return '/'.join(['{id}' if _ID_SEGMENT_RE.match(segment) else segment for segment in path.split('/')])
+
+
+class _NullTrace(object):
+    """A trace that records nothing, used when there are no event hooks."""
+
+    stats = None
+    source = None
+
+    def add_phase(self, name, start, end, duration=None):
+        pass
+
+    def phase(self, name, start=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send(self, transport, req, timeout=None):
+        return transport.send(req, timeout=timeout)
+
+    def finish(self, status=None, error=None, source=None):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class _Phase(object):
+    """Context manager that adds the time spent in its block to a trace as a phase."""
+
+    def __init__(self, trace, name, start=None):
+        self.trace = trace
+        self.name = name
+        self.start = start
+
+    def __enter__(self):
+        if self.start is None:
+            self.start = monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add_phase(self.name, self.start, monotonic())
+        return False
+
+
+class _CompatPatchPhase(_Phase):
+    """A phase that follows a finished request, reported when its block exits."""
+
+    def __init__(self, trace):
+        super(_CompatPatchPhase, self).__init__(trace, 'compat_patch')
+
+    def __exit__(self, *exc_info):
+        self.trace.emit(self.name, self.start, monotonic())
+        return False
+
+
+class RequestTrace(object):
+    """
+    The phases of a request, reported to the event hooks when the request
+    is finished. Phases are added with :meth:`phase` and :meth:`send`, and
+    by reading the response with :attr:`stats`.
+    """
+
+    def __init__(self, hooks, request_id, req, endpoint, account_id=None, retry_count=0, start=None):
+        """
+
+        :param hooks: :class:`EventHooks` instance
+        :param request_id:
+        :param req: a ``compat_urllib_request.Request``
+        :param endpoint: the endpoint template
+        :param account_id:
+        :param retry_count:
+        :param start: timestamp the request started at. Default: now
+        """
+        self.hooks = hooks
+        self.start = monotonic() if start is None else start
+        data = req.data if hasattr(req, 'data') else req.get_data()
+        self.fields = {
+            'request_id': request_id,
+            'method': req.get_method(),
+            'url': req.get_full_url(),
+            'endpoint': endpoint,
+            'bytes_sent': len(data) if data else 0,
+            'retry_count': retry_count,
+            'account_id': account_id,
+        }
+        self.phases = []
+        #: Filled in by the transport's connections, and when reading the response body
+        self.stats = {}
+        #: Set to ``network`` when the request is sent
+        self.source = None
+        self.finished = False
+
+    def add_phase(self, name, start, end, duration=None):
+        self.phases.append((name, start, end, end - start if duration is None else duration))
+
+    def phase(self, name, start=None):
+        """
+        Time a block as a phase of the request.
+
+        .. code-block:: python
+
+            with trace.phase('json'):
+                json_response = json.loads(response_content)
+
+        :param name:
+        :param start: timestamp the phase started at. Default: when the block is entered
+        :return: a context manager
+        """
+        return _Phase(self, name, start)
+
+    def send(self, transport, req, timeout=None):
+        """Send a request with a transport, adding the connection and server phases."""
+        self.source = 'network'
+        req.timings = self.stats
+        start = monotonic()
+        try:
+            response = transport.send(req, timeout=timeout)
+        except compat_urllib_error.HTTPError as e:
+            self.fields['status'] = e.code
+            raise
+        finally:
+            end = monotonic()
+            server_start = start
+            for name in ('dns', 'connect', 'tls'):
+                timing = self.stats.get(name)
+                if timing:
+                    self.add_phase(name, *timing)
+                    server_start = max(server_start, timing[1])
+            # time to the response headers, including sending the request
+            self.add_phase('server', server_start, end)
+        self.fields['status'] = response.code
+        return response
+
+    def _read_phases(self):
+        for name in ('download', 'decompress'):
+            if name in self.stats:
+                start, end, duration = self.stats[name]
+                self.add_phase(name, start, end, duration)
+        if 'bytes_received' in self.stats:
+            self.fields['bytes_received'] = self.stats['bytes_received']
+            self.fields['bytes_decoded'] = self.stats['bytes_decoded']
+
+    def finish(self, status=None, error=None, source=None):
+        """
+        Report the phases of the request to the event hooks,
+        followed by a ``request`` event for the whole request.
+
+        :param status: the http status code
+        :param error: the exception raised, if any
+        :param source: Default: :attr:`source`
+        """
+        if self.finished:
+            return
+        self.finished = True
+        end = monotonic()
+        self._read_phases()
+        if status is not None:
+            self.fields['status'] = status
+        self.fields['error'] = error
+        self.fields['source'] = source or self.source
+        self.fields['connection_reused'] = self.stats.get('reused')
+        self.phases.sort(key=lambda phase: phase[1])
+        self.phases.append(('request', self.start, end, end - self.start))
+        for name, start, end, duration in self.phases:
+            self.hooks.emit(RequestEvent(name=name, start=start, end=end, duration=duration, **self.fields))
+        if error is None:
+            # compat patching, which follows in the endpoint, is reported with this request's fields
+            _current.trace = self
+
+    def emit(self, name, start, end):
+        """Report a phase that follows the request."""
+        self.hooks.emit(RequestEvent(name=name, start=start, end=end, duration=end - start, **self.fields))
+
+
+class EventHooks(object):
+    """
+    Callables that are called with a :class:`RequestEvent` for each phase of
+    each request made by a client, to feed timings to a metrics system.
+
+    .. code-block:: python
+
+        def on_event(event):
+            statsd.timing('instagram.{0!s}.{1!s}'.format(event.endpoint, event.name), event.duration * 1000)
+
+        api = Client(user_name, password, event_hooks=[on_event])
+        # or
+        api.event_hooks.add(on_event)
+
+    The events of a request are reported once the request is finished, in the order
+    of :attr:`PHASES`, in the thread that made the request. The last is ``request``,
+    for the whole request. Exceptions raised by hooks are logged and ignored.
+    """
+
+    #: - ``prepare``: building and signing the request
+    #: - ``dns``, ``connect``, ``tls``: opening a new connection. Not reported for
+    #:   reused connections. ``tls`` includes setting up a proxy tunnel.
+    #: - ``server``: sending the request and waiting for the response headers
+    #: - ``download``: reading the response body
+    #: - ``decompress``: decompressing and decoding the response body
+    #: - ``json``: parsing the response
+    #: - ``request``: the whole request
+    #: - ``compat_patch``: patching the response with ``auto_patch`` in the endpoint,
+    #:   reported after ``request``
+    PHASES = ('prepare', 'dns', 'connect', 'tls', 'server', 'download', 'decompress', 'json',
+              'request', 'compat_patch')
+
+    def __init__(self, hooks=None):
+        """
+
+        :param hooks: list of callables
+        """
+        self._hooks = tuple(hooks or ())
+        self._request_ids = count(1)
+
+    def add(self, hook):
+        """Add a hook. Safe to call while requests are being made."""
+        self._hooks = self._hooks + (hook, )
+
+    def remove(self, hook):
+        """Remove a hook."""
+        self._hooks = tuple([h for h in self._hooks if h != hook])
+
+    def __len__(self):
+        return len(self._hooks)
+
+    def __iter__(self):
+        return iter(self._hooks)
+
+    def emit(self, event):
+        """
+        Call the hooks with an event.
+
+        :param event: :class:`RequestEvent`
+        """
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception:   # pylint: disable=broad-except
+                logger.warning('Event hook %r failed', hook, exc_info=True)
+
+    def trace(self, req, endpoint, account_id=None, start=None, retry_count=None):
+        """
+        Start the trace of a request.
+
+        :param req: a ``compat_urllib_request.Request``
+        :param endpoint: the endpoint template
+        :param account_id:
+        :param start: timestamp the request started at. Default: now
+        :param retry_count: Default: as set by :meth:`retrying`, else 0
+        :return: a :class:`RequestTrace`, or a trace that records nothing if there are no hooks
+        """
+        _current.trace = None
+        if not self._hooks:
+            return NULL_TRACE
+        if retry_count is None:
+            retry_count = getattr(_current, 'retry_count', 0)
+        return RequestTrace(
+            self, next(self._request_ids), req, endpoint, account_id=account_id,
+            retry_count=retry_count, start=start)
+
+    @staticmethod
+    def retrying(retry_count):
+        """
+        Report the requests made in the block, in this thread, with a retry count.
+
+        .. code-block:: python
+
+            for attempt in range(3):
+                with api.event_hooks.retrying(attempt):
+                    api.configure_video(...)
+
+        :param retry_count: number of earlier attempts
+        :return: a context manager
+        """
+        return _Retrying(retry_count)
+
+
+class _Retrying(object):
+
+    def __init__(self, retry_count):
+        self.retry_count = retry_count
+
+    def __enter__(self):
+        self.previous = getattr(_current, 'retry_count', 0)
+        _current.retry_count = self.retry_count
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.retry_count = self.previous
+        return False
+
+
+def compat_patch_phase():
+    """
+    Time a block that patches the results of the last request made in the thread,
+    as the ``compat_patch`` phase of the request if it has event hooks.
+
+    .. code-block:: python
+
+        res = self._call_api(endpoint)
+        if self.auto_patch:
+            with compat_patch_phase():
+                ClientCompatPatch.media(res['media'])
+
+    :return: a context manager
+    """
+    trace = getattr(_current, 'trace', None)
+    if trace is None:
+        return NULL_TRACE
+    # a single compat_patch phase per request
+    _current.trace = None
+    return _CompatPatchPhase(trace)
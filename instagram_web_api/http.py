@@ -1,23 +1,132 @@
 from io import BytesIO
 import sys
 import codecs
+import json
 import mimetypes
+import operator
 import random
+import socket
 import string
+import threading
+import time
+import zlib
+from socket import error as SocketError
 
-from .compat import compat_cookiejar, compat_pickle
+from .compat import (
+    compat_cookiejar, compat_pickle, compat_urllib_request,
+    compat_urllib_error, compat_http_client
+)
+from .events import monotonic
+
+
+#: Number of bytes read from the socket at a time when reading a response
+RESPONSE_CHUNK_SIZE = 16 * 1024
+
+#: Version of the format written by :meth:`ClientCookieJar.dump`
+COOKIE_FORMAT_VERSION = 2
+
+# Serialized cookie layout: the values of _COOKIE_FIELDS, in the order of the Cookie arguments
+_COOKIE_FIELDS = (
+    'version', 'name', 'value', 'port', 'port_specified', 'domain', 'domain_specified',
+    'domain_initial_dot', 'path', 'path_specified', 'secure', 'expires', 'discard',
+    'comment', 'comment_url', '_rest', 'rfc2109',
+)
+_get_cookie_fields = operator.attrgetter(*_COOKIE_FIELDS)
 
 
 class ClientCookieJar(compat_cookiejar.CookieJar):
-    """Custom CookieJar that can be pickled to/from strings
+    """Custom CookieJar that can be serialized to/from strings
     """
+
+    #: Set to False to refuse loading cookies saved in the legacy pickle format,
+    #: for example when reading from untrusted storage
+    allow_pickle = True
+
     def __init__(self, cookie_string=None, policy=None):
         compat_cookiejar.CookieJar.__init__(self, policy)
+        self._index = {}
+        # the result of dump(), until the cookies change
+        self._dumped = None
         if cookie_string:
-            if isinstance(cookie_string, bytes):
-                self._cookies = compat_pickle.loads(cookie_string)
+            self.load(cookie_string)
+
+    def load(self, cookie_string):
+        """
+        Replace the cookies with those from a string returned by :meth:`dump`.
+        Strings in the legacy pickle format are also accepted.
+
+        :param cookie_string: str or bytes
+        :return:
+        """
+        if not isinstance(cookie_string, bytes):
+            cookie_string = cookie_string.encode('utf-8')
+        if cookie_string.lstrip()[:1] != b'{':
+            if not self.allow_pickle:
+                raise ValueError('Loading pickled cookies is not allowed')
+            cookies = compat_pickle.loads(cookie_string)
+        else:
+            data = json.loads(cookie_string.decode('utf-8'))
+            version = data.get('version')
+            if version != COOKIE_FORMAT_VERSION:
+                raise ValueError('Unsupported cookie format version: {0!s}'.format(version))
+            cookies = {}
+            for values in data.get('cookies', []):
+                # _COOKIE_FIELDS are in the order of the Cookie arguments
+                cookie = compat_cookiejar.Cookie(*values)
+                cookies.setdefault(cookie.domain, {}).setdefault(cookie.path, {})[cookie.name] = cookie
+        with self._cookies_lock:
+            self._cookies = cookies
+            self._reindex()
+            self._dumped = None
+
+    def _iter_cookies(self):
+        """Iterate over the cookies in the same order as iterating over the jar, without the overhead."""
+        if sys.version_info[0] < 3:
+            # py2 iterates over the jar in sorted key order
+            return iter(self)
+        return (cookie for paths in self._cookies.values()
+                for names in paths.values() for cookie in names.values())
+
+    def _reindex(self):
+        """Rebuild the index of cookies by name."""
+        index = {}
+        for cookie in self._iter_cookies():
+            index.setdefault(cookie.name.lower(), []).append(cookie)
+        self._index = index
+
+    def set_cookie(self, cookie):
+        with self._cookies_lock:
+            compat_cookiejar.CookieJar.set_cookie(self, cookie)
+            self._dumped = None
+            name = cookie.name.lower()
+            cookies = list(self._index.get(name, []))
+            keys = [(c.domain, c.path, c.name) for c in cookies]
+            key = (cookie.domain, cookie.path, cookie.name)
+            if key in keys:
+                # a replaced cookie keeps its position in the jar
+                cookies[keys.index(key)] = cookie
+            elif not cookies:
+                cookies = [cookie]
             else:
-                self._cookies = compat_pickle.loads(cookie_string.encode('utf-8'))
+                # keep the same order as iterating over the jar
+                cookies = [c for c in self._iter_cookies() if c.name.lower() == name]
+            self._index[name] = cookies
+
+    def clear(self, domain=None, path=None, name=None):
+        with self._cookies_lock:
+            compat_cookiejar.CookieJar.clear(self, domain, path, name)
+            self._reindex()
+            self._dumped = None
+
+    def get_cookie_value(self, name):
+        """
+        Get the value of a cookie.
+
+        :param name: cookie name, case-insensitive
+        :return:
+        """
+        cookies = self._index.get(name.lower())
+        return cookies[0].value if cookies else None
 
     @property
     def auth_expires(self):
@@ -37,7 +146,20 @@ class ClientCookieJar(compat_cookiejar.CookieJar):
         return self.auth_expires
 
     def dump(self):
-        return compat_pickle.dumps(self._cookies)
+        """
+        Serialize the cookies to a compact versioned JSON string.
+        The string is reused until cookies are set or cleared, so changes made
+        directly to a cookie's attributes are not picked up.
+
+        :return: str
+        """
+        with self._cookies_lock:
+            if self._dumped is None:
+                self._dumped = json.dumps({
+                    'version': COOKIE_FORMAT_VERSION,
+                    'cookies': [_get_cookie_fields(cookie) for cookie in self._iter_cookies()],
+                }, separators=(',', ':'))
+            return self._dumped
 
 
 class MultipartFormDataEncoder(object):
@@ -92,3 +214,448 @@ class MultipartFormDataEncoder(object):
         for chunk, _ in self.iter(fields, files):
             body.write(chunk)
         return self.content_type, body.getvalue()
+
+
+class PooledHTTPResponse(compat_http_client.HTTPResponse):
+    """HTTPResponse that hands its connection back to the pool once the body
+    has been fully read. If the response is closed before that, the rest of
+    the body is still on the socket, so the connection is closed instead."""
+
+    _release_callback = None
+    _reading = False
+
+    def _release(self, reusable=True):
+        callback, self._release_callback = self._release_callback, None
+        if callback:
+            callback(reusable)
+
+    def read(self, amt=None):
+        self._reading = True
+        try:
+            return compat_http_client.HTTPResponse.read(self, amt)
+        finally:
+            self._reading = False
+
+    def _close_conn(self):
+        # py3: called when the body has been exhausted, and from close()
+        compat_http_client.HTTPResponse._close_conn(self)
+        self._release()
+
+    def close(self):
+        # py2 closes the response from read() once the body has been exhausted
+        if not self._reading and not self.isclosed():
+            self._release(reusable=False)
+        compat_http_client.HTTPResponse.close(self)
+        self._release()
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of idle persistent connections to a single host."""
+
+    def __init__(self, connection_factory, maxsize=10, idle_timeout=60):
+        """
+
+        :param connection_factory: callable that returns a new, unconnected HTTPConnection
+        :param maxsize: Maximum number of idle connections kept
+        :param idle_timeout: Seconds after which an idle connection is discarded
+        """
+        self.connection_factory = connection_factory
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Get an idle connection, or a new one if none is available.
+
+        :return: tuple of (connection, is_reused)
+        """
+        now = time.time()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if conn.sock is None or (self.idle_timeout and now - last_used > self.idle_timeout):
+                    conn.close()
+                    continue
+                return conn, True
+        return self.connection_factory(), False
+
+    def put(self, conn):
+        """Return a connection to the pool. Closed or surplus connections are discarded."""
+        if conn.sock is not None:
+            with self._lock:
+                if len(self._idle) < self.maxsize:
+                    self._idle.append((conn, time.time()))
+                    return
+        conn.close()
+
+    def clear(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    def __len__(self):
+        return len(self._idle)
+
+
+def _timed_create_connection(timings):
+    """
+    Get a replacement for ``socket.create_connection`` that records the
+    dns lookup and tcp connect times, as (start, end) tuples, in ``timings``.
+    """
+    def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        host, port = address
+        start = monotonic()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        timings['dns'] = (start, monotonic())
+        start = monotonic()
+        err = None
+        for family, socktype, proto, _, sockaddr in addresses:
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                timings['connect'] = (start, monotonic())
+                return sock
+            except SocketError as e:
+                err = e
+                if sock is not None:
+                    sock.close()
+        if err is not None:
+            raise err
+        raise SocketError('getaddrinfo returns an empty list')
+    return create_connection
+
+
+def _timed_connect(conn, connect):
+    """Connect a connection, recording the phase times in its ``timings`` dict if it has one."""
+    timings = conn.timings
+    if timings is None:
+        return connect(conn)
+    conn._create_connection = _timed_create_connection(timings)
+    start = monotonic()
+    connect(conn)
+    if isinstance(conn, compat_http_client.HTTPSConnection) and 'connect' in timings:
+        # the rest of the time is spent on the tls handshake, after a proxy tunnel if any
+        timings['tls'] = (timings['connect'][1], monotonic())
+    timings.setdefault('connect', (start, monotonic()))
+
+
+class TimedHTTPConnection(compat_http_client.HTTPConnection):
+    """HTTPConnection that records its dns, connect and tls times in :attr:`timings`."""
+
+    #: dict to record the times of the next connect in, see :meth:`RequestTrace.send`
+    timings = None
+
+    def connect(self):
+        _timed_connect(self, compat_http_client.HTTPConnection.connect)
+
+
+class TimedHTTPSConnection(compat_http_client.HTTPSConnection):
+    """HTTPSConnection that records its dns, connect and tls times in :attr:`timings`."""
+
+    timings = None
+
+    def connect(self):
+        _timed_connect(self, compat_http_client.HTTPSConnection.connect)
+
+
+_TIMED_CONNECTIONS = {
+    compat_http_client.HTTPConnection: TimedHTTPConnection,
+    compat_http_client.HTTPSConnection: TimedHTTPSConnection,
+}
+
+
+class TimedHandlerMixin(object):
+    """
+    Replaces the connection class of ``AbstractHTTPHandler.do_open`` so that the dns,
+    connect and tls times of requests that have a ``timings`` dict are recorded in it.
+    """
+
+    def do_open(self, http_class, req, **http_conn_args):
+        timings = getattr(req, 'timings', None)
+        if timings is not None:
+            timed_class = _TIMED_CONNECTIONS.get(http_class, http_class)
+
+            def http_class(*args, **kwargs):     # pylint: disable=function-redefined
+                conn = timed_class(*args, **kwargs)
+                conn.timings = timings
+                return conn
+
+            timings['reused'] = False
+        return compat_urllib_request.AbstractHTTPHandler.do_open(self, http_class, req, **http_conn_args)
+
+
+class TimedHTTPHandler(TimedHandlerMixin, compat_urllib_request.HTTPHandler):
+    """HTTP handler that records connection times, see :class:`TimedHandlerMixin`."""
+    pass
+
+
+class TimedHTTPSHandler(TimedHandlerMixin, compat_urllib_request.HTTPSHandler):
+    """HTTPS handler that records connection times, see :class:`TimedHandlerMixin`."""
+    pass
+
+
+class KeepAliveHandlerMixin(object):
+    """
+    Replaces ``AbstractHTTPHandler.do_open`` so that connections are kept alive
+    and reused across requests, with one :class:`ConnectionPool` per host.
+    """
+
+    #: Methods that are sent again on a new connection if a reused connection fails
+    #: after the request was sent. Other requests may have been processed by the server.
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE')
+
+    def _init_pools(self, maxsize=10, idle_timeout=60, host_options=None):
+        """
+
+        :param maxsize: Default maximum number of idle connections kept per host
+        :param idle_timeout: Default idle timeout in seconds
+        :param host_options: dict of per-host overrides, example
+            ``{'i.instagram.com': {'maxsize': 20, 'idle_timeout': 30}}``
+        """
+        self.pool_maxsize = maxsize
+        self.pool_idle_timeout = idle_timeout
+        self.pool_host_options = host_options or {}
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def get_pool(self, http_class, host, tunnel_host=None, tunnel_headers=None, **http_conn_args):
+        key = (http_class, host, tunnel_host)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                options = self.pool_host_options.get(tunnel_host or host, {})
+
+                def connection_factory():
+                    conn = http_class(host, **http_conn_args)
+                    conn.response_class = PooledHTTPResponse
+                    if tunnel_host:
+                        conn.set_tunnel(tunnel_host, headers=tunnel_headers or {})
+                    return conn
+
+                pool = ConnectionPool(
+                    connection_factory,
+                    maxsize=options.get('maxsize', self.pool_maxsize),
+                    idle_timeout=options.get('idle_timeout', self.pool_idle_timeout))
+                self._pools[key] = pool
+        return pool
+
+    def close_all(self):
+        """Close all idle pooled connections."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.clear()
+
+    def do_open(self, http_class, req, **http_conn_args):
+        host = req.host if hasattr(req, 'host') else req.get_host()
+        if not host:
+            raise compat_urllib_error.URLError('no host given')
+        selector = req.selector if hasattr(req, 'selector') else req.get_selector()
+        data = req.data if hasattr(req, 'data') else req.get_data()
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items() if k not in headers))
+        headers = dict((name.title(), val) for name, val in headers.items())
+        headers.setdefault('Connection', 'keep-alive')
+
+        tunnel_host = getattr(req, '_tunnel_host', None)
+        tunnel_headers = {}
+        if tunnel_host and 'Proxy-Authorization' in headers:
+            # Proxy-Authorization should not be sent to origin server
+            tunnel_headers['Proxy-Authorization'] = headers.pop('Proxy-Authorization')
+
+        pool = self.get_pool(http_class, host, tunnel_host, tunnel_headers, **http_conn_args)
+        conn, is_reused = pool.get()
+        timings = getattr(req, 'timings', None)
+        method = req.get_method()
+        while True:
+            conn.timeout = req.timeout
+            conn.timings = timings
+            if timings is not None:
+                timings['reused'] = is_reused
+            if conn.sock is not None:
+                conn.sock.settimeout(req.timeout)
+            is_sent = False
+            try:
+                conn.request(method, selector, data, headers)
+                is_sent = True
+                res = conn.getresponse()
+                break
+            except (SocketError, compat_http_client.HTTPException) as err:
+                conn.close()
+                if is_reused and (not is_sent or method in self.IDEMPOTENT_METHODS):
+                    # stale keep-alive connection, retry once on a fresh one
+                    conn, is_reused = pool.connection_factory(), False
+                    continue
+                if isinstance(err, SocketError):
+                    raise compat_urllib_error.URLError(err)
+                raise
+            except Exception:
+                conn.close()
+                raise
+            finally:
+                conn.timings = None
+
+        def release(reusable):
+            if reusable:
+                pool.put(conn)
+            else:
+                conn.close()
+
+        res._release_callback = release
+        if res.isclosed():
+            res._release()
+
+        if sys.version_info[0] < 3:     # pragma: no cover
+            # python 2.x urllib2 expects an addinfourl wrapper
+            res.recv = res.read
+            fp = compat_urllib_request.socket._fileobject(res, close=True)
+            resp = compat_urllib_request.addinfourl(fp, res.msg, req.get_full_url())
+            resp.code = res.status
+            resp.msg = res.reason
+            return resp
+
+        res.url = req.get_full_url()
+        res.msg = res.reason
+        return res
+
+
+class KeepAliveHTTPHandler(KeepAliveHandlerMixin, compat_urllib_request.HTTPHandler):
+    """HTTP handler that reuses persistent connections."""
+
+    def __init__(self, debuglevel=0, maxsize=10, idle_timeout=60, host_options=None):
+        compat_urllib_request.HTTPHandler.__init__(self, debuglevel)
+        self._init_pools(maxsize=maxsize, idle_timeout=idle_timeout, host_options=host_options)
+
+    def http_open(self, req):
+        return self.do_open(TimedHTTPConnection, req)
+
+
+class KeepAliveHTTPSHandler(KeepAliveHandlerMixin, compat_urllib_request.HTTPSHandler):
+    """HTTPS handler that reuses persistent connections."""
+
+    def __init__(self, debuglevel=0, context=None, maxsize=10, idle_timeout=60, host_options=None):
+        try:
+            compat_urllib_request.HTTPSHandler.__init__(self, debuglevel, context=context)
+        except TypeError:
+            # py version < 2.7.9
+            compat_urllib_request.HTTPSHandler.__init__(self, debuglevel)
+        self.ssl_context = context
+        self._init_pools(maxsize=maxsize, idle_timeout=idle_timeout, host_options=host_options)
+
+    def https_open(self, req):
+        if self.ssl_context is not None:
+            return self.do_open(TimedHTTPSConnection, req, context=self.ssl_context)
+        return self.do_open(TimedHTTPSConnection, req)
+
+
+class ContentDecoder(object):
+    """Incrementally decompresses a gzip or deflate encoded http response body."""
+
+    def __init__(self, encoding):
+        """
+
+        :param encoding: Content-Encoding value, ``gzip`` or ``deflate``
+        """
+        self.encoding = encoding
+        self._started = False
+        self._obj = self._decompressobj()
+
+    def _decompressobj(self, raw=False):
+        if self.encoding == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return zlib.decompressobj(-zlib.MAX_WBITS if raw else zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        if not self._started and data:
+            self._started = True
+            if self.encoding == 'deflate':
+                try:
+                    return self._obj.decompress(data)
+                except zlib.error:
+                    # Some servers send a raw deflate stream without the zlib header
+                    self._obj = self._decompressobj(raw=True)
+        res = self._obj.decompress(data)
+        while self.encoding == 'gzip' and self._obj.unused_data:
+            # Concatenated gzip members
+            data = self._obj.unused_data
+            self._obj = self._decompressobj()
+            res += self._obj.decompress(data)
+        return res
+
+    def flush(self):
+        return self._obj.flush()
+
+
+def iter_response_body(response, chunk_size=RESPONSE_CHUNK_SIZE, stats=None):
+    """
+    Read a http response in chunks, decompressing gzip and deflate
+    encoded bodies as they are read.
+
+    :param response: a file-like http response
+    :param chunk_size: number of (compressed) bytes to read at a time
+    :param stats: optional dict to record the ``download`` and ``decompress`` times in,
+        as (first start, last end, total seconds) tuples, and the ``bytes_received``
+        and ``bytes_decoded`` counts
+    :return: a generator of decompressed byte chunks
+    """
+    if stats is not None:
+        for chunk in _iter_timed_response_body(response, chunk_size, stats):
+            yield chunk
+        return
+    encoding = (response.info().get('Content-Encoding') or '').strip().lower()
+    decoder = ContentDecoder(encoding) if encoding in ('gzip', 'deflate') else None
+    while True:
+        chunk = response.read(chunk_size)
+        if not chunk:
+            break
+        if decoder:
+            chunk = decoder.decompress(chunk)
+        if chunk:
+            yield chunk
+    if decoder:
+        chunk = decoder.flush()
+        if chunk:
+            yield chunk
+
+
+def _add_time(stats, name, start, end):
+    first_start, _, total = stats.get(name) or (start, end, 0)
+    stats[name] = (first_start, end, total + end - start)
+
+
+def _iter_timed_response_body(response, chunk_size, stats):
+    """:func:`iter_response_body` that records its times and byte counts in ``stats``."""
+    encoding = (response.info().get('Content-Encoding') or '').strip().lower()
+    decoder = ContentDecoder(encoding) if encoding in ('gzip', 'deflate') else None
+    stats['bytes_received'] = stats['bytes_decoded'] = 0
+    while True:
+        start = monotonic()
+        chunk = response.read(chunk_size)
+        end = monotonic()
+        _add_time(stats, 'download', start, end)
+        if not chunk:
+            break
+        stats['bytes_received'] += len(chunk)
+        if decoder:
+            chunk = decoder.decompress(chunk)
+            _add_time(stats, 'decompress', end, monotonic())
+        if chunk:
+            stats['bytes_decoded'] += len(chunk)
+            yield chunk
+    if decoder:
+        start = monotonic()
+        chunk = decoder.flush()
+        _add_time(stats, 'decompress', start, monotonic())
+        if chunk:
+            stats['bytes_decoded'] += len(chunk)
+            yield chunk
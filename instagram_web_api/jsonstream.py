@@ -0,0 +1,174 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JSONItemStream(object):
+    """
+    Iterates over the items of a list inside a JSON object while the
+    document is still being read, so that only one item needs to be held
+    in memory at a time.
+
+    The list is located by a dotted ``path`` of object keys, for example
+    ``users`` or ``data.user.edge_followed_by.edges``. Once the stream is
+    exhausted, ``result`` holds the rest of the document (with the streamed
+    list omitted), so that pagination fields such as ``next_max_id`` or
+    ``page_info`` are available regardless of where they appear.
+
+    Example::
+
+        stream = JSONItemStream(chunks, 'users')
+        for user in stream:
+            print(user['username'])
+        next_max_id = stream.result.get('next_max_id')
+    """
+
+    def __init__(self, chunks, path, on_complete=None):
+        """
+
+        :param chunks: an iterable of utf8 encoded byte chunks
+        :param path: dotted path of the list to stream
+        :param on_complete: optional callable that is called with ``result``
+            when the document has been fully read
+        """
+        self.path = path.split('.') if path else []
+        self.on_complete = on_complete
+        self.result = None
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._items = self._parse()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+    next = __next__     # py2
+
+    def close(self):
+        """Stop reading the document."""
+        self._items.close()
+        close = getattr(self._chunks, 'close', None)
+        if close:
+            close()
+
+    def _fill(self, size=1):
+        """
+        Read at least ``size`` more characters into the buffer,
+        dropping the text that has already been consumed.
+
+        :return: False if the document has been fully read
+        """
+        if self._eof:
+            return False
+        pending = [self._buf[self._pos:]]
+        self._pos = 0
+        read = 0
+        while read < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                pending.append(self._decoder.decode(b'', final=True))
+                break
+            text = self._decoder.decode(chunk)
+            pending.append(text)
+            read += len(text)
+        self._buf = ''.join(pending)
+        return read > 0 or not self._eof
+
+    def _peek(self):
+        """Skip whitespace and return the next character, or '' at the end of the document."""
+        while True:
+            buf = self._buf
+            pos = self._pos
+            n = len(buf)
+            while pos < n and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        c = self._peek()
+        if c != char:
+            raise ValueError('Expecting {0!r} but got {1!r}'.format(char, c))
+        self._pos += 1
+
+    def _value(self):
+        """Decode a complete JSON value at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                # Incomplete value, read as much again as has been buffered
+                if not self._fill(max(len(self._buf) - self._pos, 1)):
+                    raise
+                continue
+            if end == len(self._buf) and self._fill():
+                # The value may continue in the next chunk, e.g. a number
+                continue
+            self._pos = end
+            return value
+
+    def _parse(self):
+        if self._peek() == '{':
+            self.result = {}
+            for item in self._object(self.result, self.path):
+                yield item
+        else:
+            self.result = self._value()
+        if self._peek():
+            raise ValueError('Extra data after the JSON document')
+        if self.on_complete:
+            self.on_complete(self.result)
+
+    def _object(self, target, path):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise ValueError('Expecting property name')
+            key = self._value()
+            self._expect(':')
+            c = self._peek()
+            if path and key == path[0] and len(path) == 1 and c == '[':
+                for item in self._array():
+                    yield item
+            elif path and key == path[0] and len(path) > 1 and c == '{':
+                target[key] = {}
+                for item in self._object(target[key], path[1:]):
+                    yield item
+            else:
+                target[key] = self._value()
+            c = self._peek()
+            self._pos += 1
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError('Expecting \',\' delimiter but got {0!r}'.format(c))
+
+    def _array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            c = self._peek()
+            self._pos += 1
+            if c == ']':
+                return
+            if c != ',':
+                raise ValueError('Expecting \',\' delimiter but got {0!r}'.format(c))
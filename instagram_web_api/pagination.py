@@ -0,0 +1,105 @@
+import time
+
+from .concurrency import BackgroundCall
+
+
+class PaginationMixin(object):
+    """Iterators over paginated GraphQL endpoints."""
+
+    #: Maximum number of edges that can be requested per page
+    MAX_PAGE_SIZE = 50
+
+    #: Dotted path of the edge connection in the results of an endpoint, by endpoint name
+    EDGE_PATHS = {
+        'user_feed': 'data.user.edge_owner_to_timeline_media',
+        'media_comments': 'data.shortcode_media.edge_media_to_comment',
+        'media_likers': 'data.shortcode_media.edge_liked_by',
+        'user_following': 'data.user.edge_follow',
+        'user_followers': 'data.user.edge_followed_by',
+        'tag_feed': 'data.hashtag.edge_hashtag_to_media',
+        'location_feed': 'data.location.edge_location_to_media',
+        'tagged_user_feed': 'data.user.edge_user_to_photos_of_you',
+    }
+
+    @staticmethod
+    def _edge_connection(results, edge_path):
+        connection = results
+        for key in edge_path.split('.'):
+            connection = connection.get(key) or {}
+        return connection
+
+    def iter_edges(self, endpoint, *args, **kwargs):
+        """
+        Iterate over the nodes of a paginated GraphQL endpoint across pages,
+        following ``page_info.end_cursor`` while ``page_info.has_next_page``.
+        The maximum page size is requested and the next page is fetched in the
+        background while the current page is being processed.
+
+        .. code-block:: python
+
+            for user in api.iter_edges(api.user_followers, '2958144170', max_items=500):
+                print(user['username'])
+
+        :param endpoint: a client endpoint method, example ``api.user_followers``
+        :param args: positional arguments for the endpoint
+        :param kwargs: keyword arguments for the endpoint, and the paging options below
+
+        :Keyword Arguments:
+            - **count**: Page size. Default: :attr:`MAX_PAGE_SIZE`
+            - **max_pages**: Maximum number of pages to fetch
+            - **max_items**: Maximum number of nodes to return
+            - **deadline**: A ``time.time()`` timestamp after which no more pages are requested
+            - **prefetch**: Fetch the next page in the background. Default: True
+            - **edge_path**: Dotted path of the edge connection in the results.
+              Default: See :attr:`EDGE_PATHS`
+        :return: a generator of nodes
+        """
+        endpoint_name = getattr(endpoint, '__name__', '')
+        edge_path = kwargs.pop('edge_path', None) or self.EDGE_PATHS.get(endpoint_name)
+        if not edge_path:
+            raise ValueError('Unknown edge path for {0!s}'.format(endpoint_name or endpoint))
+        max_pages = kwargs.pop('max_pages', None)
+        max_items = kwargs.pop('max_items', None)
+        deadline = kwargs.pop('deadline', None)
+        prefetch = kwargs.pop('prefetch', True)
+        kwargs.setdefault('count', self.MAX_PAGE_SIZE)
+        # the page_info is only available in the full results
+        kwargs['extract'] = False
+
+        def fetch(end_cursor):
+            params = dict(kwargs)
+            if end_cursor:
+                params['end_cursor'] = end_cursor
+            return endpoint(*args, **params)
+
+        page_count = 0
+        item_count = 0
+        end_cursor = None
+        results = fetch(end_cursor)
+        while True:
+            page_count += 1
+            connection = self._edge_connection(results, edge_path)
+            edges = connection.get('edges') or []
+            page_info = connection.get('page_info') or {}
+            last_end_cursor, end_cursor = end_cursor, page_info.get('end_cursor')
+            fetch_next = (
+                page_info.get('has_next_page') and end_cursor and end_cursor != last_end_cursor
+                and (max_pages is None or page_count < max_pages)
+                and (max_items is None or item_count + len(edges) < max_items)
+                and (deadline is None or time.time() < deadline))
+            pending = BackgroundCall(fetch, end_cursor) if fetch_next and prefetch else None
+
+            for edge in edges:
+                if max_items is not None and item_count >= max_items:
+                    return
+                item_count += 1
+                yield edge['node']
+
+            if not fetch_next:
+                return
+            if pending:
+                results = pending.result()
+            elif deadline is not None and time.time() >= deadline:
+                return
+            else:
+                results = fetch(end_cursor)
@@ -2,6 +2,7 @@
 import unittest
 import time
 import codecs
+from io import BytesIO
 try:
     import unittest.mock as compat_mock
 except ImportError:
@@ -21,7 +22,15 @@ try:
         ig_chunk_generator
     )   # noqa
     from instagram_private_api.constants import Constants
-    from instagram_private_api.compat import compat_urllib_parse
+    from instagram_private_api.compat import (
+        compat_urllib_parse, compat_urllib_request, compat_http_client, compat_cookiejar, compat_pickle)
+    from instagram_private_api.http import ConnectionPool, ClientCookieJar
+    from instagram_private_api.transport import Transport
+    from instagram_private_api.jsonstream import JSONItemStream
+    from instagram_private_api.codec import JSONCodec, get_codec
+    from instagram_private_api.pagination import PaginationCheckpoint, FileCheckpointStore
+    from instagram_private_api.cache import ResponseCache, SQLiteResponseCache
+    from instagram_private_api.cassette import Cassette, CassetteError
 except ImportError:
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from instagram_private_api import (
@@ -36,7 +45,15 @@ except ImportError:
         ig_chunk_generator
     )   # noqa
     from instagram_private_api.constants import Constants
-    from instagram_private_api.compat import compat_urllib_parse
+    from instagram_private_api.compat import (
+        compat_urllib_parse, compat_urllib_request, compat_http_client, compat_cookiejar, compat_pickle)
+    from instagram_private_api.http import ConnectionPool, ClientCookieJar
+    from instagram_private_api.transport import Transport
+    from instagram_private_api.jsonstream import JSONItemStream
+    from instagram_private_api.codec import JSONCodec, get_codec
+    from instagram_private_api.pagination import PaginationCheckpoint, FileCheckpointStore
+    from instagram_private_api.cache import ResponseCache, SQLiteResponseCache
+    from instagram_private_api.cassette import Cassette, CassetteError
 
 try:
     from instagram_web_api import (
@@ -132,13 +149,25 @@ class WebApiTestBase(unittest.TestCase):
 class MockResponse(object):
     """A mock class to emulate api responses."""
 
-    def __init__(self, code=200, content_type='', body=''):
+    def __init__(self, code=200, content_type='', body='', headers=None):
         self.code = 200
         self.content_type = content_type
         self.body = body
+        self.headers = headers or {}
+        self._fp = None
 
     def info(self):
-        return {'Content-Type': self.content_type}
-
-    def read(self):
-        return self.body.encode('utf8')
+        headers = {'Content-Type': self.content_type}
+        headers.update(self.headers)
+        return headers
+
+    def read(self, amt=None):
+        if self._fp is None:
+            body = self.body
+            if not isinstance(body, bytes):
+                body = body.encode('utf8')
+            self._fp = BytesIO(body)
+        return self._fp.read() if amt is None else self._fp.read(amt)
+
+    def close(self):
+        pass
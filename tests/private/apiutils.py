@@ -28,6 +28,10 @@ class ApiUtilsTests(unittest.TestCase):
                 'name': 'test_weblink_from_media_id',
                 'test': ApiUtilsTests('test_weblink_from_media_id')
             },
+            {
+                'name': 'test_bulk_id_conversion',
+                'test': ApiUtilsTests('test_bulk_id_conversion')
+            },
             {
                 'name': 'test_chunk_generators',
                 'test': ApiUtilsTests('test_chunk_generators')
@@ -57,6 +61,26 @@ class ApiUtilsTests(unittest.TestCase):
         weblink = InstagramID.weblink_from_media_id('1470517649007430315_25025320')
         self.assertEqual(weblink, 'https://www.instagram.com/p/BRoVAK5B8qr/')
 
+    def test_bulk_id_conversion(self):
+        ids = [1470687481426853460, 1470654893538426156, 0, 63, 64, 2 ** 64 - 1]
+        codes = InstagramID.shorten_ids(ids)
+        self.assertEqual(codes, [InstagramID.shorten_id(i) for i in ids])
+        self.assertEqual(codes[:2], ['BRo7njqD75U', 'BRo0NV0jD0s'])
+        self.assertEqual(InstagramID.expand_codes(codes), ids)
+        self.assertEqual(InstagramID.shorten_ids(['1470654893538426156_25025320']), ['BRo0NV0jD0s'])
+        with self.assertRaises(ValueError):
+            InstagramID.expand_codes(['BRo7nj!D75U'])
+        with self.assertRaises(ValueError):
+            InstagramID.expand_code('BRo7nj!D75U')
+
+        try:
+            import numpy
+        except ImportError:
+            return
+        numpy_codes = InstagramID.shorten_ids(numpy.array(ids, dtype=numpy.uint64))
+        self.assertEqual(list(numpy_codes), codes)
+        self.assertEqual([int(i) for i in InstagramID.expand_codes(numpy_codes)], ids)
+
     def test_chunk_generators(self):
         file_data = '.' * 1000000
         chunks_generated = []
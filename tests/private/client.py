@@ -1,15 +1,30 @@
 from io import BytesIO
+import datetime
+import gzip
 import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+import zlib
 
 from ..common import (
     ApiTestBase, Client, ClientThrottledError,
     ClientError, ClientLoginRequiredError,
     ClientSentryBlockError, ClientCheckpointRequiredError,
-    ClientChallengeRequiredError, Constants,
+    ClientChallengeRequiredError, ClientCompatPatch, Constants,
     gen_user_breadcrumb, max_chunk_size_generator, max_chunk_count_generator,
-    compat_mock, compat_urllib_error,
-    MockResponse
+    compat_mock, compat_urllib_error, compat_urllib_request, compat_http_client,
+    MockResponse, ConnectionPool, Transport, JSONItemStream,
+    JSONCodec, get_codec, ClientCookieJar, compat_cookiejar, compat_pickle,
+    PaginationCheckpoint, FileCheckpointStore, ResponseCache, SQLiteResponseCache,
+    Cassette, CassetteError
 )
+from ..stubserver import StubServer
 
 
 class ClientTests(ApiTestBase):
@@ -66,6 +81,82 @@ class ClientTests(ApiTestBase):
                 'name': 'test_client_requests',
                 'test': ClientTests('test_client_requests', api)
             },
+            {
+                'name': 'test_read_response_mock',
+                'test': ClientTests('test_read_response_mock', api)
+            },
+            {
+                'name': 'test_json_item_stream',
+                'test': ClientTests('test_json_item_stream', api)
+            },
+            {
+                'name': 'test_call_api_stream_mock',
+                'test': ClientTests('test_call_api_stream_mock', api)
+            },
+            {
+                'name': 'test_json_codec',
+                'test': ClientTests('test_json_codec', api)
+            },
+            {
+                'name': 'test_cookie_jar_index',
+                'test': ClientTests('test_cookie_jar_index', api)
+            },
+            {
+                'name': 'test_session_values',
+                'test': ClientTests('test_session_values', api)
+            },
+            {
+                'name': 'test_iter_pages_mock',
+                'test': ClientTests('test_iter_pages_mock', api)
+            },
+            {
+                'name': 'test_pagination_checkpoint_mock',
+                'test': ClientTests('test_pagination_checkpoint_mock', api)
+            },
+            {
+                'name': 'test_coalesce_requests_mock',
+                'test': ClientTests('test_coalesce_requests_mock', api)
+            },
+            {
+                'name': 'test_response_cache_mock',
+                'test': ClientTests('test_response_cache_mock', api)
+            },
+            {
+                'name': 'test_sqlite_response_cache_mock',
+                'test': ClientTests('test_sqlite_response_cache_mock', api)
+            },
+            {
+                'name': 'test_cassette_mock',
+                'test': ClientTests('test_cassette_mock', api)
+            },
+            {
+                'name': 'test_stub_server_mock',
+                'test': ClientTests('test_stub_server_mock', api)
+            },
+            {
+                'name': 'test_event_hooks_mock',
+                'test': ClientTests('test_event_hooks_mock', api)
+            },
+            {
+                'name': 'test_keep_alive_partial_read_mock',
+                'test': ClientTests('test_keep_alive_partial_read_mock', api)
+            },
+            {
+                'name': 'test_custom_transport_mock',
+                'test': ClientTests('test_custom_transport_mock', api)
+            },
+            {
+                'name': 'test_connection_pool',
+                'test': ClientTests('test_connection_pool', api)
+            },
+            {
+                'name': 'test_async_client_mock',
+                'test': ClientTests('test_async_client_mock', api)
+            },
+            {
+                'name': 'test_async_transport_retry_mock',
+                'test': ClientTests('test_async_transport_retry_mock', api)
+            },
         ]
 
     def test_validate_useragent(self):
@@ -134,6 +225,39 @@ class ClientTests(ApiTestBase):
         dump = self.api.cookie_jar.dump()
         self.assertIsNotNone(dump)
 
+        jar = ClientCookieJar()
+        expires = int(time.time()) + 100
+        jar.set_cookie(compat_cookiejar.Cookie(
+            0, 'csrftoken', 'abc', None, False, '.instagram.com', True, True, '/', True,
+            True, expires, False, None, None, {'HttpOnly': None}))
+        jar.set_cookie(compat_cookiejar.Cookie(
+            1, 'rur', 'FRC', '443', True, 'i.instagram.com', False, False, '/api', False,
+            False, None, True, 'comment', 'http://example.com', {}, True))
+        dump = jar.dump()
+        self.assertEqual(json.loads(dump)['version'], 2)
+        self.assertIs(jar.dump(), dump)
+        for cookie_string in (dump, dump.encode('utf-8'), compat_pickle.dumps(jar._cookies)):
+            loaded_jar = ClientCookieJar(cookie_string)
+            self.assertEqual([vars(c) for c in loaded_jar], [vars(c) for c in jar])
+            self.assertEqual(loaded_jar.get_cookie_value('csrftoken', 'i.instagram.com'), 'abc')
+
+        # the dump is updated when cookies change
+        jar.set_cookie(compat_cookiejar.Cookie(
+            0, 'mid', 'xyz', None, False, '.instagram.com', True, True, '/', True,
+            True, None, True, None, None, {}))
+        self.assertEqual(ClientCookieJar(jar.dump()).get_cookie_value('mid', 'i.instagram.com'), 'xyz')
+        jar.clear('.instagram.com', '/', 'mid')
+        self.assertEqual(jar.dump(), dump)
+        jar.clear()
+        self.assertEqual(json.loads(jar.dump())['cookies'], [])
+
+        with compat_mock.patch.object(ClientCookieJar, 'allow_pickle', False):
+            with self.assertRaises(ValueError):
+                ClientCookieJar(compat_pickle.dumps(jar._cookies))
+        for cookie_string in ('{"version": 99, "cookies": []}', '{"cookies": []}'):
+            with self.assertRaises(ValueError):
+                ClientCookieJar(cookie_string)
+
     def test_gen_user_breadcrumb(self):
         self.sleep_interval = 0
         output = gen_user_breadcrumb(15)
@@ -293,3 +417,805 @@ class ClientTests(ApiTestBase):
         with self.assertRaises(ClientError) as ce:
             self.api.feed_timeline()
         self.assertEqual(ce.exception.msg, 'Unknown error')
+
+    def test_read_response_mock(self):
+        self.sleep_interval = 0
+        content = json.dumps({'items': [{'text': u'caf\u00e9 \u2603'} for _ in range(5000)]}, ensure_ascii=False)
+        body = content.encode('utf8')
+
+        gzip_buf = BytesIO()
+        with gzip.GzipFile(fileobj=gzip_buf, mode='wb') as f:
+            f.write(body)
+        raw_deflate = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        encoded_bodies = [
+            (None, body),
+            ('gzip', gzip_buf.getvalue()),
+            ('deflate', zlib.compress(body)),
+            ('deflate', raw_deflate.compress(body) + raw_deflate.flush()),
+        ]
+        for encoding, encoded_body in encoded_bodies:
+            headers = {'Content-Encoding': encoding} if encoding else {}
+            response = MockResponse(body=encoded_body, headers=headers)
+            self.assertEqual(self.api._read_response(response), content)
+
+    def test_json_item_stream(self):
+        self.sleep_interval = 0
+        doc = {
+            'data': {'user': {'edge_followed_by': {
+                'count': 2,
+                'edges': [{'node': {'id': '1', 'full_name': u'caf\u00e9'}}, {'node': {'id': '2'}}],
+                'page_info': {'has_next_page': True, 'end_cursor': 'abc'},
+            }}},
+            'status': 'ok',
+        }
+        body = json.dumps(doc, ensure_ascii=False).encode('utf8')
+        for chunk_size in (1, 5, len(body)):
+            chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+            stream = JSONItemStream(chunks, 'data.user.edge_followed_by.edges')
+            self.assertEqual(next(stream), {'node': {'id': '1', 'full_name': u'caf\u00e9'}})
+            # the rest of the document is not available until the stream is exhausted
+            self.assertEqual(list(stream), [{'node': {'id': '2'}}])
+            self.assertEqual(stream.result, {
+                'data': {'user': {'edge_followed_by': {
+                    'count': 2, 'page_info': {'has_next_page': True, 'end_cursor': 'abc'}}}},
+                'status': 'ok',
+            })
+
+        with self.assertRaises(ValueError):
+            list(JSONItemStream([b'{"users": [{"pk": 1}'], 'users'))
+
+    def test_call_api_stream_mock(self):
+        self.sleep_interval = 0
+        with compat_mock.patch.object(self.api.transport, 'send') as send_mock:
+            send_mock.side_effect = [
+                MockResponse(body=json.dumps({'users': [{'pk': 1}, {'pk': 2}], 'next_max_id': 'x', 'status': 'ok'})),
+                MockResponse(body=json.dumps({'users': [{'pk': 1}], 'message': 'login_required'})),
+            ]
+            stream = self.api._call_api('friendships/1/followers/', stream_path='users')
+            self.assertEqual([u['pk'] for u in stream], [1, 2])
+            self.assertEqual(stream.result, {'next_max_id': 'x', 'status': 'ok'})
+
+            stream = self.api._call_api('friendships/1/followers/', stream_path='users')
+            with self.assertRaises(ClientLoginRequiredError):
+                list(stream)
+
+    def test_json_codec(self):
+        self.sleep_interval = 0
+        params = {
+            '_uuid': self.api.uuid, 'user_id': 123, 'comment_text': u'caf\u00e9 \u2603 \x7f\n',
+            'lat': 1.5, 'lng': 1e-05, 'big': 2 ** 70, 'flag': True, 'none': None, 'list': [1, 'a'],
+        }
+        expected = json.dumps(params, separators=(',', ':'))
+        for name in ('json', 'orjson'):
+            codec = get_codec(name)
+            self.assertIsInstance(codec, JSONCodec)
+            self.assertEqual(codec.dumps(params), expected)
+            self.assertEqual(codec.dumps({'a': 'b', 'c': 1}), '{"a":"b","c":1}')
+            self.assertEqual(
+                codec.dumps({'a': float('nan'), 'b': [float('inf'), None]}), '{"a":NaN,"b":[Infinity,null]}')
+            self.assertEqual(codec.loads(expected), params)
+            with self.assertRaises(ValueError):
+                codec.loads('{')
+            # types the stdlib does not serialize are rejected
+            for obj in (uuid.uuid4(), {'a': [datetime.datetime.now()]}, {'a': b'b'}):
+                with self.assertRaises(TypeError):
+                    codec.dumps(obj)
+        with self.assertRaises(ValueError):
+            get_codec('xjson')
+
+        # error responses are only serialized when accessed
+        err = ClientError('fail', code=400, error_response={'status': 'fail'})
+        self.assertEqual(err.error_response, json.dumps({'status': 'fail'}))
+
+    def test_cookie_jar_index(self):
+        self.sleep_interval = 0
+
+        def make_cookie(name, value, domain, expires):
+            return compat_cookiejar.Cookie(
+                0, name, value, None, False, domain, False, domain.startswith('.'), '/',
+                False, False, expires, expires is None, None, None, {})
+
+        now = int(time.time())
+        jar = ClientCookieJar()
+        jar.set_cookie(make_cookie('csrftoken', 'a', '.instagram.com', now + 100))
+        jar.set_cookie(make_cookie('csrftoken', 'b', 'i.instagram.com', now + 1000))
+        jar.set_cookie(make_cookie('csrftoken', 'c', 'www.example.com', None))
+        jar.set_cookie(make_cookie('ds_user_id', '123', '.instagram.com', now - 10))
+
+        # the unexpired cookie for the domain that expires last is used
+        self.assertEqual(jar.get_cookie_value('csrftoken', 'i.instagram.com'), 'b')
+        self.assertEqual(jar.get_cookie_value('CSRFTOKEN', 'www.instagram.com'), 'a')
+        self.assertEqual(jar.get_cookie_value('csrftoken', 'www.example.com'), 'c')
+        self.assertIsNone(jar.get_cookie_value('ds_user_id', 'i.instagram.com'))
+
+        # replaced and cleared cookies are reflected in the index
+        jar.set_cookie(make_cookie('csrftoken', 'd', 'i.instagram.com', now + 1000))
+        self.assertEqual(jar.get_cookie_value('csrftoken', 'i.instagram.com'), 'd')
+        jar.clear('i.instagram.com')
+        self.assertEqual(jar.get_cookie_value('csrftoken', 'i.instagram.com'), 'a')
+
+        # the index is rebuilt for a saved jar
+        jar = ClientCookieJar(jar.dump())
+        self.assertEqual(jar.get_cookie_value('csrftoken', 'i.instagram.com'), 'a')
+        jar.clear_expired_cookies()
+        self.assertEqual(len(jar), 2)
+
+    def test_session_values(self):
+        self.sleep_interval = 0
+        api = Client(self.api.username, self.api.password, settings=self.api.settings)
+
+        ua = api.user_agent
+        self.assertIs(api.user_agent, ua)
+        headers = api.default_headers
+        self.assertEqual(headers['User-Agent'], ua)
+        self.assertIn('X-IG-Connection-Speed', headers)
+        # a new dict is returned every time so that it can be modified
+        headers['Content-type'] = 'text/plain'
+        self.assertNotIn('Content-type', api.default_headers)
+
+        # changed inputs are picked up
+        api.user_agent = api.generate_useragent(phone_manufacturer='BrandX')
+        self.assertIn('BrandX', api.user_agent)
+        self.assertIn('BrandX', api.default_headers['User-Agent'])
+        api.phone_model = 'ModelY'
+        self.assertIn('ModelY', api.default_headers['User-Agent'])
+
+        self.assertEqual(api.phone_id, api.generate_uuid(return_hex=False, seed=api.device_id))
+        api.device_id = api.generate_deviceid()
+        self.assertEqual(api.phone_id, api.generate_uuid(return_hex=False, seed=api.device_id))
+        self.assertIsInstance(api.timezone_offset, int)
+
+    def test_iter_pages_mock(self):
+        self.sleep_interval = 0
+        calls = []
+
+        def user_feed(user_id, **kwargs):
+            calls.append(kwargs.get('max_id'))
+            page = int(kwargs.get('max_id') or 0)
+            if page == 99:
+                raise ClientError('Bad page', code=400)
+            results = {'items': [{'pk': page * 10 + i} for i in range(3)], 'status': 'ok'}
+            if page < 3:
+                results['next_max_id'] = str(page + 1)
+            return results
+
+        pages = self.api.iter_pages(user_feed, '123')
+        results = next(pages)
+        self.assertEqual([i['pk'] for i in results['items']], [0, 1, 2])
+        # the next page is fetched in the background
+        for _ in range(100):
+            if len(calls) == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(calls, [None, '1'])
+        self.assertEqual(len(list(pages)), 3)
+        self.assertEqual(calls, [None, '1', '2', '3'])
+
+        del calls[:]
+        items = list(self.api.iter_items(user_feed, '123', max_items=4, prefetch=False))
+        self.assertEqual([i['pk'] for i in items], [0, 1, 2, 10])
+        self.assertEqual(calls, [None, '1'])
+
+        self.assertEqual(len(list(self.api.iter_pages(user_feed, '123', max_pages=2))), 2)
+        self.assertEqual(len(list(self.api.iter_pages(user_feed, '123', deadline=time.time() - 1))), 1)
+
+        # errors from a prefetched page are raised to the caller
+        pages = self.api.iter_pages(user_feed, '123', next_page_kwargs=lambda results: {'max_id': '99'})
+        next(pages)
+        with self.assertRaises(ClientError):
+            next(pages)
+
+    def test_pagination_checkpoint_mock(self):
+        self.sleep_interval = 0
+        calls = []
+        fail_pages = set()
+
+        def tag_section(tag, tab='top', **kwargs):
+            calls.append((tag, kwargs.get('rank_token'), kwargs.get('max_id'), kwargs.get('page')))
+            page = int(kwargs.get('page') or 0)
+            if page in fail_pages:
+                raise ClientError('Bad page', code=500)
+            results = {'sections': [{'pk': page * 10 + i} for i in range(3)], 'status': 'ok'}
+            if page < 3:
+                results.update({
+                    'more_available': True, 'next_max_id': 'cursor{0:d}'.format(page + 1),
+                    'next_page': page + 1, 'next_media_ids': [page]})
+            return results
+
+        directory = tempfile.mkdtemp()
+        try:
+            store = FileCheckpointStore(directory)
+            checkpoint = PaginationCheckpoint('tag:cats', store)
+            self.assertFalse(checkpoint.started)
+            fail_pages.add(2)
+            items = []
+            for item in self.api.iter_items(
+                    tag_section, 'cats', rank_token='r1', prefetch=False, checkpoint=checkpoint):
+                items.append(item['pk'])
+                break
+            # stopped by the consumer
+            self.assertEqual(items, [0])
+            with self.assertRaises(ClientError):
+                for item in self.api.iter_items(
+                        tag_section, 'cats', rank_token='r1', prefetch=False, checkpoint=checkpoint):
+                    items.append(item['pk'])
+            # stopped by an error
+            self.assertEqual(items, [0, 1, 2, 10, 11, 12])
+
+            # resumed from the saved state with the saved arguments
+            fail_pages.clear()
+            del calls[:]
+            checkpoint = PaginationCheckpoint('tag:cats', store)
+            self.assertEqual(checkpoint.page_kwargs['page'], 2)
+            for item in self.api.iter_items(
+                    tag_section, 'dogs', rank_token='r2', prefetch=False, checkpoint=checkpoint):
+                items.append(item['pk'])
+            self.assertEqual(items, [0, 1, 2, 10, 11, 12, 20, 21, 22, 30, 31, 32])
+            self.assertEqual(calls, [('cats', 'r1', 'cursor2', 2), ('cats', 'r1', 'cursor3', 3)])
+            self.assertTrue(PaginationCheckpoint('tag:cats', store).done)
+            self.assertEqual(list(self.api.iter_items(tag_section, 'cats', checkpoint=checkpoint)), [])
+
+            checkpoint.reset()
+            self.assertFalse(PaginationCheckpoint('tag:cats', store).started)
+            pages = self.api.iter_pages(tag_section, 'cats', max_pages=2, checkpoint=checkpoint)
+            self.assertEqual(len(list(pages)), 2)
+            with self.assertRaises(ValueError):
+                for results in self.api.iter_pages(tag_section, 'cats', checkpoint=checkpoint):
+                    # interrupted while processing the page
+                    raise ValueError(results['sections'][0]['pk'])
+            self.assertEqual(PaginationCheckpoint('tag:cats', store).page_kwargs['page'], 2)
+            pages = self.api.iter_pages(tag_section, 'cats', checkpoint=checkpoint)
+            self.assertEqual([r['sections'][0]['pk'] for r in pages], [20, 30])
+            self.assertEqual(checkpoint.page_count, 4)
+            self.assertTrue(checkpoint.done)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_coalesce_requests_mock(self):
+        self.sleep_interval = 0
+        release = threading.Event()
+
+        class SlowTransport(Transport):
+            def __init__(self, cookie_jar):
+                super(SlowTransport, self).__init__(cookie_jar)
+                self.requests = []
+
+            def send(self, req, timeout=None):
+                self.requests.append(req)
+                release.wait(5)
+                return MockResponse(body='{"status": "ok", "user": {"pk": 123}}')
+
+        api = Client(
+            self.api.username, self.api.password,
+            settings=self.api.settings, transport=SlowTransport)
+        self.assertIsNone(api.in_flight_requests)
+        api = Client(
+            self.api.username, self.api.password,
+            settings=self.api.settings, transport=SlowTransport, coalesce_requests=True)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(api._call_api('users/123/info/')))
+            for _ in range(5)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(api.transport.requests), 1)
+        self.assertEqual(len(results), 5)
+        # every caller gets its own copy
+        self.assertEqual(len(set(id(r) for r in results)), 5)
+        self.assertEqual(results[0], results[1])
+
+        # POSTs and sequential calls are not coalesced
+        api._call_api('users/123/info/')
+        api._call_api('users/123/info/', params={'a': 1})
+        self.assertEqual(len(api.transport.requests), 3)
+
+    def test_response_cache_mock(self):
+        self.sleep_interval = 0
+
+        class CountingTransport(Transport):
+            def __init__(self, cookie_jar):
+                super(CountingTransport, self).__init__(cookie_jar)
+                self.requests = []
+
+            def send(self, req, timeout=None):
+                self.requests.append(req)
+                return MockResponse(body=json.dumps({
+                    'status': 'ok',
+                    'user': {'pk': 123, 'username': 'maru', 'full_name': '', 'is_private': False,
+                             'profile_pic_url': 'https://example.com/1.jpg'}}))
+
+        cache = ResponseCache(maxsize=2)
+        api = Client(
+            self.api.username, self.api.password, settings=self.api.settings,
+            transport=CountingTransport, response_cache=cache, auto_patch=True)
+        results1 = api.user_info('123')
+        results2 = api.user_info('123')
+        self.assertEqual(len(api.transport.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # every hit is parsed and patched again
+        self.assertIsNot(results1['user'], results2['user'])
+        self.assertEqual(results1, results2)
+        self.assertEqual(results2['user']['id'], '123')
+
+        # endpoints without a ttl are not cached
+        api._call_api('feed/timeline/')
+        api._call_api('feed/timeline/')
+        self.assertEqual(len(api.transport.requests), 3)
+
+        # least recently used responses are evicted
+        api.user_info('456')
+        api.user_info('789')
+        api.user_info('123')
+        self.assertEqual(len(api.transport.requests), 6)
+        self.assertEqual(len(cache), 2)
+
+        # responses are not shared between accounts
+        api.cookie_jar.set_cookie(compat_cookiejar.Cookie(
+            0, 'ds_user_id', '999', None, False, '.instagram.com', True, True, '/', True,
+            True, None, True, None, None, {}))
+        api.user_info('123')
+        self.assertEqual(len(api.transport.requests), 7)
+
+        self.assertIsNone(cache.ttl_for('users/123/followers/'))
+        self.assertEqual(cache.ttl_for('tags/cats/info/?a=1'), ResponseCache.DEFAULT_TTLS[r'tags/[^/]+/info/$'])
+
+    def test_sqlite_response_cache_mock(self):
+        self.sleep_interval = 0
+
+        class CountingTransport(Transport):
+            def __init__(self, cookie_jar):
+                super(CountingTransport, self).__init__(cookie_jar)
+                self.requests = []
+
+            def send(self, req, timeout=None):
+                self.requests.append(req)
+                return MockResponse(body=json.dumps({'status': 'ok', 'user': {'pk': 123, 'bio': 'x' * 1000}}))
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'cache', 'responses.db')
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=CountingTransport, response_cache=SQLiteResponseCache(path))
+            results = api.user_info('123')
+            self.assertEqual(len(api.transport.requests), 1)
+            api.response_cache.close()
+
+            # responses are kept across restarts
+            cache = SQLiteResponseCache(path)
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=CountingTransport, response_cache=cache)
+            self.assertEqual(api.user_info('123'), results)
+            self.assertEqual(len(api.transport.requests), 0)
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+            # concurrent writers with their own connections
+            def fill(offset):
+                writer = SQLiteResponseCache(path)
+                for i in range(20):
+                    writer.set('key{0:d}'.format(offset + i), (200, '{"status": "ok"}'), ttl=60)
+                writer.close()
+            threads = [threading.Thread(target=fill, args=(n * 100, )) for n in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(len(cache), 81)
+
+            # lookups do not write, the access time is written with the next write
+            def accessed(key):
+                return cache._connection().execute(
+                    'SELECT accessed FROM responses WHERE key = ?', (key, )).fetchone()[0]
+            written = accessed('key301')
+            self.assertEqual(cache.get('key301'), (200, '{"status": "ok"}'))
+            self.assertEqual(accessed('key301'), written)
+            cache.set('key999', (200, '{"status": "ok"}'), ttl=60)
+            self.assertGreater(accessed('key301'), written)
+
+            # a connection inherited by a forked process is not used
+            conn = cache._connection()
+            cache._local.pid = -1
+            self.assertIsNot(cache._connection(), conn)
+            conn.close()
+
+            # bodies are compressed, and the least recently used are evicted
+            cache.max_bytes = 1000
+            cache.evict()
+            self.assertLess(len(cache), 82)
+            self.assertEqual(cache.get('key301'), (200, '{"status": "ok"}'))
+            cache.maxsize = 1
+            cache.evict()
+            self.assertEqual(len(cache), 1)
+            cache.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_cassette_mock(self):
+        self.sleep_interval = 0
+
+        class FakeServerTransport(Transport):
+            def __init__(self, cookie_jar):
+                super(FakeServerTransport, self).__init__(cookie_jar)
+                self.requests = []
+
+            def send(self, req, timeout=None):
+                self.requests.append(req)
+                if 'friendships' in req.get_full_url():
+                    body = BytesIO(b'{"status": "fail", "message": "Please wait a few minutes"}')
+                    raise compat_urllib_error.HTTPError(
+                        req.get_full_url(), 429, 'Too Many Requests', {}, body)
+                buf = BytesIO()
+                with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+                    f.write(json.dumps({'status': 'ok', 'user': {'pk': 123}}).encode('ascii'))
+                headers = [
+                    'Content-Type: application/json', 'Content-Encoding: gzip',
+                    'Set-Cookie: shbid=1234; Domain=.instagram.com; Path=/']
+                response = compat_urllib_request.addinfourl(
+                    BytesIO(buf.getvalue()),
+                    compat_http_client.parse_headers(
+                        BytesIO(('\r\n'.join(headers) + '\r\n\r\n').encode('ascii'))),
+                    req.get_full_url(), 200)
+                response.msg = 'OK'
+                self.cookie_jar.extract_cookies(response, req)
+                return response
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'cassette.json')
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=FakeServerTransport, cassette=path)
+            results = api.user_info('123')
+            with self.assertRaises(ClientThrottledError):
+                api.friendships_show('123')
+            self.assertEqual(len(api.transport.transport.requests), 2)
+            # a header line, and an interaction appended per request
+            with open(path) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(json.loads(lines[0]), {'version': 2})
+            interactions = [json.loads(line) for line in lines[1:]]
+            self.assertEqual([i['response']['status'] for i in interactions], [200, 429])
+
+            # a missing or unknown header is rejected
+            bad_path = os.path.join(directory, 'bad.json')
+            for content in ('', lines[1] + '\n', json.dumps({'version': 1, 'interactions': interactions})):
+                with open(bad_path, 'w') as f:
+                    f.write(content)
+                with self.assertRaises(ValueError):
+                    Cassette(bad_path)
+
+            # replayed without sending any request
+            cassette = Cassette(path, mode='replay', latency=0.05)
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=FakeServerTransport, cassette=cassette)
+            start_time = time.time()
+            self.assertEqual(api.user_info('123'), results)
+            self.assertGreaterEqual(time.time() - start_time, 0.05)
+            self.assertEqual(api.user_info('123'), results)
+            self.assertEqual(api.cookie_jar.get_cookie_value('shbid', 'i.instagram.com'), '1234')
+            with self.assertRaises(ClientThrottledError):
+                api.friendships_show('123')
+            with self.assertRaises(CassetteError):
+                api.user_info('456')
+            self.assertEqual(len(api.transport.transport.requests), 0)
+
+            # signed request bodies differ each run, and are not matched by default
+            path = os.path.join(directory, 'post.json')
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=FakeServerTransport, cassette=Cassette(path, mode='record'))
+            api.post_comment('123_456', 'hello')
+            api = Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=FakeServerTransport, cassette=Cassette(path, mode='replay'))
+            api.post_comment('123_456', 'hello')
+            self.assertEqual(len(api.transport.transport.requests), 0)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_stub_server_mock(self):
+        self.sleep_interval = 0
+        with StubServer(page_size=20, total_items=50, error_paths={r'/feed/timeline/': 429}) as server:
+            api = Client('someone', 'secret', api_url=server.private_api_url, auto_patch=True)
+            self.assertEqual(api.authenticated_user_name, 'someone')
+            self.assertIsNotNone(api.csrftoken)
+            self.assertEqual(api.user_info('123')['user']['pk'], 123)
+
+            # paginated, and gzipped
+            items = list(api.iter_items(api.user_feed, '123'))
+            self.assertEqual(len(set([item['pk'] for item in items])), 50)
+            self.assertEqual(server.request_counts['feed'], 3)
+
+            with self.assertRaises(ClientThrottledError):
+                api.feed_timeline()
+
+            # chunked video upload
+            results = api.post_video(b'\x00' * 1200000, (720, 720), 3.0, b'\xff\xd8' + b'\x00' * 100)
+            self.assertEqual(results['media']['media_type'], 2)
+            self.assertEqual(server.request_counts['upload_chunk'], 4)
+
+    def test_event_hooks_mock(self):
+        self.sleep_interval = 0
+        events = []
+
+        def failing_hook(event):
+            raise ValueError('hook errors are not raised')
+
+        with StubServer(error_paths={r'/friendships/show/': 429}) as server:
+            api = Client(
+                'someone', 'secret', api_url=server.private_api_url, auto_patch=True,
+                event_hooks=[events.append, failing_hook])
+            del events[:]
+            api.user_feed('123')
+            request_ids = set([e.request_id for e in events])
+            self.assertEqual(len(request_ids), 1)
+            names = [e.name for e in events]
+            self.assertEqual(
+                names[:names.index('request') + 1],
+                ['prepare', 'dns', 'connect', 'server', 'download', 'decompress', 'json', 'request'])
+            # a single compat_patch phase for the patched items
+            self.assertEqual(names[names.index('request') + 1:], ['compat_patch'])
+            request = events[names.index('request')]
+            self.assertEqual(request.endpoint, 'feed/user/{id}/')
+            self.assertEqual(request.status, 200)
+            self.assertEqual(request.account_id, api.authenticated_user_id)
+            self.assertEqual(request.source, 'network')
+            self.assertEqual(request.retry_count, 0)
+            self.assertGreater(request.bytes_decoded, request.bytes_received)
+            self.assertFalse(request.connection_reused)
+            for event in events:
+                self.assertGreaterEqual(event.end, event.start)
+                self.assertGreaterEqual(event.start, request.start)
+
+            # patching done once the endpoint has returned is not reported with its request
+            del events[:]
+            ClientCompatPatch.user(api._call_api('users/123/info/')['user'])
+            self.assertNotIn('compat_patch', [e.name for e in events])
+
+            del events[:]
+            with api.event_hooks.retrying(2), self.assertRaises(ClientThrottledError):
+                api.friendships_show('123')
+            self.assertEqual(events[-1].name, 'request')
+            self.assertEqual(events[-1].status, 429)
+            self.assertEqual(events[-1].retry_count, 2)
+            self.assertIsInstance(events[-1].error, ClientThrottledError)
+
+            api.event_hooks.remove(events.append)
+            del events[:]
+            api.user_info('123')
+            self.assertEqual(events, [])
+
+    def test_keep_alive_partial_read_mock(self):
+        self.sleep_interval = 0
+        # a response larger than what is buffered from the socket
+        with StubServer(page_size=200, compress=False) as server:
+            api = Client('someone', 'secret', api_url=server.private_api_url, keep_alive=True)
+            response = api._call_api(
+                'friendships/123/followers/', query={'rank_token': api.rank_token}, return_response=True)
+            response.read(100)
+            response.close()
+            # the unread body must not be taken as the response to the next request,
+            # and the POST must not be sent twice
+            results = api.post_comment('123_456', 'hello')
+            self.assertEqual(results['comment']['text'], 'hello')
+            self.assertEqual(server.request_counts['post_comment'], 1)
+            self.assertEqual(api.user_info('123')['user']['pk'], 123)
+
+    def test_custom_transport_mock(self):
+        self.sleep_interval = 0
+
+        class RecordingTransport(Transport):
+            def __init__(self, cookie_jar):
+                super(RecordingTransport, self).__init__(cookie_jar)
+                self.requests = []
+
+            def send(self, req, timeout=None):
+                self.requests.append(req)
+                return MockResponse(body='{"status": "ok", "user": {"pk": 123}}')
+
+        api = Client(
+            self.api.username, self.api.password,
+            settings=self.api.settings, transport=RecordingTransport)
+        self.assertIsInstance(api.transport, RecordingTransport)
+        self.assertIsNone(api.opener)
+        self.assertIs(api.transport.cookie_jar, api.cookie_jar)
+
+        results = api._call_api('users/123/info/')
+        self.assertEqual(results['user']['pk'], 123)
+        self.assertEqual(len(api.transport.requests), 1)
+        self.assertTrue(api.transport.requests[0].get_full_url().endswith('users/123/info/'))
+
+        # an instance is used as is
+        transport = RecordingTransport(ClientCookieJar(self.api.cookie_jar.dump()))
+        with self.assertRaises(ValueError):
+            Client(
+                self.api.username, self.api.password, settings=self.api.settings,
+                transport=transport, keep_alive=True, proxy='http://127.0.0.1:8080')
+        api = Client(
+            self.api.username, self.api.password, settings=self.api.settings,
+            transport=transport, keep_alive=False)
+        self.assertIs(api.transport, transport)
+
+        # setting the opener, as with earlier versions, sends requests with it
+        opener = compat_urllib_request.build_opener(compat_urllib_request.HTTPCookieProcessor(api.cookie_jar))
+        opener.cookie_jar = api.cookie_jar
+        api.opener = opener
+        self.assertIs(api.opener, opener)
+        self.assertIs(api.cookie_jar, opener.cookie_jar)
+        with compat_mock.patch.object(
+                opener, 'open', return_value=MockResponse(body='{"status": "ok", "user": {"pk": 456}}')) as open_:
+            self.assertEqual(api._call_api('users/456/info/')['user']['pk'], 456)
+        self.assertEqual(open_.call_count, 1)
+        self.assertEqual(len(transport.requests), 0)
+
+    def test_connection_pool(self):
+        self.sleep_interval = 0
+
+        class MockConnection(object):
+            def __init__(self):
+                self.sock = object()
+
+            def close(self):
+                self.sock = None
+
+        pool = ConnectionPool(MockConnection, maxsize=1, idle_timeout=60)
+        conn1, is_reused = pool.get()
+        self.assertFalse(is_reused)
+        conn2, _ = pool.get()
+        pool.put(conn1)
+        pool.put(conn2)
+        # only maxsize idle connections are kept
+        self.assertEqual(len(pool), 1)
+        self.assertIsNone(conn2.sock)
+
+        conn, is_reused = pool.get()
+        self.assertTrue(is_reused)
+        self.assertIs(conn, conn1)
+
+        # closed connections are not reused
+        conn.close()
+        pool.put(conn)
+        self.assertEqual(len(pool), 0)
+
+        # expired idle connections are not reused
+        pool.idle_timeout = 0.01
+        conn, _ = pool.get()
+        pool.put(conn)
+        time.sleep(0.05)
+        conn, is_reused = pool.get()
+        self.assertFalse(is_reused)
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio client requires python 3.5+')
+    def test_async_transport_retry_mock(self):
+        self.sleep_interval = 0
+        import asyncio
+        from instagram_private_api.asyncclient import AsyncHTTPTransport
+
+        received = []
+
+        async def handle(reader, writer):
+            # answers the first request of a connection, and drops the connection on the next one
+            is_first = True
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                length = 0
+                for line in head.decode('latin-1').split('\r\n'):
+                    if line.lower().startswith('content-length:'):
+                        length = int(line.split(':', 1)[1])
+                await reader.readexactly(length)
+                received.append(head.split(b' ', 1)[0].decode('ascii'))
+                if not is_first:
+                    break
+                is_first = False
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}')
+                await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            url = 'http://127.0.0.1:{0:d}/'.format(server.sockets[0].getsockname()[1])
+            transport = AsyncHTTPTransport(ClientCookieJar())
+            try:
+                await transport.fetch(compat_urllib_request.Request(url))
+                # a GET on a dropped connection is sent again on a new connection
+                response = await transport.fetch(compat_urllib_request.Request(url))
+                self.assertEqual(response.body, b'{}')
+                self.assertEqual(received, ['GET', 'GET', 'GET'])
+                # a POST that may have been processed is not
+                with self.assertRaises(compat_urllib_error.URLError):
+                    await transport.fetch(compat_urllib_request.Request(url, data=b'a=1'))
+                self.assertEqual(received, ['GET', 'GET', 'GET', 'POST'])
+            finally:
+                transport.close()
+                server.close()
+                await server.wait_closed()
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    @unittest.skipIf(sys.version_info < (3, 5), 'asyncio client requires python 3.5+')
+    def test_async_client_mock(self):
+        self.sleep_interval = 0
+        import asyncio
+        from email.message import Message
+        from instagram_private_api import AsyncClient
+        from instagram_private_api.asyncclient import BufferedResponse
+
+        api = AsyncClient('', '', cookie=self.api.cookie_jar.dump())
+        loop = asyncio.new_event_loop()
+        requests = []
+
+        def make_response(code, obj):
+            headers = Message()
+            headers['Content-Type'] = 'application/json'
+            return BufferedResponse('', code, '', headers, json.dumps(obj).encode('utf-8'))
+
+        responses = [
+            make_response(200, {'status': 'ok', 'user': {'pk': 123}}),
+            make_response(200, {
+                'status': 'ok', 'comments': [{'pk': 1, 'created_at_utc': 2}],
+                'has_more_comments': True, 'next_max_id': 'x'}),
+            make_response(200, {'status': 'ok', 'comments': [{'pk': 2, 'created_at_utc': 1}]}),
+            make_response(400, {'status': 'fail', 'message': 'login_required'}),
+        ]
+
+        def fetch(req, timeout=None):
+            requests.append(req)
+            future = loop.create_future()
+            future.set_result(responses.pop(0))
+            return future
+        api.transport.fetch = fetch
+        sync_requests = []
+
+        def send(req, timeout=None):
+            sync_requests.append(req)
+            response = responses.pop(0).open()
+            if isinstance(response, compat_urllib_error.HTTPError):
+                raise response
+            return response
+        api.client.transport.transport.send = send
+
+        results = loop.run_until_complete(api.user_info('123'))
+        self.assertEqual(results['user']['pk'], 123)
+        self.assertTrue(requests[-1].get_full_url().endswith('users/123/info/'))
+
+        # the first request is awaited, the method is then run once more in an executor,
+        # where the requests that follow are sent
+        comments = loop.run_until_complete(api.media_n_comments('123', n=10))
+        self.assertEqual([c['pk'] for c in comments], [2, 1])
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(len(sync_requests), 1)
+        self.assertIn('max_id=x', sync_requests[-1].get_full_url())
+
+        with self.assertRaises(ClientLoginRequiredError):
+            loop.run_until_complete(api.user_info('123'))
+
+        # a method that makes different requests when re-run is not replayed with the wrong responses
+        runs = []
+
+        def unstable_user_info(user_id):
+            runs.append(user_id)
+            api.client._call_api('users/{0:d}/info/'.format(len(runs)))
+            return api.client._call_api('users/{0!s}/info/'.format(user_id))
+        api.client.user_info = unstable_user_info
+        responses.append(make_response(200, {'status': 'ok', 'user': {'pk': 1}}))
+        with self.assertRaises(ClientError) as ce:
+            loop.run_until_complete(api.user_info('123'))
+        self.assertIn('users/2/info/', str(ce.exception))
+        self.assertEqual(len(runs), 2)
+
+        with self.assertRaises(ValueError):
+            AsyncClient('', '', cookie=self.api.cookie_jar.dump(), media_info_batch_window=0.1)
+        loop.close()
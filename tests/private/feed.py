@@ -1,6 +1,6 @@
 import unittest
 
-from ..common import ApiTestBase, ClientError
+from ..common import ApiTestBase, ClientError, compat_mock
 
 
 class FeedTests(ApiTestBase):
@@ -45,6 +45,10 @@ class FeedTests(ApiTestBase):
                 'name': 'test_reels_media',
                 'test': FeedTests('test_reels_media', api, user_id='329452045')
             },
+            {
+                'name': 'test_harvest_reels_mock',
+                'test': FeedTests('test_harvest_reels_mock', api)
+            },
             {
                 'name': 'test_user_story_feed',
                 'test': FeedTests('test_user_story_feed', api, user_id='329452045')
@@ -119,6 +123,41 @@ class FeedTests(ApiTestBase):
         results = self.api.reels_media([self.test_user_id])
         self.assertEqual(results.get('status'), 'ok')
 
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_harvest_reels_mock(self, call_api):
+        self.sleep_interval = 0
+        batches = []
+
+        def reels_media(endpoint, params=None):
+            batches.append(params['user_ids'])
+            if '9' in params['user_ids']:
+                raise ClientError('Server error', code=500)
+            return {'status': 'ok', 'reels': dict(
+                (u, {'id': int(u), 'latest_reel_media': 100 + int(u), 'items': []})
+                for u in params['user_ids'])}
+        call_api.side_effect = reels_media
+
+        seen = {'1': 101, '2': 1}
+        reels = list(self.api.harvest_reels(['1', '2', '3', 3, 4], seen=seen, batch_size=2))
+        # user 1 is unchanged
+        self.assertEqual(sorted(r['id'] for r in reels), [2, 3, 4])
+        self.assertEqual(sorted(len(b) for b in batches), [2, 2])
+        self.assertEqual(seen, {'1': 101, '2': 102, '3': 103, '4': 104})
+
+        # tray entries that have not changed are not requested
+        del batches[:]
+        tray = [{'id': 2, 'latest_reel_media': 102}, {'id': 5, 'latest_reel_media': 105}]
+        reels = list(self.api.harvest_reels(tray, seen=seen))
+        self.assertEqual([r['id'] for r in reels], [5])
+        self.assertEqual(batches, [['5']])
+
+        # a failed batch does not stop the others
+        reels = []
+        with self.assertRaises(ClientError):
+            for reel in self.api.harvest_reels(['6', '9'], seen=seen, batch_size=1):
+                reels.append(reel)
+        self.assertEqual([r['id'] for r in reels], [6])
+
     def test_feed_tag(self):
         rank_token = self.api.generate_uuid()
         results = self.api.feed_tag('catsofinstagram', rank_token)
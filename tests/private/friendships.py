@@ -35,6 +35,10 @@ class FriendshipTests(ApiTestBase):
                 'name': 'test_friendships_show_many',
                 'test': FriendshipTests('test_friendships_show_many', api, user_id='329452045')
             },
+            {
+                'name': 'test_bulk_friendships_show_mock',
+                'test': FriendshipTests('test_bulk_friendships_show_mock', api)
+            },
             {
                 'name': 'test_friendships_show_many2',
                 'test': FriendshipTests('test_friendships_show_many', api, user_id=['329452045', '124317'])
@@ -149,6 +153,37 @@ class FriendshipTests(ApiTestBase):
         self.assertEqual(results.get('status'), 'ok')
         self.assertGreater(len(results.get('friendship_statuses', [])), 0, 'No statuses returned.')
 
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_bulk_friendships_show_mock(self, call_api):
+        self.sleep_interval = 0
+        chunks = []
+
+        def show_many(endpoint, params=None, unsigned=False):
+            user_ids = params['user_ids'].split(',')
+            chunks.append(user_ids)
+            return {
+                'status': 'ok',
+                'friendship_statuses': dict((u, {'following': u == '2'}) for u in user_ids)}
+        call_api.side_effect = show_many
+        self.api.friendship_status_cache.clear()
+
+        user_ids = [str(i) for i in range(1, 8)] + ['1', 2]
+        results = self.api.bulk_friendships_show(user_ids, chunk_size=3)
+        self.assertEqual(sorted(results['friendship_statuses'].keys()), [str(i) for i in range(1, 8)])
+        self.assertTrue(results['friendship_statuses']['2']['following'])
+        self.assertEqual(sorted(len(c) for c in chunks), [1, 3, 3])
+        self.assertEqual(sorted(sum(chunks, [])), [str(i) for i in range(1, 8)])
+
+        # cached statuses are not requested again
+        del chunks[:]
+        results = self.api.bulk_friendships_show(['1', '2', '8'], chunk_size=3)
+        self.assertEqual(chunks, [['8']])
+        self.assertEqual(len(results['friendship_statuses']), 3)
+        del chunks[:]
+        self.api.bulk_friendships_show(['1', '2'], refresh=True)
+        self.assertEqual(chunks, [['1', '2']])
+        self.api.friendship_status_cache.clear()
+
     @unittest.skip('Modifies data.')
     def test_friendships_create(self):
         results = self.api.friendships_create('2958144170')
@@ -1,9 +1,10 @@
 import unittest
 import json
+import threading
 import time
 
 from ..common import (
-    ClientError,
+    Client, ClientError,
     ApiTestBase, compat_mock, gen_user_breadcrumb
 )
 
@@ -47,6 +48,14 @@ class MediaTests(ApiTestBase):
                 'name': 'test_media_n_comments',
                 'test': MediaTests('test_media_n_comments', api, media_id=test_media_id)
             },
+            {
+                'name': 'test_media_info_batch_mock',
+                'test': MediaTests('test_media_info_batch_mock', api)
+            },
+            {
+                'name': 'test_iter_media_comments_mock',
+                'test': MediaTests('test_iter_media_comments_mock', api)
+            },
             {
                 'name': 'test_media_likers',
                 'test': MediaTests('test_media_likers', api, media_id=test_media_id)
@@ -171,6 +180,10 @@ class MediaTests(ApiTestBase):
                 'name': 'test_comment_inline_replies',
                 'test': MediaTests('test_comment_inline_replies', api)
             },
+            {
+                'name': 'test_iter_comment_replies_mock',
+                'test': MediaTests('test_iter_comment_replies_mock', api)
+            },
             {
                 'name': 'test_story_viewers_mock',
                 'test': MediaTests('test_story_viewers_mock', api)
@@ -220,6 +233,98 @@ class MediaTests(ApiTestBase):
         results = self.api.media_n_comments(self.test_media_id, n=num_of_comments)
         self.assertGreaterEqual(len(results), num_of_comments, 'No comment returned.')
 
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_media_info_batch_mock(self, call_api):
+        self.sleep_interval = 0
+
+        def medias_info(endpoint, query=None):
+            self.assertEqual(endpoint, 'media/infos/')
+            media_ids = query['media_ids'].split(',')
+            return {
+                'status': 'ok', 'more_available': False,
+                'items': [{'pk': int(media_id.split('_')[0]), 'id': media_id}
+                          for media_id in media_ids if media_id != '4_1']}
+        call_api.side_effect = medias_info
+
+        api = Client(
+            self.api.username, self.api.password,
+            settings=self.api.settings, media_info_batch_window=0.2)
+        results = {}
+
+        def media_info(media_id):
+            try:
+                results[media_id] = api.media_info(media_id)
+            except ClientError as e:
+                results[media_id] = e
+
+        threads = [threading.Thread(target=media_info, args=(media_id, ))
+                   for media_id in ('1_1', '2_1', '1_1', '3_1', '4_1')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # one deduplicated batch
+        self.assertEqual(call_api.call_count, 1)
+        self.assertEqual(
+            sorted(call_api.call_args[1]['query']['media_ids'].split(',')), ['1_1', '2_1', '3_1', '4_1'])
+        for media_id in ('1_1', '2_1', '3_1'):
+            self.assertEqual(results[media_id]['items'], [{'pk': int(media_id[0]), 'id': media_id}])
+            self.assertEqual(results[media_id]['num_results'], 1)
+        self.assertEqual(results['4_1'].code, 404)
+
+        # batches are split at max_batch_size
+        call_api.reset_mock()
+        api.media_info_loader.max_batch_size = 2
+        threads = [threading.Thread(target=media_info, args=(media_id, ))
+                   for media_id in ('5_1', '6_1', '7_1')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(call_api.call_count, 2)
+        self.assertEqual(results['7_1']['items'][0]['pk'], 7)
+
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_iter_media_comments_mock(self, call_api):
+        pages = [
+            {'comments': [{'pk': 3, 'created_at_utc': 3}, {'pk': 5, 'created_at_utc': 5}],
+             'has_more_comments': True, 'next_max_id': 'a'},
+            {'comments': [{'pk': 1, 'created_at_utc': 1}, {'pk': 4, 'created_at_utc': 4}],
+             'has_more_headload_comments': True, 'next_min_id': 'b'},
+            {'comments': [{'pk': 6, 'created_at_utc': 6}, {'pk': 2, 'created_at_utc': 2}]},
+        ]
+        queries = []
+
+        def get_page(endpoint, query=None):
+            queries.append(dict(query))
+            return dict(pages[call_api.call_count - 1])
+        call_api.side_effect = get_page
+
+        comments = list(self.api.iter_media_comments('123'))
+        self.assertEqual([c['pk'] for c in comments], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(queries, [{}, {'max_id': 'a'}, {'max_id': 'a', 'min_id': 'b'}])
+
+        call_api.reset_mock()
+        comments = list(self.api.iter_media_comments('123', reverse=True))
+        self.assertEqual([c['pk'] for c in comments], [6, 5, 4, 3, 2, 1])
+
+        # unordered comments are yielded as each page arrives
+        call_api.reset_mock()
+        comments = self.api.iter_media_comments('123', ordered=False)
+        self.assertEqual(next(comments)['pk'], 3)
+        self.assertEqual(call_api.call_count, 1)
+        self.assertEqual([c['pk'] for c in comments], [5, 1, 4, 6, 2])
+
+        call_api.reset_mock()
+        comments = list(self.api.iter_media_comments('123', n=3, ordered=False))
+        self.assertEqual([c['pk'] for c in comments], [3, 5, 1, 4])
+        self.assertEqual(call_api.call_count, 2)
+
+        call_api.reset_mock()
+        comments = self.api.media_n_comments('123', n=100)
+        self.assertEqual([c['pk'] for c in comments], [1, 2, 3, 4, 5, 6])
+
     def test_comment_replies(self):
         results = self.api.comment_replies(
             '1652531711743017348_184692323', '17881229782160892')
@@ -233,6 +338,25 @@ class MediaTests(ApiTestBase):
         self.assertGreater(
             len(results.get('child_comments', [])), 0, 'No replies returned.')
 
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_iter_comment_replies_mock(self, call_api):
+        pages = [
+            {'child_comments': [{'pk': 1}, {'pk': 2}],
+             'has_more_tail_child_comments': True, 'next_max_child_cursor': 'a'},
+            {'child_comments': [{'pk': 3}],
+             'has_more_tail_child_comments': False, 'next_max_child_cursor': 'b'},
+        ]
+        queries = []
+
+        def get_page(endpoint, query=None):
+            queries.append(dict(query))
+            return dict(pages[call_api.call_count - 1])
+        call_api.side_effect = get_page
+
+        replies = list(self.api.iter_items(self.api.comment_replies, '123', '456', prefetch=False))
+        self.assertEqual([c['pk'] for c in replies], [1, 2, 3])
+        self.assertEqual(queries, [{}, {'max_id': 'a'}])
+
     @unittest.skip('Modifies data.')
     def test_edit_media(self):
         results = self.api.self_feed()
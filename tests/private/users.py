@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from ..common import (
@@ -48,6 +49,10 @@ class UsersTests(ApiTestBase):
                 'name': 'test_user_reel_settings',
                 'test': UsersTests('test_user_reel_settings', api)
             },
+            {
+                'name': 'test_bulk_user_info_mock',
+                'test': UsersTests('test_bulk_user_info_mock', api)
+            },
             {
                 'name': 'test_set_reel_settings_mock',
                 'test': UsersTests('test_set_reel_settings_mock', api)
@@ -106,6 +111,35 @@ class UsersTests(ApiTestBase):
         self.assertIsNotNone(results.get('message_prefs'))
         self.assertTrue('blocked_reels' in results)
 
+    @compat_mock.patch('instagram_private_api.Client._call_api')
+    def test_bulk_user_info_mock(self, call_api):
+        self.sleep_interval = 0
+
+        def user_info(endpoint, **kwargs):
+            user_id = endpoint.split('/')[1]
+            if user_id == '3':
+                raise ClientError('Not Found', code=404)
+            return {'status': 'ok', 'user': {'pk': int(user_id), 'username': 'user' + user_id}}
+        call_api.side_effect = user_info
+
+        start = time.time()
+        results = list(self.api.bulk_user_info(
+            [str(i) for i in range(1, 7)], concurrency=3, rate_limit=50))
+        # 6 lookups at 50 per second
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        self.assertEqual(sorted(r.item for r in results), ['1', '2', '3', '4', '5', '6'])
+        errors = [r for r in results if r.error]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].item, '3')
+        self.assertEqual(errors[0].error.code, 404)
+        self.assertIsNone(errors[0].result)
+        for r in results:
+            if not r.error:
+                self.assertEqual(r.result['user']['username'], 'user' + r.item)
+
+        with self.assertRaises(ValueError):
+            self.api.bulk_user_info(['1'], method='media_info')
+
     @compat_mock.patch('instagram_private_api.Client._call_api')
     def test_set_reel_settings_mock(self, call_api):
         call_api.return_value = {'status': 'ok', 'message_prefs': 'anyone'}
@@ -0,0 +1,940 @@
+"""
+A local http server that emulates the private app API (i.instagram.com) and
+the web API (www.instagram.com) with synthetic responses, for load tests and
+for running the clients without touching the live service.
+
+- Feeds, follower lists, comments, sections and GraphQL edges are paginated
+  over ``total_items`` items, ``page_size`` (or the requested ``first``) at a time
+- GraphQL queries are routed by ``query_hash``
+- Responses are gzipped when the request accepts it
+- ``post_video`` chunk uploads are answered with the received ranges, and a json
+  response once the whole file has been received
+- Latency and errors, such as 429 throttling, can be injected
+
+Example::
+
+    python -m tests.stubserver --port 8080 --latency 0.05 --error-rate 0.01
+
+    api = Client(
+        'username', 'password', api_url='http://127.0.0.1:8080/api/{version!s}/')
+    web_api = WebClient(api_url='http://127.0.0.1:8080/')
+
+Or from a test::
+
+    with StubServer(total_items=50) as server:
+        api = Client('username', 'password', api_url=server.private_api_url)
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from io import BytesIO
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:     # Python 2
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+try:
+    from instagram_private_api.compat import compat_urllib_parse, compat_urllib_parse_urlparse
+    from instagram_private_api.utils import InstagramID
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from instagram_private_api.compat import compat_urllib_parse, compat_urllib_parse_urlparse
+    from instagram_private_api.utils import InstagramID
+
+#: Created time of the synthetic objects
+BASE_TIMESTAMP = 1533000000
+
+ERROR_MESSAGES = {
+    400: 'Bad request',
+    404: 'Page not found',
+    429: 'Please wait a few minutes before you try again.',
+    500: 'Internal server error',
+    503: 'Service unavailable',
+}
+
+
+def _stable_id(text):
+    """A numeric id derived from a name, such as a username or tag."""
+    if text.isdigit():
+        return int(text)
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _media_pk(owner_pk, index):
+    return 1800000000000000000 + (owner_pk % 1000000000) * 100000 + index
+
+
+class _StubHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    # persistent connections, for the clients' keep_alive option
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, content = self.server.stub.dispatch(self.command, self.path, self.headers, body)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, format, *args):     # pylint: disable=redefined-builtin
+        if self.server.stub.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class StubServer(object):
+    """
+    Local server with synthetic responses for the endpoints of both clients.
+    Point the private client at :attr:`private_api_url` and the web client
+    at :attr:`web_api_url` with their ``api_url`` option.
+    """
+
+    #: Web GraphQL query hashes, by the client method that uses them
+    QUERY_HASHES = {
+        'e7e2f4da4b02303f74f0841279e52d76': 'user_feed',
+        'f0986789a5c5d17c2400faebf16efd0d': 'media_comments',
+        'e0f59e4a1c8d78d0161873bc2ee7ec44': 'media_likers',
+        'c56ee0ae1f89cdbd1c89e2bc6b8f3d18': 'user_following',
+        '7dd9a7e2160524fd85f50317462cff9f': 'user_followers',
+        'f92f56d47dc7a55b606908374b43a314': 'tag_feed',
+        '1b84447a4d8b6d6d0426fefb34514485': 'location_feed',
+        'ff260833edf142911047af6024eb634a': 'tagged_user_feed',
+        '3f01472fb28fb8aca9ad9dbc9d4578ff': 'timeline_feed',
+        '60b755363b5c230111347a7a4e242001': 'reels_tray',
+        'eb1918431e946dd39bf8cf8fb870e426': 'reels_feed',
+        '7c16654f22c819fb63d1183034a5162f': 'highlight_reels',
+        '45246d3fe16ccc6577e0bd297a5db1ab': 'highlight_reel_media',
+    }
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, latency_jitter=0,
+                 error_rate=0, error_status=429, error_paths=None,
+                 page_size=20, total_items=100, compress=True, seed=None, verbose=False):
+        """
+
+        :param host: interface to listen on
+        :param port: port to listen on. Default: a free port
+        :param latency: seconds to wait before each response
+        :param latency_jitter: up to this many more seconds, at random, are waited
+        :param error_rate: fraction of requests, at random, to answer with ``error_status``
+        :param error_status: http status of the injected errors, example 429 or 500
+        :param error_paths: dict of path regex to the http status that matching requests
+            are always answered with, example ``{r'/feed/timeline/': 500}``
+        :param page_size: items per page of the private API lists
+        :param total_items: items in each list before the last page
+        :param compress: gzip the responses of requests that accept it
+        :param seed: seed for the random latency and errors
+        :param verbose: log requests to stderr
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_paths = [(re.compile(pattern), status) for pattern, status in (error_paths or {}).items()]
+        self.page_size = page_size
+        self.total_items = total_items
+        self.compress = compress
+        self.verbose = verbose
+        #: Number of requests served, by route name
+        self.request_counts = Counter()
+        self._random = random.Random(seed)
+        self._uploads = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._private_routes = [(re.compile(pattern + '$'), handler) for pattern, handler in [
+            (r'si/fetch_headers/', self.fetch_headers),
+            (r'accounts/login/', self.login),
+            (r'accounts/current_user/', self.current_user),
+            (r'users/(?P<user_id>\d+)/info/', self.user_info),
+            (r'users/(?P<user_name>[^/]+)/usernameinfo/', self.user_info),
+            (r'users/search/', self.search_users),
+            (r'feed/timeline/', self.feed_timeline),
+            (r'feed/(?:saved|collection/[^/]+)/', self.feed_saved),
+            (r'feed/user/(?P<user_id>\d+)/reel_media/', self.user_reel),
+            (r'feed/user/(?P<user_id>\d+)/story/', self.user_story),
+            (r'feed/reels_media/', self.reels_media),
+            (r'feed/reels_tray/', self.reels_tray),
+            (r'feed/user/(?P<user_id>\d+)/', self.feed),
+            (r'feed/user/(?P<user_name>[^/]+)/username/', self.feed),
+            (r'usertags/(?P<user_id>\d+)/feed/', self.feed),
+            (r'feed/tag/(?P<tag>[^/]+)/', self.feed),
+            (r'feed/location/(?P<location_id>\d+)/', self.feed),
+            (r'feed/(?:liked|popular|only_me_feed)/', self.feed),
+            (r'(?:tags/(?P<tag>[^/]+)|locations/(?P<location_id>\d+))/sections/', self.sections),
+            (r'friendships/(?P<user_id>\d+)/(?:followers|following)/', self.user_list),
+            (r'friendships/pending/', self.user_list),
+            (r'users/blocked_list/', self.blocked_list),
+            (r'friendships/show/(?P<user_id>\d+)/', self.friendship_show),
+            (r'friendships/show_many/', self.friendships_show_many),
+            (r'friendships/(?:create|destroy|block|unblock)/(?P<user_id>\d+)/', self.friendship_action),
+            (r'media/(?P<media_id>\d+)(?:_\d+)?/info/', self.media_info),
+            (r'media/infos/', self.medias_info),
+            (r'media/(?P<media_id>\d+)(?:_\d+)?/comments/', self.media_comments),
+            (r'media/(?P<media_id>\d+)(?:_\d+)?/comments/(?P<comment_id>\d+)/(?:inline_)?child_comments/',
+             self.comment_replies),
+            (r'media/(?P<media_id>\d+)(?:_\d+)?/comment/', self.post_comment),
+            (r'media/(?P<media_id>\d+)(?:_\d+)?/(?:likers|likers_chrono)/', self.media_likers),
+            (r'tags/(?P<tag>[^/]+)/info/', self.tag_info),
+            (r'tags/search/', self.tag_search),
+            (r'(?:location_search|fbsearch/places)/', self.location_search),
+            (r'upload/photo/', self.upload_photo),
+            (r'upload/video/', self.upload_video),
+            (r'media/configure(?:_to_story|_sidecar)?/', self.configure),
+        ]]
+        self._web_routes = [(re.compile(pattern + '$'), handler) for pattern, handler in [
+            (r'', self.web_home),
+            (r'accounts/login/ajax/', self.web_login),
+            (r'graphql/query/', self.web_graphql),
+            (r'p/(?P<short_code>[^/]+)/', self.web_media_info),
+            (r'web/friendships/(?P<user_id>\d+)/follow/', self.web_follow),
+            (r'web/comments/(?P<media_id>\d+)/add/', self.web_post_comment),
+            (r'create/(?P<media_id>\d+)/delete/', self.web_delete_media),
+            (r'web/search/topsearch/', self.web_search),
+            (r'create/upload/photo/', self.upload_photo),
+            (r'create/configure/', self.web_configure),
+            (r'(?:web|query)/.*', self.ok),
+            (r'(?P<user_name>[^/]+)/', self.web_user_info),
+        ]]
+
+    @property
+    def url(self):
+        """Base url of the server, example ``http://127.0.0.1:8080``"""
+        return 'http://{0!s}:{1:d}'.format(self.host, self.port)
+
+    @property
+    def private_api_url(self):
+        """``api_url`` for the private API client"""
+        return self.url + '/api/{version!s}/'
+
+    @property
+    def web_api_url(self):
+        """``api_url`` for the web API client"""
+        return self.url + '/'
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._server = _StubHTTPServer((self.host, self.port), _StubRequestHandler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # Request handling
+
+    def dispatch(self, method, path, headers, body):
+        """
+        Answer a request.
+
+        :return: tuple of status, list of header (name, value) tuples, body bytes
+        """
+        parsed_url = compat_urllib_parse_urlparse(path)
+        query = dict(compat_urllib_parse.parse_qsl(parsed_url.query, keep_blank_values=True))
+        form = dict(compat_urllib_parse.parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True))
+        if 'signed_body' in form:
+            form.update(json.loads(form.pop('signed_body').split('.', 1)[1]))
+        request = {
+            'method': method, 'path': parsed_url.path, 'query': query, 'form': form,
+            'headers': headers, 'body': body,
+        }
+
+        handler, kwargs, name = self.route(parsed_url.path)
+        with self._lock:
+            self.request_counts[name] += 1
+            delay = self.latency + (self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+            error_status = next(
+                (status for pattern, status in self.error_paths if pattern.search(parsed_url.path)), None)
+            if not error_status and self.error_rate and self._random.random() < self.error_rate:
+                error_status = self.error_status
+        if delay:
+            time.sleep(delay)
+
+        cookies = []
+        content_type = 'application/json; charset=utf-8'
+        if error_status:
+            status, result = error_status, self.error(error_status)
+        elif not handler:
+            status, result = 404, self.error(404)
+        else:
+            result = handler(request, **kwargs)
+            status = 200
+            if isinstance(result, tuple):
+                result, cookies = result
+            if isinstance(result, dict) and result.get('status') == 'fail':
+                status = 400
+
+        if isinstance(result, dict):
+            content = json.dumps(result, separators=(',', ':')).encode('utf-8')
+        else:
+            content_type = 'text/html; charset=utf-8' if result.startswith('<') else 'text/plain; charset=utf-8'
+            content = result.encode('utf-8')
+
+        response_headers = [('Content-Type', content_type)]
+        response_headers.extend([
+            ('Set-Cookie', '{0!s}={1!s}; Path=/; Max-Age=7776000'.format(name, value))
+            for name, value in cookies])
+        if self.compress and 'gzip' in (headers.get('Accept-Encoding') or ''):
+            buf = BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+                f.write(content)
+            content = buf.getvalue()
+            response_headers.append(('Content-Encoding', 'gzip'))
+        return status, response_headers, content
+
+    def route(self, path):
+        """
+        Find the handler of a path.
+
+        :return: tuple of handler, handler kwargs, route name
+        """
+        if path.startswith('/upload/chunk/'):
+            return self.upload_chunk, {'job': path.split('/')[3]}, 'upload_chunk'
+        mobj = re.match(r'/api/v\d+/(?P<endpoint>.*)', path)
+        routes = self._private_routes if mobj else self._web_routes
+        endpoint = mobj.group('endpoint') if mobj else path[1:]
+        for pattern, handler in routes:
+            route_match = pattern.match(endpoint)
+            if route_match:
+                kwargs = dict([(k, v) for k, v in route_match.groupdict().items() if v is not None])
+                return handler, kwargs, handler.__name__
+        if mobj:
+            # other private API actions, example media/123/like/
+            return self.ok, {}, 'ok'
+        return None, {}, 'not_found'
+
+    @staticmethod
+    def error(status):
+        return {'message': ERROR_MESSAGES.get(status, 'Error'), 'status': 'fail'}
+
+    def ok(self, request, **kwargs):
+        return {'status': 'ok'}
+
+    def _page(self, request):
+        """Offset of the page and the ``next_max_id``, or None for the last page."""
+        max_id = request['query'].get('max_id') or request['form'].get('max_id') or ''
+        offset = int(max_id) if max_id.isdigit() else 0
+        end = min(offset + self.page_size, self.total_items)
+        return offset, end, str(end) if end < self.total_items else None
+
+    # Synthetic private API objects
+
+    @staticmethod
+    def user(pk, full=False):
+        pk = int(pk)
+        user = {
+            'pk': pk,
+            'username': 'user{0:d}'.format(pk),
+            'full_name': 'User {0:d}'.format(pk),
+            'is_private': False,
+            'profile_pic_url': 'https://scontent.cdninstagram.com/{0:d}_a.jpg'.format(pk),
+            'profile_pic_id': '{0:d}_{1:d}'.format(_media_pk(pk, 0), pk),
+            'is_verified': False,
+            'has_anonymous_profile_picture': False,
+        }
+        if full:
+            user.update({
+                'media_count': 100,
+                'follower_count': 1000,
+                'following_count': 100,
+                'biography': 'Synthetic user',
+                'external_url': '',
+                'is_business': False,
+                'hd_profile_pic_url_info': {
+                    'url': user['profile_pic_url'], 'width': 320, 'height': 320},
+            })
+        return user
+
+    def media(self, pk, owner_pk=None):
+        pk = int(pk)
+        owner_pk = owner_pk or (pk // 100000) % 1000000000 or 1
+        owner = self.user(owner_pk)
+        taken_at = BASE_TIMESTAMP - pk % 100000 * 60
+        image_url = 'https://scontent.cdninstagram.com/{0:d}_n.jpg'.format(pk)
+        return {
+            'taken_at': taken_at,
+            'device_timestamp': taken_at * 1000,
+            'pk': pk,
+            'id': '{0:d}_{1:d}'.format(pk, owner_pk),
+            'code': InstagramID.shorten_id(pk),
+            'client_cache_key': InstagramID.shorten_id(pk) + '.2',
+            'media_type': 1,
+            'filter_type': 0,
+            'image_versions2': {'candidates': [
+                {'width': 1080, 'height': 1080, 'url': image_url},
+                {'width': 320, 'height': 320, 'url': image_url},
+                {'width': 150, 'height': 150, 'url': image_url},
+            ]},
+            'original_width': 1080,
+            'original_height': 1080,
+            'user': owner,
+            'caption': {
+                'pk': pk + 1,
+                'user_id': owner_pk,
+                'text': 'Caption of {0:d}'.format(pk),
+                'type': 1,
+                'created_at': taken_at,
+                'created_at_utc': taken_at,
+                'content_type': 'comment',
+                'status': 'Active',
+                'bit_flags': 0,
+                'user': owner,
+                'did_report_as_spam': False,
+                'media_id': pk,
+            },
+            'caption_is_edited': False,
+            'like_count': 100,
+            'comment_count': self.total_items,
+            'has_liked': False,
+            'photo_of_you': False,
+            'can_viewer_save': True,
+            'organic_tracking_token': 'eyJ2ZXJzaW9uIjo1fQ==',
+        }
+
+    def comment(self, pk, media_pk):
+        user = self.user(pk % 1000000 + 1)
+        created_at = BASE_TIMESTAMP - pk % 100000 * 60
+        return {
+            'pk': pk,
+            'user_id': user['pk'],
+            'text': 'Comment {0:d}'.format(pk),
+            'type': 0,
+            'created_at': created_at,
+            'created_at_utc': created_at,
+            'content_type': 'comment',
+            'status': 'Active',
+            'bit_flags': 0,
+            'user': user,
+            'did_report_as_spam': False,
+            'media_id': media_pk,
+            'comment_like_count': 0,
+            'has_liked_comment': False,
+        }
+
+    def reel(self, user_id):
+        user_id = int(user_id)
+        items = [self.media(_media_pk(user_id, i), user_id) for i in range(3)]
+        return {
+            'id': user_id,
+            'latest_reel_media': items[0]['taken_at'],
+            'expiring_at': items[0]['taken_at'] + 86400,
+            'seen': 0,
+            'can_reply': True,
+            'reel_type': 'user_reel',
+            'user': self.user(user_id),
+            'items': items,
+            'prefetch_count': 0,
+            'media_count': len(items),
+        }
+
+    @staticmethod
+    def friendship_status(user_id):
+        return {
+            'following': False, 'followed_by': False, 'blocking': False, 'muting': False,
+            'is_private': False, 'incoming_request': False, 'outgoing_request': False,
+            'is_bestie': False, 'is_blocking_reel': False, 'is_muting_reel': False,
+        }
+
+    # Private API handlers
+
+    def fetch_headers(self, request):
+        return {'status': 'ok'}, [('csrftoken', hashlib.md5(b'csrf').hexdigest())]
+
+    def login(self, request):
+        user = self.user(_stable_id(request['form'].get('username') or 'user'))
+        user['username'] = request['form'].get('username') or user['username']
+        return {'logged_in_user': user, 'status': 'ok'}, [
+            ('csrftoken', hashlib.md5(b'csrf').hexdigest()),
+            ('ds_user', user['username']),
+            ('ds_user_id', str(user['pk'])),
+            ('sessionid', '{0:d}%3Astub%3A1'.format(user['pk'])),
+        ]
+
+    def current_user(self, request):
+        return {'user': self.user(1, full=True), 'status': 'ok'}
+
+    def user_info(self, request, user_id=None, user_name=None):
+        user = self.user(user_id or _stable_id(user_name), full=True)
+        if user_name:
+            user['username'] = user_name
+        return {'user': user, 'status': 'ok'}
+
+    def search_users(self, request):
+        users = [self.user(_stable_id(request['query'].get('q', '')) + i) for i in range(self.page_size)]
+        return {'users': users, 'num_results': len(users), 'has_more': False, 'status': 'ok'}
+
+    def feed(self, request, user_id=None, user_name=None, tag=None, location_id=None):
+        owner_pk = int(user_id) if user_id else _stable_id(user_name or tag or location_id or request['path'])
+        offset, end, next_max_id = self._page(request)
+        results = {
+            'items': [self.media(_media_pk(owner_pk, i), owner_pk) for i in range(offset, end)],
+            'num_results': end - offset,
+            'more_available': next_max_id is not None,
+            'auto_load_more_enabled': True,
+            'status': 'ok',
+        }
+        if next_max_id:
+            results['next_max_id'] = next_max_id
+        return results
+
+    def feed_timeline(self, request):
+        results = self.feed(request, user_id='1')
+        results['feed_items'] = [{'media_or_ad': item} for item in results.pop('items')]
+        return results
+
+    def feed_saved(self, request):
+        results = self.feed(request, user_id='2')
+        results['items'] = [{'media': item} for item in results['items']]
+        return results
+
+    def sections(self, request, tag=None, location_id=None):
+        owner_pk = _stable_id(tag or location_id)
+        page = int(request['form'].get('page') or 0)
+        offset, end, next_max_id = self._page(request)
+        medias = [{'media': self.media(_media_pk(owner_pk, i), owner_pk)} for i in range(offset, end)]
+        return {
+            'sections': [
+                {'layout_type': 'media_grid', 'feed_type': 'media', 'layout_content': {'medias': medias[i:i + 3]}}
+                for i in range(0, len(medias), 3)],
+            'more_available': next_max_id is not None,
+            'next_max_id': next_max_id,
+            'next_page': page + 1,
+            'next_media_ids': [m['media']['pk'] for m in medias[-3:]],
+            'auto_load_more_enabled': True,
+            'status': 'ok',
+        }
+
+    def user_list(self, request, user_id='1'):
+        offset, end, next_max_id = self._page(request)
+        base_pk = int(user_id) * 1000
+        results = {
+            'users': [self.user(base_pk + i) for i in range(offset, end)],
+            'big_list': next_max_id is not None,
+            'page_size': self.page_size,
+            'status': 'ok',
+        }
+        if next_max_id:
+            results['next_max_id'] = next_max_id
+        return results
+
+    def blocked_list(self, request):
+        results = self.user_list(request)
+        results['blocked_list'] = [
+            {'user_id': u['pk'], 'username': u['username'], 'full_name': u['full_name'],
+             'profile_pic_url': u['profile_pic_url'], 'block_at': BASE_TIMESTAMP}
+            for u in results.pop('users')]
+        return results
+
+    def friendship_show(self, request, user_id):
+        results = self.friendship_status(user_id)
+        results['status'] = 'ok'
+        return results
+
+    def friendships_show_many(self, request):
+        user_ids = [u for u in request['form'].get('user_ids', '').split(',') if u]
+        return {
+            'friendship_statuses': dict([(u, self.friendship_status(u)) for u in user_ids]),
+            'status': 'ok',
+        }
+
+    def friendship_action(self, request, user_id):
+        status = self.friendship_status(user_id)
+        status['following'] = '/create/' in request['path']
+        status['blocking'] = '/block/' in request['path']
+        return {'friendship_status': status, 'status': 'ok'}
+
+    def media_info(self, request, media_id):
+        return {
+            'items': [self.media(media_id)], 'num_results': 1,
+            'more_available': False, 'auto_load_more_enabled': False, 'status': 'ok',
+        }
+
+    def medias_info(self, request):
+        media_ids = request['query'].get('media_ids') or request['form'].get('media_ids') or ''
+        items = [self.media(m.split('_')[0]) for m in media_ids.split(',') if m]
+        return {
+            'items': items, 'num_results': len(items),
+            'more_available': False, 'auto_load_more_enabled': False, 'status': 'ok',
+        }
+
+    def media_comments(self, request, media_id):
+        media_pk = int(media_id)
+        offset, end, next_max_id = self._page(request)
+        results = {
+            'comments': [self.comment(media_pk + 10 + i, media_pk) for i in range(offset, end)],
+            'comment_count': self.total_items,
+            'comment_likes_enabled': True,
+            'has_more_comments': next_max_id is not None,
+            'caption_is_edited': False,
+            'status': 'ok',
+        }
+        if next_max_id:
+            results['next_max_id'] = next_max_id
+        return results
+
+    def comment_replies(self, request, media_id, comment_id):
+        comment_pk = int(comment_id)
+        return {
+            'parent_comment_id': comment_pk,
+            'child_comments': [self.comment(comment_pk + 1 + i, int(media_id)) for i in range(3)],
+            'child_comment_count': 3,
+            'has_more_head_child_comments': False,
+            'has_more_tail_child_comments': False,
+            'status': 'ok',
+        }
+
+    def post_comment(self, request, media_id):
+        comment = self.comment(int(media_id) + 99999, int(media_id))
+        comment['text'] = request['form'].get('comment_text', '')
+        return {'comment': comment, 'status': 'ok'}
+
+    def media_likers(self, request, media_id):
+        users = [self.user(int(media_id) % 1000000 + i) for i in range(self.page_size)]
+        return {'users': users, 'user_count': len(users), 'status': 'ok'}
+
+    def user_reel(self, request, user_id):
+        results = self.reel(user_id)
+        results['status'] = 'ok'
+        return results
+
+    def user_story(self, request, user_id):
+        return {'reel': self.reel(user_id), 'status': 'ok'}
+
+    def reels_media(self, request):
+        user_ids = request['form'].get('user_ids') or []
+        reels = dict([(str(u), self.reel(u)) for u in user_ids])
+        return {'reels': reels, 'reels_media': list(reels.values()), 'status': 'ok'}
+
+    def reels_tray(self, request):
+        return {'tray': [self.reel(10 + i) for i in range(5)], 'status': 'ok'}
+
+    def tag_info(self, request, tag):
+        return {'name': tag, 'id': _stable_id(tag), 'media_count': self.total_items, 'status': 'ok'}
+
+    def tag_search(self, request):
+        q = request['query'].get('q', '')
+        results = [{'name': '{0!s}{1:d}'.format(q, i), 'id': _stable_id(q) + i, 'media_count': 100}
+                   for i in range(self.page_size)]
+        return {'results': results, 'has_more': False, 'status': 'ok'}
+
+    def location_search(self, request):
+        venues = [{
+            'external_id': 100 + i, 'external_id_source': 'facebook_places',
+            'name': 'Place {0:d}'.format(i), 'address': '', 'lat': 1.0, 'lng': 103.0,
+        } for i in range(self.page_size)]
+        return {'venues': venues, 'items': venues, 'has_more': False, 'status': 'ok'}
+
+    def upload_photo(self, request):
+        upload_id = request['form'].get('upload_id') or str(int(time.time() * 1000))
+        return {'upload_id': upload_id, 'status': 'ok'}
+
+    def upload_video(self, request):
+        upload_id = request['form'].get('upload_id') or str(int(time.time() * 1000))
+        job = hashlib.md5(upload_id.encode('ascii')).hexdigest()
+        return {
+            'upload_id': upload_id,
+            'video_upload_urls': [{
+                'url': '{0!s}/upload/chunk/{1!s}/'.format(self.url, job),
+                'job': job,
+                'expires': time.time() + 3600,
+            }],
+            'status': 'ok',
+        }
+
+    def upload_chunk(self, request, job):
+        """Answer a video chunk with the ranges received so far, or json when the upload is complete."""
+        mobj = re.match(r'bytes (\d+)-(\d+)/(\d+)', request['headers'].get('Content-Range') or '')
+        if not mobj:
+            return self.error(400)
+        start, end, total = [int(n) for n in mobj.groups()]
+        with self._lock:
+            ranges = self._uploads.setdefault(job, [])
+            ranges.append((start, end))
+            ranges.sort()
+            merged = [list(ranges[0])]
+            for range_start, range_end in ranges[1:]:
+                if range_start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], range_end)
+                else:
+                    merged.append([range_start, range_end])
+            self._uploads[job] = [tuple(r) for r in merged]
+            complete = merged[0] == [0, total - 1]
+            if complete:
+                del self._uploads[job]
+        if complete:
+            return {'result': 'ok', 'configure_delay_ms': 0, 'status': 'ok'}
+        return ','.join(['{0:d}-{1:d}/{2:d}'.format(s, e, total) for s, e in merged])
+
+    def configure(self, request):
+        upload_id = request['form'].get('upload_id') or '1'
+        media = self.media(_media_pk(1, int(upload_id) % 100000), 1)
+        media['caption']['text'] = request['form'].get('caption', '')
+        if request['query'].get('video'):
+            media['media_type'] = 2
+            media['video_versions'] = [{
+                'width': 720, 'height': 720, 'type': 101,
+                'url': 'https://scontent.cdninstagram.com/{0:d}_n.mp4'.format(media['pk'])}]
+        return {'media': media, 'upload_id': upload_id, 'status': 'ok'}
+
+    # Synthetic web API objects
+
+    @staticmethod
+    def web_user(pk):
+        pk = int(pk)
+        return {
+            'id': str(pk),
+            'username': 'user{0:d}'.format(pk),
+            'full_name': 'User {0:d}'.format(pk),
+            'profile_pic_url': 'https://scontent.cdninstagram.com/{0:d}_a.jpg'.format(pk),
+            'is_private': False,
+            'is_verified': False,
+            'followed_by_viewer': False,
+            'requested_by_viewer': False,
+        }
+
+    def web_media(self, pk, owner_pk=None):
+        pk = int(pk)
+        owner_pk = owner_pk or (pk // 100000) % 1000000000 or 1
+        return {
+            '__typename': 'GraphImage',
+            'id': str(pk),
+            'shortcode': InstagramID.shorten_id(pk),
+            'dimensions': {'height': 1080, 'width': 1080},
+            'display_url': 'https://scontent.cdninstagram.com/{0:d}_n.jpg'.format(pk),
+            'is_video': False,
+            'edge_media_to_caption': {'edges': [{'node': {'text': 'Caption of {0:d}'.format(pk)}}]},
+            'edge_media_to_comment': {'count': self.total_items},
+            'edge_media_preview_like': {'count': 100},
+            'edge_media_to_tagged_user': {'edges': []},
+            'comments_disabled': False,
+            'taken_at_timestamp': BASE_TIMESTAMP - pk % 100000 * 60,
+            'location': None,
+            'owner': self.web_user(owner_pk),
+            'thumbnail_src': 'https://scontent.cdninstagram.com/{0:d}_s.jpg'.format(pk),
+        }
+
+    def web_comment(self, pk):
+        return {
+            'id': str(pk),
+            'text': 'Comment {0:d}'.format(pk),
+            'created_at': BASE_TIMESTAMP - pk % 100000 * 60,
+            'owner': self.web_user(pk % 1000000 + 1),
+        }
+
+    def web_reel(self, reel_id):
+        owner_pk = _stable_id(str(reel_id))
+        return {
+            '__typename': 'GraphReel',
+            'id': str(reel_id),
+            'latest_reel_media': BASE_TIMESTAMP,
+            'expiring_at': BASE_TIMESTAMP + 86400,
+            'owner': self.web_user(owner_pk),
+            'items': [dict(self.web_media(_media_pk(owner_pk, i), owner_pk), __typename='GraphStoryImage')
+                      for i in range(3)],
+        }
+
+    def _connection(self, variables, node, first_key='first', after_key='after'):
+        after = str(variables.get(after_key) or '')
+        offset = int(after) if after.isdigit() else 0
+        end = min(offset + min(int(variables.get(first_key) or 12), 50), self.total_items)
+        return {
+            'count': self.total_items,
+            'page_info': {
+                'has_next_page': end < self.total_items,
+                'end_cursor': str(end) if end < self.total_items else None,
+            },
+            'edges': [{'node': node(i)} for i in range(offset, end)],
+        }
+
+    # Web API handlers
+
+    def web_home(self, request):
+        html = (
+            '<!DOCTYPE html><html><body><script type="text/javascript">'
+            'window._sharedData = {{"config":{{"csrf_token":"{0!s}","viewer":null}},'
+            '"rhx_gis":"{1!s}","rollout_hash":"stub1"}};</script></body></html>'
+        ).format(hashlib.md5(b'csrf').hexdigest(), hashlib.md5(b'rhx_gis').hexdigest())
+        return html, [('csrftoken', hashlib.md5(b'csrf').hexdigest())]
+
+    def web_login(self, request):
+        user_pk = _stable_id(request['form'].get('username') or 'user')
+        return {'authenticated': True, 'user': True, 'userId': str(user_pk), 'status': 'ok'}, [
+            ('csrftoken', hashlib.md5(b'csrf').hexdigest()),
+            ('ds_user_id', str(user_pk)),
+            ('sessionid', '{0:d}%3Astub%3A1'.format(user_pk)),
+        ]
+
+    def web_user_info(self, request, user_name):
+        user_pk = _stable_id(user_name)
+        user = self.web_user(user_pk)
+        user.update({
+            'username': user_name,
+            'biography': 'Synthetic user',
+            'external_url': None,
+            'profile_pic_url_hd': user['profile_pic_url'],
+            'edge_followed_by': {'count': 1000},
+            'edge_follow': {'count': 100},
+            'edge_owner_to_timeline_media': self._connection(
+                {}, lambda i: self.web_media(_media_pk(user_pk, i), user_pk)),
+        })
+        return {'graphql': {'user': user}}
+
+    def web_media_info(self, request, short_code):
+        return {'graphql': {'shortcode_media': self.web_media(InstagramID.expand_code(short_code))}}
+
+    def web_graphql(self, request):
+        query_name = self.QUERY_HASHES.get(request['query'].get('query_hash'))
+        if not query_name:
+            return self.error(400)
+        variables = json.loads(request['query'].get('variables') or '{}')
+        entity_pk = _stable_id(str(
+            variables.get('id') or variables.get('tag_name') or variables.get('shortcode') or
+            variables.get('user_id') or 1))
+        media_node = lambda i: self.web_media(_media_pk(entity_pk, i), entity_pk)  # noqa: E731
+        user_node = lambda i: self.web_user(entity_pk % 1000000 * 1000 + i)     # noqa: E731
+
+        if query_name in ('user_feed', 'tagged_user_feed', 'user_following', 'user_followers'):
+            edge_name = {
+                'user_feed': 'edge_owner_to_timeline_media',
+                'tagged_user_feed': 'edge_user_to_photos_of_you',
+                'user_following': 'edge_follow',
+                'user_followers': 'edge_followed_by',
+            }[query_name]
+            node = media_node if query_name.endswith('feed') else user_node
+            data = {'user': {edge_name: self._connection(variables, node)}}
+        elif query_name == 'media_comments':
+            data = {'shortcode_media': {'edge_media_to_comment': self._connection(
+                variables, lambda i: self.web_comment(entity_pk + i))}}
+        elif query_name == 'media_likers':
+            data = {'shortcode_media': {'edge_liked_by': self._connection(variables, user_node)}}
+        elif query_name == 'tag_feed':
+            data = {'hashtag': {
+                'name': variables.get('tag_name'),
+                'edge_hashtag_to_media': self._connection(variables, media_node),
+                'edge_hashtag_to_top_posts': {'edges': []},
+            }}
+        elif query_name == 'location_feed':
+            data = {'location': {
+                'id': str(variables.get('id')), 'name': 'Place',
+                'edge_location_to_media': self._connection(variables, media_node),
+                'edge_location_to_top_posts': {'edges': []},
+            }}
+        elif query_name == 'timeline_feed':
+            data = {'user': {'edge_web_feed_timeline': self._connection(
+                variables, media_node, 'fetch_media_item_count', 'fetch_media_item_cursor')}}
+        elif query_name == 'reels_tray':
+            data = {'user': {'feed_reels_tray': {'edge_reels_tray_to_reel': {
+                'edges': [{'node': self.web_reel(10 + i)} for i in range(5)]}}}}
+        elif query_name == 'highlight_reels':
+            data = {'user': {'edge_highlight_reels': {'edges': [
+                {'node': {'id': str(entity_pk + i), 'title': 'Highlight {0:d}'.format(i)}} for i in range(3)]}}}
+        else:
+            # reels_feed, highlight_reel_media
+            reel_ids = (variables.get('reel_ids') or []) + (variables.get('highlight_reel_ids') or [])
+            reel_ids += ['tag:' + t for t in variables.get('tag_names') or []]
+            reel_ids += ['location:' + str(loc) for loc in variables.get('location_ids') or []]
+            data = {'reels_media': [self.web_reel(r) for r in reel_ids]}
+        return {'data': data, 'status': 'ok'}
+
+    def web_follow(self, request, user_id):
+        return {'result': 'following', 'status': 'ok'}
+
+    def web_post_comment(self, request, media_id):
+        return {
+            'id': str(int(media_id) + 99999),
+            'created_time': int(time.time()),
+            'text': request['form'].get('comment_text', ''),
+            'from': {
+                'id': '1', 'username': 'user1', 'full_name': 'User 1',
+                'profile_picture': 'https://scontent.cdninstagram.com/1_a.jpg'},
+            'status': 'ok',
+        }
+
+    def web_delete_media(self, request, media_id):
+        return {'did_delete': True, 'status': 'ok'}
+
+    def web_search(self, request):
+        query = request['query'].get('query', '')
+        return {
+            'users': [{'position': i, 'user': self.web_user(_stable_id(query) + i)} for i in range(5)],
+            'places': [],
+            'hashtags': [{'position': 0, 'hashtag': {'name': query, 'id': str(_stable_id(query)),
+                                                     'media_count': self.total_items}}],
+            'has_more': False,
+            'status': 'ok',
+        }
+
+    def web_configure(self, request):
+        upload_id = request['form'].get('upload_id') or '1'
+        media = self.web_media(_media_pk(1, int(upload_id) % 100000), 1)
+        return {'media': media, 'status': 'ok'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stub server for the private and web API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='seconds to wait before each response')
+    parser.add_argument('--latency-jitter', type=float, default=0, help='up to this many more seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests to fail')
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--total-items', type=int, default=100)
+    parser.add_argument('--no-gzip', action='store_true')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = StubServer(
+        host=args.host, port=args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, error_status=args.error_status,
+        page_size=args.page_size, total_items=args.total_items,
+        compress=not args.no_gzip, seed=args.seed, verbose=args.verbose)
+    server.start()
+    print('Private API: {0!s}'.format(server.private_api_url))
+    print('Web API:     {0!s}'.format(server.web_api_url))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+import json
+
 
 from ..common import (
     WebApiTestBase, WebClientError as ClientError,
@@ -5,6 +7,7 @@ from ..common import (
     WebClient as Client,
     compat_mock, compat_urllib_error
 )
+from ..stubserver import StubServer
 
 
 class ClientTests(WebApiTestBase):
@@ -34,6 +37,22 @@ class ClientTests(WebApiTestBase):
                 'name': 'test_login_mock',
                 'test': ClientTests('test_login_mock', api)
             },
+            {
+                'name': 'test_iter_edges_mock',
+                'test': ClientTests('test_iter_edges_mock', api)
+            },
+            {
+                'name': 'test_stub_server_mock',
+                'test': ClientTests('test_stub_server_mock', api)
+            },
+            {
+                'name': 'test_response_cache_mock',
+                'test': ClientTests('test_response_cache_mock', api)
+            },
+            {
+                'name': 'test_event_hooks_mock',
+                'test': ClientTests('test_event_hooks_mock', api)
+            },
             {
                 'name': 'test_unauthed_client',
                 'test': ClientTests('test_unauthed_client', api)
@@ -59,6 +78,92 @@ class ClientTests(WebApiTestBase):
         with self.assertRaises(ClientLoginError):
             self.api.login()
 
+    @compat_mock.patch('instagram_web_api.Client._make_request')
+    def test_iter_edges_mock(self, make_request):
+        self.sleep_interval = 0
+        cursors = []
+
+        def graphql(url, query=None):
+            variables = json.loads(query['variables'])
+            self.assertEqual(variables['first'], 50)
+            cursors.append(variables.get('after'))
+            page = int(variables.get('after') or 0)
+            return {
+                'status': 'ok',
+                'data': {'user': {'edge_followed_by': {
+                    'count': 10,
+                    'page_info': {'has_next_page': page < 2, 'end_cursor': str(page + 1)},
+                    'edges': [{'node': {'id': str(page * 10 + i)}} for i in range(3)],
+                }}}}
+
+        make_request.side_effect = graphql
+        users = list(self.api.iter_edges(self.api.user_followers, '123'))
+        self.assertEqual([u['id'] for u in users], ['0', '1', '2', '10', '11', '12', '20', '21', '22'])
+        self.assertEqual(cursors, [None, '1', '2'])
+
+        del cursors[:]
+        users = list(self.api.iter_edges(self.api.user_followers, '123', max_items=4, prefetch=False))
+        self.assertEqual([u['id'] for u in users], ['0', '1', '2', '10'])
+        self.assertEqual(cursors, [None, '1'])
+
+        del cursors[:]
+        self.assertEqual(len(list(self.api.iter_edges(self.api.user_followers, '123', max_pages=1))), 3)
+        self.assertEqual(cursors, [None])
+
+        with self.assertRaises(ValueError):
+            next(self.api.iter_edges(self.api.search, 'cats'))
+
+    def test_stub_server_mock(self):
+        self.sleep_interval = 0
+        with StubServer(total_items=30, error_paths={r'/web/likes/': 429}) as server:
+            api = Client(
+                api_url=server.web_api_url, username='someone', password='secret', authenticate=True)
+            self.assertTrue(api.is_authenticated)
+            self.assertEqual(api.user_info2('someone')['username'], 'someone')
+            self.assertEqual(len(api.user_feed('123', count=12)), 12)
+            users = list(api.iter_edges(api.user_followers, '123'))
+            self.assertEqual(len(users), 30)
+            self.assertEqual(len(set([u['id'] for u in users])), 30)
+            self.assertEqual(server.request_counts['web_graphql'], 2)
+            with self.assertRaises(ClientError) as ce:
+                api.post_like('123')
+            self.assertEqual(ce.exception.code, 429)
+
+    def test_response_cache_mock(self):
+        self.sleep_interval = 0
+        with StubServer() as server:
+            api = Client(api_url=server.web_api_url, response_cache=True)
+            self.assertEqual(api.user_info2('someone'), api.user_info2('someone'))
+            self.assertEqual(server.request_counts['web_user_info'], 1)
+            self.assertEqual(api.response_cache.ttl_for('p/abc/?__a=1'), 5 * 60)
+            self.assertIsNone(api.response_cache.ttl_for('graphql/query/'))
+
+            # responses are not shared between accounts
+            authed_api = Client(
+                api_url=server.web_api_url, username='someone', password='secret', authenticate=True,
+                response_cache=api.response_cache)
+            authed_api.user_info2('someone')
+            authed_api.user_info2('someone')
+            self.assertEqual(server.request_counts['web_user_info'], 2)
+
+    def test_event_hooks_mock(self):
+        self.sleep_interval = 0
+        events = []
+        with StubServer() as server:
+            api = Client(api_url=server.web_api_url, keep_alive=True, event_hooks=[events.append])
+            api.user_info2('someone')
+            api.user_feed('123', count=12)
+            requests = [e for e in events if e.name == 'request']
+            self.assertEqual(len(requests), 3)
+            self.assertEqual(requests[1].endpoint, 'someone/')
+            self.assertTrue(requests[2].endpoint.startswith('graphql/query/?query_hash='))
+            self.assertTrue(requests[2].connection_reused)
+            self.assertEqual(requests[2].status, 200)
+            self.assertGreater(requests[2].bytes_received, 0)
+            self.assertEqual(
+                [e.name for e in events if e.request_id == requests[2].request_id],
+                ['prepare', 'server', 'download', 'decompress', 'json', 'request'])
+
     def test_search(self):
         results = self.api.search('maru')
         self.assertGreaterEqual(len(results['users']), 0)